@@ -1,15 +1,31 @@
 import asyncio
-from contextlib import suppress
+import math
+import os
+from contextlib import aclosing, suppress
+from typing import AsyncIterator
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from fastapi.websockets import WebSocketState
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import numpy as np
 
-from waveform.computation import compute_wave, flatten_wave_array
-from pi.piano import play_pi_sequence_with_harmony
+from metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, stage
+from waveform.framing import negotiate as negotiate_frames
+from waveform.hub import WAVEFORM_HUB, Subscriber, settings_key
+from pi.encoding import SAMPLE_RATE, AudioEncoder, negotiate_output, parse_range
+from pi.framing import FrameEncoder, negotiate
+from pi.assembly import window_notes
+from pi.parallel import render_pi_parallel, segment_layout
+from pi.peaks import MAX_WIDTH, PYRAMIDS
+from pi.piano import NORMALIZE_MODES, iter_pi_waveform, score_timeline
+from pi.render_cache import RENDER_CACHE, render_key
+from pi.render_pool import RENDER_POOL, RenderRejected, render_cost
+from pi.single_flight import SINGLE_FLIGHT, Flight
+from pi.resample import Resampler
+from pi.score import FREQUENCIES, KEY_NAMES, SCORES, generate_scale
+from pi.synthesis import DEFAULT_ENGINE, get_engine
+from pi.tone_bank import TONE_BANK
 
 import logging
 
@@ -35,7 +51,8 @@ handler.setFormatter(ColorFormatter("%(levelname)-8s %(message)s"))
 
 logger = logging.getLogger()
 logger.addHandler(handler)
-logger.setLevel(logging.DEBUG)
+# DEBUG logs every rendered note; keep it opt-in
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,23 +60,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Accept-Ranges", "Content-Range", "X-Audio-Format", "X-Sample-Rate", "X-Sample-Count"],
 )
+# Outermost, so request timings include CORS handling and every byte sent
+app.add_middleware(MetricsMiddleware)
+
+_ENCODE = stage("encode")
+_RENDER = stage("render")
 
 @app.websocket("/ws/waveform")
 async def websocket_waveform(ws: WebSocket):
     await ws.accept()
     generate_wave = False
-    phase = 0.0
     frequency = 1.0
     amplitude = 1.0
     samples = 100
     frame_size = 0.1
     frame_rate = 30
 
+    # Frames are computed per settings group and shared between connections
+    sub = Subscriber(ws)
+    await WAVEFORM_HUB.subscribe(sub, settings_key(generate_wave, frequency, amplitude, samples, frame_size, frame_rate))
     stop = asyncio.Event()
 
     async def recv_settings():
         nonlocal generate_wave, frequency, amplitude, samples, frame_size, frame_rate
+        encoding = None
         try:
             while True:
                 data = await ws.receive_json()
@@ -69,25 +95,21 @@ async def websocket_waveform(ws: WebSocket):
                 samples = int(data.get("samples", samples))
                 frame_size = float(data.get("frame_size", frame_size))
                 frame_rate = int(data.get("frame_rate", frame_rate))
+                try:
+                    encoding = negotiate_frames(data, encoding)
+                except ValueError as exc:
+                    await ws.send_json({"error": str(exc)})
+                else:
+                    sub.set_encoding(encoding)
+                await WAVEFORM_HUB.subscribe(sub, settings_key(generate_wave, frequency, amplitude, samples, frame_size, frame_rate))
         except (WebSocketDisconnect, RuntimeError):
             pass
         finally:
             stop.set()
 
     async def send_wave():
-        nonlocal generate_wave, frequency, amplitude, phase, samples, frame_size
         try:
-            while True:
-                if ws.application_state != WebSocketState.CONNECTED:
-                    break
-                if generate_wave:
-                    payload = compute_wave(frequency, amplitude, phase, samples, frame_size)
-                    phase = phase + (1.0 / frame_rate)
-                    await ws.send_bytes(flatten_wave_array(payload))
-                else:
-                    default_wave = [[0, 0], [1, 0]]
-                    await ws.send_bytes(flatten_wave_array(default_wave))
-                await asyncio.sleep(1/frame_rate)
+            await sub.run()
         except (WebSocketDisconnect, RuntimeError, asyncio.CancelledError):
             pass
         finally:
@@ -99,6 +121,8 @@ async def websocket_waveform(ws: WebSocket):
     try:
         await stop.wait()
     finally:
+        logger.debug("Waveform connection closed: %s", sub.stats())
+        await WAVEFORM_HUB.unsubscribe(sub)
         for t in (recv_task, send_task):
             t.cancel()
         with suppress(asyncio.CancelledError):
@@ -109,76 +133,541 @@ async def websocket_waveform(ws: WebSocket):
             await ws.close()
 
 
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def iter_chunks(wave: np.ndarray, chunk_size: int = STREAM_CHUNK_BYTES // 4):
+    """Yield zero-copy slices of a cached float32 waveform."""
+    for start in range(0, len(wave), chunk_size):
+        yield wave[start:start + chunk_size]
+
+async def aiter_chunks(wave: np.ndarray):
+    for chunk in iter_chunks(wave):
+        yield chunk
+
+async def read_flight(flight: Flight) -> AsyncIterator[np.ndarray]:
+    """flight.read(), counting as a reader only once iteration starts, so an unstarted stream never holds it."""
+    async with aclosing(flight.read()) as chunks:
+        async for chunk in chunks:
+            yield chunk
+
+async def rechunk(chunks: AsyncIterator[np.ndarray], size: int) -> AsyncIterator[np.ndarray]:
+    """Regroup a stream of chunks into `size`-sample pieces; only the last may be shorter."""
+    pending = np.zeros(0, dtype=np.float32)
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            pending = np.concatenate([pending, chunk]) if len(pending) else chunk
+            whole = len(pending) - len(pending) % size
+            for start in range(0, whole, size):
+                yield pending[start:start + size]
+            pending = pending[whole:]
+    if len(pending):
+        yield pending
+
+async def aresample(chunks: AsyncIterator[np.ndarray], sample_rate: int) -> AsyncIterator[np.ndarray]:
+    """Resample a stream of SAMPLE_RATE chunks as they arrive; matches resample() on the whole."""
+    resampler = Resampler(SAMPLE_RATE, sample_rate)
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            yield (await run_in_threadpool(resampler.process, chunk)).astype(np.float32)
+    yield (await run_in_threadpool(resampler.flush)).astype(np.float32)
+
+# Hard limits on π render parameters, whatever a render would cost: a
+# window's cost is only known once the digits and score are computed
+MAX_DIGITS = int(os.environ.get("PI_MAX_DIGITS", 100_000))
+MAX_HARMONY_SPEED = int(os.environ.get("PI_MAX_HARMONY_SPEED", 64))
+
+def check_pi_params(params: dict):
+    """
+    Raise ValueError for π render parameters that can't be rendered, before
+    any response starts. Only cheap checks run here, on the event loop;
+    the key's range is checked when the score compiles (see prepare_render).
+    """
+    get_engine(params["engine"])
+    for name in ("duration", "crossfade"):
+        if not math.isfinite(params[name]):
+            raise ValueError(f"{name} must be a finite number")
+    if not 0 < params["digits"] <= MAX_DIGITS:
+        raise ValueError(f"digits must be between 1 and {MAX_DIGITS}")
+    if params["duration"] <= 0:
+        raise ValueError("duration must be positive")
+    if not 1 <= params["harmony_speed"] <= MAX_HARMONY_SPEED:
+        raise ValueError(f"harmony_speed must be between 1 and {MAX_HARMONY_SPEED}")
+    normalize = params.get("normalize", "peak")
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"Unknown normalize: {normalize}")
+    generate_scale(params["key_root"])
+
+def pi_render_cost(params: dict, notes: int | None = None) -> float:
+    """render_cost of the whole π render, or of `notes` of its melody notes; one note per digit."""
+    return render_cost(params["digits"] if notes is None else notes, params["duration"],
+                       params["octave_doubling"], params["harmony_speed"])
+
+async def prepare_render(params: dict):
+    """
+    Compile the score (checking the key's range) and lay out the notes on a
+    worker thread, so even the largest admissible request never blocks the
+    event loop. The score is cached for the render itself.
+
+    Returns:
+        tuple: segment_layout's (note_lens, fades, seg_lens).
+
+    Raises:
+        ValueError: if the score can't be compiled.
+    """
+    def prepare():
+        SCORES.get(digits=params["digits"], key_root=params["key_root"], harmony_speed=params["harmony_speed"],
+                   octave_doubling=params["octave_doubling"], harmony_movement=params["harmony_movement"],
+                   seed=params["seed"])
+        return segment_layout(params["digits"], params["duration"], params["crossfade"], engine=params["engine"])
+    return await run_in_threadpool(prepare)
+
+def render_rejected(exc: RenderRejected) -> HTTPException:
+    """503 + Retry-After while the render pool is saturated, 413 if the render can never be admitted."""
+    if exc.retry_after is None:
+        return HTTPException(status_code=413, detail=str(exc))
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+def start_flight(key: str | None, cost: float, total: int, render) -> Flight:
+    """Admit a render of the given cost and start it as a shared flight."""
+    try:
+        job = RENDER_POOL.admit(cost)
+    except RenderRejected as exc:
+        raise render_rejected(exc)
+    return SINGLE_FLIGHT.start(key, job, total, render)
+
 @app.get("/api/pi-waveform")
 async def pi_waveform(
+    request: Request,
     digits: int = 50,
     duration: float = 1.0,
     crossfade: float = 0.01,
     key_root: str = "C4",
-    harmony_type: str = "third",
+    harmony_type: str = "third",  # accepted for old clients; never changes the audio
     harmony_speed: int = 4,
     octave_doubling: bool = True,
-    harmony_movement: str = "chordal"
+    harmony_movement: str = "chordal",
+    seed: int | None = None,
+    normalize: str = "bound",
+    engine: str = DEFAULT_ENGINE,
+    format: str | None = None,
+    sample_rate: int | None = None,
+    compress: str | None = None,
+    start: float | None = None,
+    end: float | None = None
 ):
-    # 1) Generate the full normalized float-32 waveform
-    wave: np.ndarray = play_pi_sequence_with_harmony(
+    params = dict(
         digits=digits,
         duration=duration,
         crossfade=crossfade,
         key_root=key_root,
-        harmony_type=harmony_type,
         harmony_speed=harmony_speed,
         octave_doubling=octave_doubling,
         harmony_movement=harmony_movement,
-        return_wave=True
+        seed=seed,
+        normalize=normalize,
+        engine=engine,
     )
-    # 2) Convert to Float32 bytes
-    byte_data = wave.astype(np.float32).tobytes()
-    # 3) Stream it back as application/octet-stream
+    try:
+        check_pi_params(params)
+        for name, value in (("start", start), ("end", end)):
+            if value is not None and not (math.isfinite(value) and value >= 0):
+                raise ValueError(f"{name} must be a non-negative number of seconds")
+        output = negotiate_output(format, sample_rate, compress, request.headers.get("accept", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    encoder = AudioEncoder(**output)
+
+    # Unseeded random movement renders differently every time
+    cacheable = harmony_movement != "random" or seed is not None
+    # A start/end window is its own representation, in 44.1 kHz samples
+    windowed = start is not None or end is not None
+    window_start = 0 if start is None else max(0, round(start * SAMPLE_RATE))
+    window_stop = None if end is None else max(window_start, round(end * SAMPLE_RATE))
+    headers = {"Vary": "Accept", "Accept-Ranges": "bytes" if encoder.seekable else "none"}
+    if cacheable:
+        # The cache holds the float32 render; each representation of it gets
+        # its own ETag
+        key = render_key(**params)
+        variant = [encoder.tag] if encoder.tag else []
+        if windowed:
+            variant.append(f"{window_start}-{'' if window_stop is None else window_stop}")
+        etag = f'"{key}-{"-".join(variant)}"' if variant else f'"{key}"'
+        headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+    wave = RENDER_CACHE.get(key) if cacheable else None
+    # Identical requests arriving while this one renders share its render
+    flight = SINGLE_FLIGHT.join(key) if cacheable and wave is None else None
+    if wave is not None:
+        total = len(wave)
+    elif flight is not None:
+        total = flight.total
+    else:
+        try:
+            if not windowed or normalize == "peak":
+                # Refuse a render that could never be admitted before doing
+                # any digit or score work for it
+                RENDER_POOL.check_cost(pi_render_cost(params))
+            # The note layout gives the length before anything renders, so a
+            # WAV header can go first
+            note_lens, fades, seg_lens = await prepare_render(params)
+        except RenderRejected as exc:
+            raise render_rejected(exc)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        total = int(seg_lens.sum())
+    first = min(window_start, total)
+    stop = total if window_stop is None else min(window_stop, total)
+    samples = stop - first
+
+    # Byte ranges of uncompressed full-rate representations map to samples
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if "range" in request.headers and encoder.seekable and (if_range is None or if_range == headers.get("ETag")):
+        size = encoder.content_length(samples)
+        try:
+            byte_range = parse_range(request.headers["range"], size)
+        except ValueError as exc:
+            raise HTTPException(status_code=416, detail=str(exc), headers={"Content-Range": f"bytes */{size}"})
+    a, b = first, stop
+    if byte_range is not None:
+        lo, hi = encoder.sample_span(*byte_range)
+        a, b = first + lo, first + min(hi, samples)
+
+    if wave is not None and byte_range is None:
+        return StreamingResponse(
+            encoder.encode(iter_chunks(wave[a:b]), samples),
+            media_type=encoder.media_type,
+            headers={**headers, **encoder.headers(samples)}
+        )
+
+    if wave is not None:
+        chunks = aiter_chunks(wave[a:b])
+    elif b <= a:
+        # An empty window, e.g. one starting past the end, renders nothing
+        chunks = aiter_chunks(np.zeros(0, dtype=np.float32))
+    else:
+        if flight is None and ((a, b) == (0, total) or (normalize == "peak" and cacheable)):
+            # Render the whole piece note by note on the render pool, so the
+            # first bytes go out after the first note; cacheable renders are
+            # kept once complete. Windows of a peak-normalized render need
+            # the whole render anyway, so they cache it.
+            flight = start_flight(key if cacheable else None, pi_render_cost(params), total,
+                                  lambda job: iter_pi_waveform(**params))
+        if flight is not None:
+            chunks = flight.read(start=a, stop=b)
+        else:
+            # Render just the notes overlapping the window, plus the next
+            # note for the crossfade into it. Peak normalization first
+            # renders the whole piece to find its peak, so costs as much.
+            first_note, last_note, _ = window_notes(fades, seg_lens, a, b)
+            cost = pi_render_cost(params) if normalize == "peak" else pi_render_cost(params, last_note - first_note)
+            flight = start_flight(None, cost, b - a, lambda job: iter_pi_waveform(**params, start=a, stop=b))
+            chunks = flight.read()
+
+    # A render stops once every request reading it has disconnected
+    if byte_range is None:
+        return StreamingResponse(
+            encoder.encode_async(chunks, samples),
+            media_type=encoder.media_type,
+            headers={**headers, **encoder.headers(samples)}
+        )
+    first_byte, last_byte = byte_range
     return StreamingResponse(
-        iter([byte_data]),
-        media_type="application/octet-stream"
+        encoder.encode_range(chunks, samples, first_byte, last_byte),
+        status_code=206,
+        media_type=encoder.media_type,
+        headers={
+            **headers,
+            **encoder.headers(samples),
+            "Content-Range": f"bytes {first_byte}-{last_byte}/{encoder.content_length(samples)}",
+            "Content-Length": str(last_byte - first_byte + 1),
+        }
     )
 
+@app.get("/api/pi-score")
+async def pi_score(
+    digits: int = 50,
+    duration: float = 1.0,
+    crossfade: float = 0.01,
+    key_root: str = "C4",
+    harmony_speed: int = 4,
+    octave_doubling: bool = True,
+    harmony_movement: str = "chordal",
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE
+):
+    """
+    Every tone of a π render, for drawing it: the same compiled score the
+    audio is mixed from, placed in 44.1 kHz output samples. Columns are
+    parallel arrays, one entry per tone, sorted by note; `key` indexes
+    `keys` and `frequencies`, `step` is -1 for the melody, 2h for the
+    octave double of harmony voice h and 2h+1 for voice h.
+    """
+    params = dict(digits=digits, duration=duration, crossfade=crossfade, key_root=key_root,
+                  harmony_speed=harmony_speed, octave_doubling=octave_doubling, harmony_movement=harmony_movement,
+                  seed=seed, engine=engine)
+    try:
+        check_pi_params(params)
+        # A score has a row per tone, so one too big to render is refused too
+        RENDER_POOL.check_cost(pi_render_cost(params))
+        score, timed = await run_in_threadpool(
+            score_timeline, digits, duration, crossfade, key_root, harmony_speed,
+            octave_doubling, harmony_movement, seed, engine
+        )
+    except RenderRejected as exc:
+        raise render_rejected(exc)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "keys": KEY_NAMES,
+        "frequencies": FREQUENCIES.tolist(),
+        "note": score.events["note"].tolist(),
+        "step": score.events["step"].tolist(),
+        "key": timed["key"].tolist(),
+        "start": timed["start"].tolist(),
+        "duration": timed["duration"].tolist(),
+        "gain": timed["gain"].astype(np.float64).round(4).tolist(),
+    }
+
+@app.get("/api/pi-cache-stats")
+async def pi_cache_stats():
+    return {
+        "tone_bank": TONE_BANK.stats(),
+        "render_cache": RENDER_CACHE.stats(),
+        "render_pool": RENDER_POOL.stats(),
+        "single_flight": SINGLE_FLIGHT.stats(),
+        "peak_pyramids": PYRAMIDS.stats(),
+        "scores": SCORES.stats(),
+    }
+
+@app.get("/api/waveform-stats")
+async def waveform_stats():
+    return WAVEFORM_HUB.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+async def wait_until_disconnect(ws: WebSocket, awaitable):
+    """
+    Await `awaitable` (waiting for or streaming a shared render) while
+    watching the socket. A client that disconnects has it cancelled, so it
+    stops reading, which cancels the render if nobody else is.
+
+    Returns:
+        the awaitable's result, or None after a disconnect
+    """
+    waiting = asyncio.ensure_future(awaitable)
+    while True:
+        receiving = asyncio.ensure_future(ws.receive())
+        await asyncio.wait({waiting, receiving}, return_when=asyncio.FIRST_COMPLETED)
+        if waiting.done():
+            receiving.cancel()
+            with suppress(asyncio.CancelledError):
+                await receiving
+            return waiting.result()
+        if receiving.result()["type"] == "websocket.disconnect":
+            waiting.cancel()
+            with suppress(asyncio.CancelledError):
+                await waiting
+            return None
+
+def pi_params(cfg: dict) -> dict:
+    """
+    π render parameters of a WebSocket config message, with the /ws/pi
+    defaults. Values get the types of /api/pi-waveform's query parameters,
+    so equal settings have equal render keys on every endpoint.
+
+    Raises:
+        ValueError: for values that don't convert.
+    """
+    try:
+        seed = cfg.get("seed")
+        return dict(
+            digits=int(cfg.get("digits", 50)),
+            duration=float(cfg.get("duration", 1.0)),
+            crossfade=float(cfg.get("crossfade", 0.01)),
+            key_root=str(cfg.get("key_root", "C4")),
+            harmony_speed=int(cfg.get("harmony_speed", 4)),
+            octave_doubling=bool(cfg.get("octave_doubling", True)),
+            harmony_movement=str(cfg.get("harmony_movement", "chordal")),
+            seed=None if seed is None else int(seed),
+            engine=str(cfg.get("engine", DEFAULT_ENGINE)),
+        )
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid render parameters: {exc}") from None
+
+def socket_render_key(params: dict, normalize: str) -> str | None:
+    # Unseeded random movement renders differently every time
+    if params["harmony_movement"] == "random" and params["seed"] is None:
+        return None
+    return render_key(**params, normalize=normalize)
+
+async def render_for_socket(ws: WebSocket, params: dict, normalize: str = "peak") -> np.ndarray | Flight | None:
+    """
+    The normalized render for a WebSocket client: cached, joined in flight,
+    or newly admitted to the render pool. Renders are keyed like
+    /api/pi-waveform's, so the endpoints share cache entries and renders.
+
+    Returns:
+        the cached waveform, the Flight rendering it (read it to stream
+        what is already produced), or None if the render was refused (the
+        client is told and the socket closed)
+    """
+    key = socket_render_key(params, normalize)
+    wave = RENDER_CACHE.get(key) if key else None
+    if wave is not None:
+        return wave
+    flight = SINGLE_FLIGHT.join(key) if key else None
+    if flight is None:
+        cost = pi_render_cost(params)
+        try:
+            RENDER_POOL.check_cost(cost)
+            _, _, seg_lens = await prepare_render(params)
+            job = RENDER_POOL.admit(cost)
+        except RenderRejected as exc:
+            await ws.send_json({"error": str(exc), "retry_after": exc.retry_after})
+            # 1013 Try Again Later, 1008 Policy Violation
+            await ws.close(code=1013 if exc.retry_after else 1008)
+            return None
+        except ValueError as exc:
+            await ws.send_json({"error": str(exc)})
+            await ws.close()
+            return None
+
+        if normalize == "peak":
+            def render(job):
+                # Long melodies are split across the render process pool
+                wave = render_pi_parallel(**params, checkpoint=job.check)
+                return [] if wave is None else [wave]
+        else:
+            render = lambda job: iter_pi_waveform(**params, normalize=normalize)
+
+        flight = SINGLE_FLIGHT.start(key, job, int(seg_lens.sum()), render)
+    return flight
+
 @app.websocket("/ws/pi")
 async def websocket_pi(ws: WebSocket):
     await ws.accept()
-    print("WebSocket connection established for PI waveform generation.")
+    logger.debug("WebSocket connection established for PI waveform generation.")
     cfg = await ws.receive_json()
-    digits = cfg.get("digits", 50)
-    duration = cfg.get("duration", 1.0)
-    crossfade = cfg.get("crossfade", 0.01)
-    key_root = cfg.get("key_root", "C4")
-    harmony_type = cfg.get("harmony_type", "third")
-    harmony_speed = cfg.get("harmony_speed", 4)
-    octave_doubling = cfg.get("octave_doubling", True)
-    harmony_movement = cfg.get("harmony_movement", "chordal")
-
-    combined_wave = await run_in_threadpool(
-        play_pi_sequence_with_harmony,
-        digits=digits,
-        duration=duration,
-        crossfade=crossfade,
-        key_root=key_root,
-        harmony_type=harmony_type,
-        harmony_speed=harmony_speed,
-        octave_doubling=octave_doubling,
-        harmony_movement=harmony_movement,
-        return_wave=True
-    )
-
-    sample_rate = 44100
-    chunk_size = 1024
-    total = len(combined_wave)
 
     try:
-        for start in range(0, total, chunk_size):
-            chunk = combined_wave[start:start+chunk_size]
-            data = [[i/sample_rate, float(v)] for i, v in enumerate(chunk)]
-            await ws.send_json({"data": data})
-            await asyncio.sleep(chunk_size / sample_rate)
+        params = pi_params(cfg)
+        check_pi_params(params)
+        stream = negotiate(cfg)
+    except ValueError as exc:
+        await ws.send_json({"error": str(exc)})
+        await ws.close()
+        return
+
+    render = await render_for_socket(ws, params)
+    if render is None:
+        return
+    # Joining a render in progress streams what it has produced so far
+    # straight away, then each part as it is rendered
+    if isinstance(render, Flight):
+        chunks, total = read_flight(render), render.total
+    else:
+        chunks, total = aiter_chunks(render), len(render)
+
+    sample_rate = stream["sample_rate"]
+    if sample_rate != SAMPLE_RATE:
+        chunks = aresample(chunks, sample_rate)
+        total = Resampler(SAMPLE_RATE, sample_rate).output_length(total)
+    chunk_size = stream["chunk_size"]
+
+    async def send():
+        pieces = rechunk(chunks, chunk_size)
+        async with aclosing(pieces):
+            if stream["protocol"] == "binary":
+                # Describe the frames once, then send header + raw samples only
+                await ws.send_json({**stream, "sample_rate": sample_rate, "total_samples": total})
+                encoder = FrameEncoder(sample_rate, stream["sample_format"], chunk_size)
+                seq = 0
+                async for chunk in pieces:
+                    await ws.send_bytes(encoder.encode(seq, seq * chunk_size, chunk))
+                    seq += 1
+                    await asyncio.sleep(chunk_size / sample_rate)
+            else:
+                async for chunk in pieces:
+                    with _ENCODE.time():
+                        data = [[i/sample_rate, float(v)] for i, v in enumerate(chunk)]
+                    await ws.send_json({"data": data})
+                    await asyncio.sleep(chunk_size / sample_rate)
 
+    try:
+        await wait_until_disconnect(ws, send())
     except WebSocketDisconnect:
         pass
     finally:
-        await ws.close()
\ No newline at end of file
+        with suppress(Exception):
+            await ws.close()
+
+@app.websocket("/ws/pi-peaks")
+async def websocket_pi_peaks(ws: WebSocket):
+    """
+    Min/max envelope of a π render for drawing it, at the client's zoom.
+
+    The first message is the render config, as for /ws/pi plus "normalize"
+    ("bound" or "peak", as for /api/pi-waveform). The server answers with
+    the render's length, then each view message {"start", "end" (seconds),
+    "width" (pixels)} gets {"start", "end", "samples_per_pixel", "min",
+    "max"}. The audio itself stays on /ws/pi and /api/pi-waveform.
+    """
+    await ws.accept()
+    cfg = await ws.receive_json()
+    normalize = cfg.get("normalize", "bound")
+
+    try:
+        params = pi_params(cfg)
+        check_pi_params({**params, "normalize": normalize})
+        key = socket_render_key(params, normalize)
+        if key is None:
+            raise ValueError("Unseeded random renders can't be viewed; pass a seed")
+    except ValueError as exc:
+        await ws.send_json({"error": str(exc)})
+        await ws.close()
+        return
+
+    wave = await render_for_socket(ws, params, normalize)
+    if isinstance(wave, Flight):
+        with _RENDER.time():
+            wave = await wait_until_disconnect(ws, wave.wait())
+        if wave is None:
+            logger.debug("PI client left during the render")
+    if wave is None:
+        return
+    pyramid = await run_in_threadpool(PYRAMIDS.get, key, wave)
+    total = len(wave)
+
+    try:
+        await ws.send_json({"sample_rate": SAMPLE_RATE, "total_samples": total, "duration": total / SAMPLE_RATE})
+        while True:
+            view = await ws.receive_json()
+            try:
+                width = int(view.get("width", 1000))
+                start = max(0, round(float(view.get("start", 0)) * SAMPLE_RATE))
+                end = view.get("end")
+                stop = total if end is None else min(total, round(float(end) * SAMPLE_RATE))
+            except (TypeError, ValueError):
+                await ws.send_json({"error": "start, end and width must be numbers"})
+                continue
+            if not 0 < width <= MAX_WIDTH:
+                await ws.send_json({"error": f"width must be between 1 and {MAX_WIDTH}"})
+                continue
+            with _ENCODE.time():
+                mins, maxs = pyramid.envelope(start, stop, width, wave)
+                reply = {
+                    "start": start / SAMPLE_RATE,
+                    "end": max(start, stop) / SAMPLE_RATE,
+                    "samples_per_pixel": (stop - start) / len(mins) if len(mins) else 0,
+                    "min": np.round(mins.astype(np.float64), 4).tolist(),
+                    "max": np.round(maxs.astype(np.float64), 4).tolist(),
+                }
+            await ws.send_json(reply)
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,338 @@
+import bisect
+import threading
+import time
+
+# Upper bounds (seconds) shared by the latency histograms: sub-millisecond
+# per-note stages up to multi-second renders and streams.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Timer:
+    """Context manager observing the elapsed time into a histogram child."""
+
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: "_Child"):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class _Child:
+    """A metric bound to one set of label values (see Metric.labels)."""
+
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: "Metric", key: tuple):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0):
+        self._metric._add(self._key, amount)
+
+    def dec(self, amount: float = 1.0):
+        self._metric._add(self._key, -amount)
+
+    def set(self, value: float):
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float):
+        self._metric._observe(self._key, value)
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Metric:
+    """
+    Base of the in-process metrics. Values live in a dict keyed by label
+    values behind one lock per metric, so updates from request handlers,
+    the threadpool and background tasks are cheap and safe. Metrics updated
+    inside render worker processes are not collected.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: "Registry | None" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def labels(self, **labels) -> _Child:
+        """Bind label values once, e.g. at import time for hot paths."""
+        return _Child(self, tuple(str(labels[n]) for n in self.labelnames))
+
+    def _add(self, key, amount):
+        raise TypeError(f"{self.kind} {self.name} does not support inc/dec")
+
+    def _set(self, key, value):
+        raise TypeError(f"{self.kind} {self.name} does not support set")
+
+    def _observe(self, key, value):
+        raise TypeError(f"{self.kind} {self.name} does not support observe")
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """(name suffix, rendered labels, value) for every exposed sample."""
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        return [("", _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.labels(**labels).inc(amount)
+
+    def _add(self, key, amount):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.labels(**labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.labels(**labels).dec(amount)
+
+    def set(self, value: float, **labels):
+        self.labels(**labels).set(value)
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS,
+                 registry: "Registry | None" = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels) -> _Timer:
+        return self.labels(**labels).time()
+
+    def _observe(self, key, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        out = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                out.append(("_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            out.append(("_sum", labels, total))
+            out.append(("_count", labels, count))
+        return out
+
+
+class Registry:
+    """Collects metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Text exposition format 0.0.4."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = Histogram(
+    "pi_stage_seconds",
+    "Time spent per synthesis and streaming stage.",
+    ("stage",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration, until the last body byte is sent.",
+    ("method", "path", "status"),
+)
+HTTP_RESPONSE_BYTES = Counter(
+    "http_response_bytes_total",
+    "HTTP response body bytes sent.",
+    ("path",),
+)
+WS_CONNECTIONS = Gauge(
+    "websocket_connections_active",
+    "Open WebSocket connections.",
+    ("path",),
+)
+WS_MESSAGES_SENT = Counter(
+    "websocket_messages_sent_total",
+    "WebSocket messages sent.",
+    ("path",),
+)
+WS_BYTES_SENT = Counter(
+    "websocket_bytes_sent_total",
+    "WebSocket payload bytes sent.",
+    ("path",),
+)
+WAVEFORM_FRAMES_SENT = Counter(
+    "waveform_frames_sent_total",
+    "/ws/waveform frames delivered to subscribers.",
+)
+WAVEFORM_FRAMES_DROPPED = Counter(
+    "waveform_frames_dropped_total",
+    "/ws/waveform frames replaced before a slow subscriber could send them.",
+)
+
+RENDER_JOBS = Gauge(
+    "pi_render_jobs",
+    "π renders on the render pool, by state (running, queued).",
+    ("state",),
+)
+RENDER_REJECTED = Counter(
+    "pi_render_rejected_total",
+    "π renders refused at admission, by reason.",
+    ("reason",),
+)
+
+
+def stage(name: str) -> _Child:
+    """Histogram child timing one stage, e.g. `with stage("mix").time(): ...`."""
+    return STAGE_SECONDS.labels(stage=name)
+
+
+def _route_path(scope: dict) -> str:
+    # Route templates keep label cardinality bounded; unmatched paths share one
+    route = scope.get("route")
+    return getattr(route, "path", None) or "other"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request durations, response bytes, open
+    WebSockets and WebSocket traffic, plus the time spent in `send` (the
+    "send" stage, which includes waiting on transport backpressure).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._send_stage = stage("send")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _http(self, scope, receive, send):
+        started = time.perf_counter()
+        status = "500"
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            with self._send_stage.time():
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = _route_path(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], path=path,
+                                         status=status)
+            if sent:
+                HTTP_RESPONSE_BYTES.inc(sent, path=path)
+
+    async def _websocket(self, scope, receive, send):
+        accepted = None
+
+        async def send_wrapper(message):
+            nonlocal accepted
+            kind = message["type"]
+            if kind == "websocket.accept" and accepted is None:
+                accepted = _route_path(scope)
+                WS_CONNECTIONS.inc(path=accepted)
+            elif kind == "websocket.send" and accepted is not None:
+                payload = message.get("bytes")
+                # Text frames are JSON, so characters count as bytes
+                size = len(payload) if payload is not None else len(message.get("text", ""))
+                WS_MESSAGES_SENT.inc(path=accepted)
+                WS_BYTES_SENT.inc(size, path=accepted)
+            with self._send_stage.time():
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if accepted is not None:
+                WS_CONNECTIONS.dec(path=accepted)
@@ -0,0 +1,87 @@
+from functools import lru_cache
+
+import numpy as np
+
+from metrics import stage
+
+_CROSSFADE = stage("crossfade")
+_NORMALIZE = stage("normalize")
+
+
+@lru_cache(maxsize=64)
+def crossfade_curve(samples: int) -> np.ndarray:
+    """Read-only sin² fade-in curve of `samples` points, shared by every note."""
+    curve = np.sin(np.linspace(0, np.pi/2, samples))**2
+    curve.flags.writeable = False
+    return curve
+
+
+def crossfade_layout(note_lens: np.ndarray, crossfade_samples: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes how consecutive notes overlap without rendering them.
+
+    Note k blends its first fades[k] samples into the end of note k-1, never
+    more than what note k-1 itself added to the output, and then adds
+    seg_lens[k] new samples. A crossfade of zero or less is no crossfade.
+
+    Returns:
+        tuple: (fades, seg_lens) int arrays; seg_lens.sum() is the output length.
+    """
+    fades = np.zeros(len(note_lens), dtype=np.int64)
+    seg_lens = np.array(note_lens, dtype=np.int64)
+    for k in range(1, len(seg_lens)):
+        fades[k] = min(seg_lens[k - 1], max(0, crossfade_samples))
+        seg_lens[k] -= fades[k]
+    return fades, seg_lens
+
+
+def window_notes(fades: np.ndarray, seg_lens: np.ndarray, start: int, stop: int) -> tuple[int, int, int]:
+    """
+    Finds the notes needed to render output samples [start, stop).
+
+    Those are the notes whose segments overlap the window, plus the next
+    note, whose head is crossfaded into the last of them.
+
+    Returns:
+        tuple: (first, last, origin): render notes [first, last); the new
+            samples of note `first` start at output sample `origin`.
+    """
+    ends = np.cumsum(seg_lens)
+    first = int(np.searchsorted(ends, start, side="right"))
+    last = min(int(np.searchsorted(ends, stop - 1, side="right")) + 2, len(seg_lens))
+    return first, last, int(ends[first] - seg_lens[first])
+
+
+class CrossfadeAssembler:
+    """
+    Writes notes straight into one preallocated output buffer, crossfading
+    each note's head into the tail already in the buffer.
+
+    Args:
+        out (np.ndarray): output buffer, typically np.empty(seg_lens.sum()).
+        pos (int): index the next note's new samples are written at.
+    """
+
+    def __init__(self, out: np.ndarray, pos: int = 0):
+        self.out = out
+        self.pos = pos
+
+    def add(self, note: np.ndarray, fade: int = 0):
+        """Blend the first `fade` samples of `note` into the tail, append the rest."""
+        with _CROSSFADE.time():
+            if fade > 0:
+                curve = crossfade_curve(fade)
+                tail = self.out[self.pos - fade:self.pos]
+                tail[:] = tail*(1-curve) + note[:fade]*curve
+            n = len(note) - fade
+            self.out[self.pos:self.pos + n] = note[fade:]
+            self.pos += n
+
+
+def normalize_in_place(wave: np.ndarray) -> np.ndarray:
+    """Scale `wave` to a peak of 1.0 without allocating a full-size |wave|."""
+    with _NORMALIZE.time():
+        if len(wave):
+            peak = max(wave.max(), -wave.min()) or 1.0
+            wave /= peak
+    return wave
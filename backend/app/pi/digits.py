@@ -0,0 +1,124 @@
+import math
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from metrics import stage
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Extra decimal digits computed beyond the requested count so that the
+# truncated fixed-point result is exact in every digit we hand out.
+GUARD_DIGITS = 10
+
+
+class PiDigits:
+    """
+    Thread-safe, incrementally extended cache of the decimal digits of π.
+
+    Keeps the longest digit prefix computed so far (the digits after "3.")
+    and only recomputes when a caller asks for more. Growth is chunked and
+    geometric, so a series of slowly increasing requests does amortized O(n)
+    work. Requests for already-computed digits are O(1) array views.
+
+    Digits are computed with mpmath's fixed-point routine, which never touches
+    the process-global `mp.dps`, so concurrent callers cannot race on it.
+
+    Args:
+        path (str | None): optional digit file holding one byte (0–9) per
+            digit. If it exists it is memory-mapped read-only on startup and
+            served without copying; it is rewritten whenever the cache grows.
+        chunk (int): minimum number of digits to add per extension.
+    """
+
+    def __init__(self, path: str | None = None, chunk: int = 1024):
+        self._lock = threading.Lock()
+        self._path = path
+        self._chunk = chunk
+        self._mmap = None
+        self._values = np.zeros(0, dtype=np.uint8)
+        self._values.flags.writeable = False
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def digits(self, n: int) -> np.ndarray:
+        """
+        Return the first `n` digits after the decimal point as a read-only
+        uint8 array of values 0–9.
+
+        Raises:
+            ValueError: if `n` is negative.
+        """
+        if n < 0:
+            raise ValueError(f"digits must be non-negative, got {n}")
+        values = self._values  # single reference read, safe without the lock
+        if n > len(values):
+            with self._lock:
+                if n > len(self._values):
+                    self._extend(n)
+                values = self._values
+        return values[:n]
+
+    def text(self, n: int) -> str:
+        """Return the first `n` digits after the decimal point as a string."""
+        return (self.digits(n) + ord("0")).tobytes().decode("ascii")
+
+    def _extend(self, n: int):
+        # mpmath is only needed past the digits already cached or on disk
+        from mpmath.libmp import numeral, pi_fixed
+
+        target = max(n, 2 * len(self._values))
+        target = -(-target // self._chunk) * self._chunk
+        total = target + GUARD_DIGITS
+        prec = int(total * math.log2(10)) + 64
+
+        logger.debug("Extending π digit cache from %d to %d digits", len(self._values), target)
+        # numeral() splits big integers itself, so this is not subject to the
+        # interpreter's int-to-str digit limit.
+        text = numeral((pi_fixed(prec) * 10 ** total) >> prec, 10, total + 1)[1:target + 1]  # drop the leading "3"
+
+        values = np.frombuffer(text.encode("ascii"), dtype=np.uint8) - ord("0")
+        values.flags.writeable = False
+        self._values = values
+
+        if self._path:
+            self._store(self._path, values)
+
+    def _load(self, path: str):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        values = np.frombuffer(self._mmap, dtype=np.uint8)
+        if np.any(values > 9):
+            logger.warning("Ignoring corrupt π digit file %s", path)
+            return
+        self._values = values
+        logger.debug("Loaded %d π digits from %s", len(values), path)
+
+    def _store(self, path: str, values: np.ndarray):
+        tmp = f"{path}.tmp"
+        try:
+            values.tofile(tmp)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Could not persist π digits to %s: %s", path, exc)
+
+
+PI_DIGITS = PiDigits(os.environ.get("PI_DIGITS_FILE"))
+
+
+_DIGIT_FETCH = stage("digit_fetch")
+
+
+def pi_digits(n: int) -> np.ndarray:
+    """Return the first `n` digits of π after "3." from the shared cache."""
+    with _DIGIT_FETCH.time():
+        return PI_DIGITS.digits(n)
@@ -0,0 +1,354 @@
+import asyncio
+import lzma
+import struct
+import zlib
+from contextlib import aclosing
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+import numpy as np
+
+from metrics import stage
+from pi.resample import Resampler
+
+SAMPLE_RATE = 44100
+MIN_SAMPLE_RATE = 8000
+
+# Output format -> (media type, sample dtype). "wav" is mono 16-bit PCM in a
+# RIFF container, which browsers can hand straight to decodeAudioData.
+OUTPUT_FORMATS = {
+    "float32": ("application/octet-stream", np.dtype("<f4")),
+    "int16": ("application/octet-stream", np.dtype("<i2")),
+    "wav": ("audio/wav", np.dtype("<i2")),
+}
+
+# Accept header media types that select a format
+ACCEPT_FORMATS = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "application/octet-stream": "float32",
+}
+
+# zlib is sent as HTTP "deflate" content coding, which clients undo
+# transparently; lzma has no HTTP coding, so it is served as an .xz file.
+COMPRESSIONS = ("zlib", "lzma")
+
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+_ENCODE = stage("encode")
+_RESAMPLE = stage("resample")
+
+
+def format_from_accept(accept: str) -> str:
+    """Pick the output format from an Accept header, honouring q-values."""
+    ranked = []
+    for i, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type.lower() in ACCEPT_FORMATS and q > 0:
+            ranked.append((-q, i, ACCEPT_FORMATS[media_type.lower()]))
+    return min(ranked)[2] if ranked else "float32"
+
+
+def negotiate_output(
+    format: str | None = None,
+    sample_rate: int | None = None,
+    compress: str | None = None,
+    accept: str = "",
+) -> dict:
+    """
+    Validate the output options of a π waveform request.
+
+    Args:
+        format (str | None): "float32", "int16" or "wav"; taken from the
+            Accept header when omitted.
+        sample_rate (int | None): output rate, MIN_SAMPLE_RATE..SAMPLE_RATE.
+        compress (str | None): "zlib" or "lzma".
+        accept (str): the request's Accept header.
+
+    Returns:
+        dict: the accepted format, sample_rate and compress values.
+    """
+    format = format or format_from_accept(accept)
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+
+    sample_rate = SAMPLE_RATE if sample_rate is None else int(sample_rate)
+    if not MIN_SAMPLE_RATE <= sample_rate <= SAMPLE_RATE:
+        raise ValueError(f"sample_rate must be between {MIN_SAMPLE_RATE} and {SAMPLE_RATE}")
+
+    if compress is not None and compress not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compress}")
+
+    return {"format": format, "sample_rate": sample_rate, "compress": compress}
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range `Range: bytes=...` header for a body of `size` bytes.
+
+    Returns:
+        tuple | None: inclusive (first, last) byte offsets, or None when the
+            header is to be ignored (other units, several ranges, malformed).
+
+    Raises:
+        ValueError: if the range is unsatisfiable (HTTP 416).
+    """
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not dash or "," in spec:
+        return None
+    if not (first.isdigit() or first == "") or not (last.isdigit() or last == "") or first == last == "":
+        return None
+    if first == "":
+        # Suffix range: the final `last` bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - int(last)), size - 1
+    if last and int(last) < int(first):
+        return None
+    first = int(first)
+    if first >= size:
+        raise ValueError("Unsatisfiable range")
+    return first, size - 1 if last == "" else min(int(last), size - 1)
+
+
+def pcm16(samples: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Convert normalized samples to 16-bit PCM (the scale decode_frame undoes)."""
+    if out is None:
+        out = np.empty(len(samples), dtype="<i2")
+    np.multiply(np.clip(samples, -1.0, 1.0), 32767, out=out, casting="unsafe")
+    return out
+
+
+def wav_header(samples: int, sample_rate: int) -> bytes:
+    """RIFF header for `samples` mono 16-bit PCM samples."""
+    data_bytes = samples * 2
+    return WAV_HEADER.pack(
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_bytes,
+    )
+
+
+class AudioEncoder:
+    """
+    Turns a stream of normalized float32 chunks at SAMPLE_RATE into the
+    negotiated output representation, chunk by chunk.
+
+    Args:
+        format (str): see OUTPUT_FORMATS.
+        sample_rate (int): output rate; lower rates are resampled with a
+            band-limited filter (see pi.resample).
+        compress (str | None): see COMPRESSIONS.
+    """
+
+    def __init__(self, format: str = "float32", sample_rate: int = SAMPLE_RATE, compress: str | None = None):
+        self.format = format
+        self.sample_rate = sample_rate
+        self.compress = compress
+        self.dtype = OUTPUT_FORMATS[format][1]
+
+    @property
+    def tag(self) -> str:
+        """Short name of this representation, "" for the default raw float32."""
+        parts = [self.format]
+        if self.sample_rate != SAMPLE_RATE:
+            parts.append(str(self.sample_rate))
+        if self.compress:
+            parts.append(self.compress)
+        return "" if parts == ["float32"] else "-".join(parts)
+
+    @property
+    def media_type(self) -> str:
+        if self.compress == "lzma":
+            return "application/x-xz"
+        return OUTPUT_FORMATS[self.format][0]
+
+    def output_length(self, samples: int) -> int:
+        """Samples in the output for `samples` input samples."""
+        if self.sample_rate == SAMPLE_RATE:
+            return samples
+        return Resampler(SAMPLE_RATE, self.sample_rate).output_length(samples)
+
+    def headers(self, samples: int) -> dict:
+        """Response headers describing the encoded stream of `samples` inputs."""
+        headers = {
+            "X-Audio-Format": self.format,
+            "X-Sample-Rate": str(self.sample_rate),
+            "X-Sample-Count": str(self.output_length(samples)),
+        }
+        if self.compress == "zlib":
+            headers["Content-Encoding"] = "deflate"
+        return headers
+
+    @property
+    def seekable(self) -> bool:
+        """Whether byte offsets map straight to samples (no resampling or compression)."""
+        return self.sample_rate == SAMPLE_RATE and self.compress is None
+
+    @property
+    def header_length(self) -> int:
+        return WAV_HEADER.size if self.format == "wav" else 0
+
+    def content_length(self, samples: int) -> int:
+        """Encoded size of `samples` samples, for seekable encodings."""
+        return self.header_length + samples * self.dtype.itemsize
+
+    def sample_span(self, first: int, last: int) -> tuple[int, int]:
+        """Samples [start, stop) holding bytes first..last (inclusive) of a seekable encoding."""
+        size = self.dtype.itemsize
+        start = max(0, first - self.header_length) // size
+        stop = -(-max(0, last + 1 - self.header_length) // size)
+        return start, stop
+
+    @property
+    def blocking(self) -> bool:
+        """Whether encoding a chunk is heavy enough to keep off the event loop."""
+        return self.sample_rate != SAMPLE_RATE or self.compress is not None
+
+    def stream(self, samples: int) -> "EncodeStream":
+        """Push-style encoder for one waveform of `samples` input samples."""
+        return EncodeStream(self, samples)
+
+    def encode(self, chunks: Iterable[np.ndarray], samples: int) -> Iterator[bytes | memoryview]:
+        """
+        Encode a whole waveform given as chunks.
+
+        Args:
+            chunks: normalized float32 chunks at SAMPLE_RATE.
+            samples (int): total input samples (needed up front for the WAV
+                header and X-Sample-Count).
+
+        Yields:
+            bytes | memoryview: the encoded body, one piece per input chunk.
+        """
+        stream = self.stream(samples)
+        for chunk in chunks:
+            yield from stream.feed(chunk)
+        yield from stream.finish()
+
+    async def encode_async(self, chunks: AsyncIterable[np.ndarray], samples: int) -> AsyncIterator[bytes | memoryview]:
+        """
+        Like encode, for chunks that arrive asynchronously (see
+        pi.single_flight). Resampling and compression run in a worker thread.
+        """
+        stream = self.stream(samples)
+        call = asyncio.to_thread if self.blocking else _call
+        # The WAV header goes out before the first chunk is ready
+        for piece in stream.start():
+            yield piece
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                for piece in await call(stream.feed, chunk):
+                    yield piece
+        for piece in await call(stream.finish):
+            yield piece
+
+
+    async def encode_range(self, chunks: AsyncIterable[np.ndarray], samples: int,
+                           first: int, last: int) -> AsyncIterator[bytes | memoryview]:
+        """
+        Bytes first..last (inclusive) of the seekable encoding of `samples`
+        samples, given chunks holding just the samples sample_span covers.
+        """
+        header = wav_header(samples, self.sample_rate) if self.format == "wav" else b""
+        if first < len(header):
+            yield header[first:last + 1]
+        start, _ = self.sample_span(first, last)
+        skip = max(0, first - len(header)) - start * self.dtype.itemsize
+        remaining = last + 1 - max(first, len(header))
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if remaining <= 0:
+                    break
+                data = memoryview(_convert(chunk, self.dtype)).cast("B")[skip:skip + remaining]
+                skip = 0
+                remaining -= len(data)
+                yield data
+
+
+async def _call(fn, *args):
+    return fn(*args)
+
+
+def _convert(chunk: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    with _ENCODE.time():
+        if dtype == np.int16:
+            return pcm16(chunk)
+        if chunk.dtype != dtype:
+            return chunk.astype(dtype)
+        return chunk
+
+
+class EncodeStream:
+    """
+    Encoding state of one waveform: the resampler, the WAV header and the
+    compressor. Each call returns the encoded pieces it completed.
+    """
+
+    def __init__(self, encoder: AudioEncoder, samples: int):
+        self.encoder = encoder
+        self.samples = samples
+        self._resampler = None
+        if encoder.sample_rate != SAMPLE_RATE:
+            self._resampler = Resampler(SAMPLE_RATE, encoder.sample_rate)
+        self._compressor = None
+        if encoder.compress == "zlib":
+            self._compressor = zlib.compressobj()
+        elif encoder.compress == "lzma":
+            self._compressor = lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+        self._started = False
+
+    def start(self) -> list[bytes | memoryview]:
+        """The pieces that precede any samples; implied by the first feed."""
+        out = []
+        if not self._started:
+            self._started = True
+            if self.encoder.format == "wav":
+                self._emit(wav_header(self.encoder.output_length(self.samples), self.encoder.sample_rate), out)
+        return out
+
+    def feed(self, chunk: np.ndarray) -> list[bytes | memoryview]:
+        """Encode one normalized float32 chunk at SAMPLE_RATE."""
+        out = self.start()
+        if self._resampler is not None:
+            with _RESAMPLE.time():
+                chunk = self._resampler.process(chunk)
+        self._payload(chunk, out)
+        return out
+
+    def finish(self) -> list[bytes | memoryview]:
+        """Flush the resampler and compressor; nothing may be fed after."""
+        out = self.start()
+        if self._resampler is not None:
+            with _RESAMPLE.time():
+                chunk = self._resampler.flush()
+            self._payload(chunk, out)
+        if self._compressor is not None:
+            with _ENCODE.time():
+                out.append(self._compressor.flush())
+        return out
+
+    def _payload(self, chunk: np.ndarray, out: list):
+        if not len(chunk):
+            return
+        self._emit(memoryview(_convert(chunk, self.encoder.dtype)).cast("B"), out)
+
+    def _emit(self, data: bytes | memoryview, out: list):
+        if self._compressor is None:
+            out.append(data)
+            return
+        with _ENCODE.time():
+            data = self._compressor.compress(data)
+            if self.encoder.compress == "zlib":
+                # Sync-flush every chunk so each note reaches the client promptly
+                data += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            out.append(data)
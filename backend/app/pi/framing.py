@@ -0,0 +1,103 @@
+import struct
+
+import numpy as np
+
+from metrics import stage
+from pi.encoding import MIN_SAMPLE_RATE, SAMPLE_RATE, pcm16
+
+# Binary /ws/pi frame header, little-endian:
+#   uint32 sequence number
+#   uint64 index of the first sample in the frame
+#   uint32 sample rate
+#   uint16 sample format code (see SAMPLE_FORMATS)
+#   uint16 sample count
+# followed by the raw samples. 20 bytes keeps float32 payloads 4-byte aligned.
+HEADER = struct.Struct("<IQIHH")
+
+SAMPLE_FORMATS = {
+    "float32": (1, np.dtype("<f4")),
+    "int16": (2, np.dtype("<i2")),
+}
+
+MIN_CHUNK_SIZE = 64
+MAX_CHUNK_SIZE = 65535  # sample count must fit the uint16 header field
+
+_ENCODE = stage("encode")
+
+
+def negotiate(cfg: dict) -> dict:
+    """
+    Validate the stream options of a /ws/pi config message.
+
+    Args:
+        cfg (dict): client config; reads "protocol" ("json" or "binary"),
+            "chunk_size", "sample_format" ("float32" or "int16") and
+            "sample_rate" (resampled below 44100).
+
+    Returns:
+        dict: the accepted protocol, chunk_size, sample_format and sample_rate.
+    """
+    protocol = cfg.get("protocol", "json")
+    if protocol not in ("json", "binary"):
+        raise ValueError(f"Unknown protocol: {protocol}")
+
+    sample_format = cfg.get("sample_format", "float32")
+    if sample_format not in SAMPLE_FORMATS:
+        raise ValueError(f"Unknown sample format: {sample_format}")
+
+    chunk_size = int(cfg.get("chunk_size", 1024))
+    chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+
+    sample_rate = int(cfg.get("sample_rate", SAMPLE_RATE))
+    if not MIN_SAMPLE_RATE <= sample_rate <= SAMPLE_RATE:
+        raise ValueError(f"sample_rate must be between {MIN_SAMPLE_RATE} and {SAMPLE_RATE}")
+
+    return {"protocol": protocol, "chunk_size": chunk_size, "sample_format": sample_format, "sample_rate": sample_rate}
+
+
+class FrameEncoder:
+    """
+    Encodes audio chunks into binary /ws/pi frames.
+
+    The header and payload are written into one reusable buffer, so encoding a
+    frame is a header pack plus one typed copy of the samples.
+    """
+
+    def __init__(self, sample_rate: int = 44100, sample_format: str = "float32", chunk_size: int = 1024):
+        self.sample_rate = sample_rate
+        self.code, self.dtype = SAMPLE_FORMATS[sample_format]
+        self._buf = bytearray(HEADER.size + chunk_size * self.dtype.itemsize)
+        self._payload = np.frombuffer(self._buf, dtype=self.dtype, offset=HEADER.size)
+        self._view = memoryview(self._buf)
+
+    def encode(self, seq: int, start: int, samples: np.ndarray) -> memoryview:
+        """
+        Encode one chunk of normalized samples.
+
+        Returns:
+            memoryview: frame bytes, valid until the next call.
+        """
+        count = len(samples)
+        with _ENCODE.time():
+            HEADER.pack_into(self._buf, 0, seq, start, self.sample_rate, self.code, count)
+            out = self._payload[:count]
+            if self.code == SAMPLE_FORMATS["int16"][0]:
+                pcm16(samples, out=out)
+            else:
+                out[:] = samples
+        return self._view[:HEADER.size + count * self.dtype.itemsize]
+
+
+def decode_frame(frame: bytes) -> tuple[int, int, int, np.ndarray]:
+    """
+    Decode a binary /ws/pi frame.
+
+    Returns:
+        tuple: (sequence number, start sample, sample rate, float32 samples)
+    """
+    seq, start, sample_rate, code, count = HEADER.unpack_from(frame)
+    dtype = next(dt for c, dt in SAMPLE_FORMATS.values() if c == code)
+    samples = np.frombuffer(frame, dtype=dtype, count=count, offset=HEADER.size)
+    if code == SAMPLE_FORMATS["int16"][0]:
+        samples = samples / 32767
+    return seq, start, sample_rate, samples.astype(np.float32)
@@ -0,0 +1,126 @@
+import numpy as np
+
+# One harmony voice or octave double placed inside a melody note.
+#   note:  melody note index
+#   step:  mixing order within the note (2h = octave double, 2h+1 = voice h)
+#   start: first sample inside the note
+#   width: samples written
+#   tone:  row of the tone table
+#   gain:  scale applied to the tone
+EVENT_DTYPE = np.dtype([
+    ("note", np.int64),
+    ("step", np.int64),
+    ("start", np.int64),
+    ("width", np.int64),
+    ("tone", np.int64),
+    ("gain", np.float64),
+])
+
+VOICE_GAIN = 0.8
+OCTAVE_GAIN = 0.6
+
+
+def tone_table(tones: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack tones into one zero-padded 2-D array.
+
+    Returns:
+        tuple: (table of shape (len(tones), longest), int array of lengths)
+    """
+    lens = np.array([len(t) for t in tones], dtype=np.int64)
+    table = np.zeros((len(tones), lens.max(initial=0)), dtype=np.float64)
+    for row, tone in zip(table, tones):
+        row[:len(tone)] = tone
+    return table, lens
+
+
+def harmony_schedule(
+    voice_idx: np.ndarray,
+    note_lens: np.ndarray,
+    tone_lens: np.ndarray,
+    octave_tone: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute every harmony event of a piece up front.
+
+    Voice h of a note starts at int(h * note_len / harmony_speed) with gain
+    0.8; when an octave double exists it is placed at the start of the note
+    with gain 0.6 and the voice drops to 0.8 * 0.8.
+
+    Args:
+        voice_idx (np.ndarray): (notes, harmony_speed) tone rows per voice.
+        note_lens (np.ndarray): length of every melody note.
+        tone_lens (np.ndarray): length of every tone table row.
+        octave_tone (np.ndarray): per tone row, the row of its octave double,
+            or -1 for none (also -1 everywhere when doubling is off).
+
+    Returns:
+        np.ndarray: EVENT_DTYPE events sorted by note, then step.
+    """
+    notes, harmony_speed = voice_idx.shape
+    note = np.repeat(np.arange(notes), harmony_speed)
+    h = np.tile(np.arange(harmony_speed), notes)
+    tone = voice_idx.reshape(-1)
+    octave = octave_tone[tone]
+    doubled = octave >= 0
+
+    voices = np.empty(len(tone), dtype=EVENT_DTYPE)
+    voices["note"] = note
+    voices["step"] = 2 * h + 1
+    voices["start"] = (h * note_lens[note]) // harmony_speed
+    voices["width"] = np.minimum(note_lens[note], voices["start"] + tone_lens[tone]) - voices["start"]
+    voices["tone"] = tone
+    voices["gain"] = np.where(doubled, VOICE_GAIN * VOICE_GAIN, VOICE_GAIN)
+
+    doubles = np.empty(int(doubled.sum()), dtype=EVENT_DTYPE)
+    doubles["note"] = note[doubled]
+    doubles["step"] = 2 * h[doubled]
+    doubles["start"] = 0
+    doubles["width"] = np.minimum(note_lens[note[doubled]], tone_lens[octave[doubled]])
+    doubles["tone"] = octave[doubled]
+    doubles["gain"] = OCTAVE_GAIN
+
+    events = np.concatenate([voices, doubles])
+    return events[np.lexsort((events["step"], events["note"]))]
+
+
+def mix_notes(
+    melody: np.ndarray,
+    note_lens: np.ndarray,
+    events: np.ndarray,
+    tones: np.ndarray,
+    first: int = 0,
+) -> np.ndarray:
+    """
+    Mix melody and harmony for a run of notes in one batched pass.
+
+    Events are overlap-added step by step; within a step every note appears
+    once, so each (step, start, width) group is a single 2-D add across all
+    notes instead of one small add per voice per note.
+
+    Args:
+        melody (np.ndarray): (notes, width) melody rows, zero past each note.
+        note_lens (np.ndarray): length of each row's note.
+        events (np.ndarray): the schedule for exactly these notes.
+        tones (np.ndarray): tone table the events index into.
+        first (int): note index of the first row.
+
+    Returns:
+        np.ndarray: (notes, width) array of (melody + harmony) / 2.
+    """
+    harmony = np.zeros_like(melody)
+    key = np.stack([events["step"], events["start"], events["width"]], axis=1)
+    groups, inverse = np.unique(key, axis=0, return_inverse=True)
+    for g, (_, start, width) in enumerate(groups):
+        ev = events[inverse.reshape(-1) == g]
+        voices = tones[ev["tone"], :width]
+        voices *= ev["gain"][:, None]
+        rows = ev["note"] - first
+        if rows[-1] - rows[0] == len(rows) - 1:
+            # Usually every note has this voice: add through a strided view
+            harmony[rows[0]:rows[-1] + 1, start:start + width] += voices
+        else:
+            harmony[rows[:, None], start + np.arange(width)] += voices
+    combo = np.add(melody, harmony, out=harmony)
+    combo /= 2.0
+    return combo
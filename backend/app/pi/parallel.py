@@ -0,0 +1,190 @@
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+
+from pi.digits import pi_digits
+from pi.assembly import CrossfadeAssembler, crossfade_layout, normalize_in_place
+from pi.piano import iter_pi_notes, melody_table, play_pi_sequence_with_harmony
+from pi.synthesis import DEFAULT_ENGINE
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Below this many notes per worker, process startup and IPC cost more than
+# they save.
+MIN_BLOCK_NOTES = 32
+
+# Seconds between checkpoint calls while blocks render
+CHECKPOINT_INTERVAL = 0.05
+
+# Workers only read the segment; the parent owns and unlinks it.
+_ATTACH = {"track": False} if sys.version_info >= (3, 13) else {}
+
+RENDER_PROCESSES = int(os.environ.get("PI_RENDER_PROCESSES", os.cpu_count() or 1))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared render process pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES)
+        return _pool
+
+
+def segment_layout(digits: int, duration: float, crossfade: float, sample_rate: int = 44100,
+                   engine: str = DEFAULT_ENGINE):
+    """
+    Computes where every note lands in the output without rendering it.
+
+    Returns:
+      tuple: (note_lens, fades, seg_lens) int arrays, where note_lens[k] is the
+        phase-aligned length of note k, fades[k] the samples of note k blended
+        into note k-1, and seg_lens[k] the samples note k adds to the output.
+    """
+    _, melody_lens = melody_table(duration, sample_rate, engine)
+    note_lens = melody_lens[pi_digits(digits)]
+    fades, seg_lens = crossfade_layout(note_lens, int(sample_rate * crossfade))
+    return note_lens, fades, seg_lens
+
+
+def _render_block(shm_name: str, size: int, params: dict, first: int, last: int,
+                  out_start: int, fades: np.ndarray, head_start: int) -> int:
+    """
+    Worker: render notes [first, last) into the shared output buffer.
+
+    The first note's head, which belongs to the crossfade with the previous
+    block, goes to a scratch slot instead so blocks never write the same
+    samples.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name, **_ATTACH)
+    try:
+        buf = np.ndarray((size,), dtype=np.float32, buffer=shm.buf)
+        assembler = CrossfadeAssembler(buf, out_start)
+        for n, combo in enumerate(iter_pi_notes(**params, first=first, last=last)):
+            fade = int(fades[n])
+            if n == 0:
+                buf[head_start:head_start + fade] = combo[:fade]
+                assembler.add(combo[fade:])
+            else:
+                assembler.add(combo, fade)
+        pos = assembler.pos
+        del buf, assembler
+    finally:
+        shm.close()
+    return pos - out_start
+
+
+def _stitch(shm, size, total, ends, heads, head_starts) -> np.ndarray:
+    """Crossfade each block head into the previous block's tail, normalize."""
+    buf = np.ndarray((size,), dtype=np.float32, buffer=shm.buf)
+    # Blocks render in worker processes, whose stage timers are not
+    # collected; the stitching below is timed like the serial path
+    stitch = CrossfadeAssembler(buf)
+    for end, xf, head_start in zip(ends, heads, head_starts):
+        # Re-append the saved head at the boundary: blends it, writes nothing new
+        stitch.pos = end
+        stitch.add(buf[head_start:head_start + xf], xf)
+    full_wave = buf[:total].copy()
+    return normalize_in_place(full_wave)
+
+
+def render_pi_parallel(
+    digits: int = 100,
+    duration: float = 0.5,
+    crossfade: float = 0.05,
+    key_root: str = "C4",
+    harmony_type: str = "third",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE,
+    workers: int | None = None,
+    checkpoint: Callable[[], None] | None = None
+) -> np.ndarray | None:
+    """
+    Renders the harmonized π melody across the render process pool.
+
+    The digit range is split into blocks that render independently into one
+    shared-memory buffer; block boundaries are then crossfaded exactly as the
+    serial loop does. The result is bit-identical to
+    play_pi_sequence_with_harmony(return_wave=True). Small pieces are
+    rendered serially.
+
+    Args:
+      workers (int | None): number of blocks; defaults to PI_RENDER_PROCESSES
+      checkpoint (callable | None): called periodically; raise from it to
+        abandon the render. Blocks already running in workers still finish.
+      other args: see play_pi_sequence_with_harmony.
+
+    Returns:
+      np.ndarray: the full normalized float32 waveform, or None if nothing rendered
+    """
+    if harmony_movement == "random" and seed is None:
+        # Every block must draw the same harmony table
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+    params = dict(
+        digits=digits,
+        duration=duration,
+        crossfade=crossfade,
+        key_root=key_root,
+        harmony_type=harmony_type,
+        harmony_speed=harmony_speed,
+        octave_doubling=octave_doubling,
+        harmony_movement=harmony_movement,
+        seed=seed,
+        engine=engine,
+    )
+
+    n_blocks = min(workers or RENDER_PROCESSES, digits // MIN_BLOCK_NOTES)
+    note_lens, fades, seg_lens = segment_layout(digits, duration, crossfade, engine=engine)
+    if n_blocks < 2:
+        return play_pi_sequence_with_harmony(**params, return_wave=True, checkpoint=checkpoint)
+
+    bounds = np.linspace(0, len(note_lens), n_blocks + 1).astype(int)
+    seg_starts = np.concatenate([[0], np.cumsum(seg_lens)])
+    total = int(seg_starts[-1])
+    heads = [int(fades[a]) for a in bounds[:-1]]
+    head_starts = total + np.concatenate([[0], np.cumsum(heads)])
+    size = int(head_starts[-1])
+
+    pool = get_pool()
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * 4)
+    try:
+        futures = [
+            pool.submit(_render_block, shm.name, size, params, int(a), int(b),
+                        int(seg_starts[a]), fades[a:b], int(head_starts[j]))
+            for j, (a, b) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+        try:
+            pending = set(futures)
+            while pending:
+                if checkpoint is not None:
+                    checkpoint()
+                _, pending = wait(pending, timeout=CHECKPOINT_INTERVAL)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+        for j, fut in enumerate(futures):
+            a, b = bounds[j], bounds[j + 1]
+            if fut.result() != seg_starts[b] - seg_starts[a]:
+                raise RuntimeError(f"Block {j} rendered an unexpected number of samples")
+
+        result = _stitch(shm, size, total, seg_starts[bounds[1:-1]], heads[1:], head_starts[1:-1])
+    finally:
+        shm.close()
+        shm.unlink()
+
+    logger.debug("Rendered %d notes in %d parallel blocks", len(note_lens), n_blocks)
+    return result
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import stage
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Samples per bin of the finest pyramid level; views zoomed in further than
+# this read the waveform itself.
+BASE_BIN = 16
+MAX_WIDTH = 16384
+
+_PEAKS = stage("peaks")
+
+
+def _bin_extrema(lo: np.ndarray, hi: np.ndarray, factor: int) -> tuple[np.ndarray, np.ndarray]:
+    """Min of `lo` and max of `hi` over consecutive bins of `factor` entries."""
+    n = len(lo)
+    whole = n - n % factor
+    mins = lo[:whole].reshape(-1, factor).min(axis=1)
+    maxs = hi[:whole].reshape(-1, factor).max(axis=1)
+    if whole < n:
+        mins = np.append(mins, lo[whole:].min())
+        maxs = np.append(maxs, hi[whole:].max())
+    return mins, maxs
+
+
+class PeakPyramid:
+    """
+    Min/max envelope of a waveform at power-of-two resolutions.
+
+    Level i holds the minimum and maximum of every BASE_BIN * 2**i samples,
+    down to a single bin, so any view is answered from the finest level
+    that is still coarser than one pixel. All levels together take about
+    a quarter of the float32 waveform's memory.
+    """
+
+    def __init__(self, wave: np.ndarray, base: int = BASE_BIN):
+        self.samples = len(wave)
+        self.base = base
+        self.levels: list[tuple[np.ndarray, np.ndarray]] = []
+        with _PEAKS.time():
+            if self.samples:
+                level = _bin_extrema(wave, wave, base)
+                self.levels.append(level)
+                while len(level[0]) > 1:
+                    level = _bin_extrema(*level, 2)
+                    self.levels.append(level)
+        for mins, maxs in self.levels:
+            mins.flags.writeable = False
+            maxs.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        return sum(mins.nbytes + maxs.nbytes for mins, maxs in self.levels)
+
+    def envelope(
+        self,
+        start: int,
+        stop: int,
+        width: int,
+        wave: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Min/max per pixel of samples [start, stop) drawn `width` pixels wide.
+
+        Args:
+            wave (np.ndarray | None): the waveform, used when a pixel spans
+                fewer than `base` samples; otherwise the finest level is
+                stretched over those pixels.
+
+        Returns:
+            tuple: (mins, maxs) float32 arrays of at most `width` entries, one
+                per pixel (fewer if the range has fewer samples than pixels).
+        """
+        start = max(0, start)
+        stop = min(stop, self.samples)
+        width = min(width, stop - start)
+        if width <= 0 or not self.levels:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty
+
+        per_pixel = (stop - start) / width
+        if per_pixel < self.base and wave is not None:
+            bin_size, (mins, maxs) = 1, (wave, wave)
+        else:
+            level = min(max(0, int(np.log2(per_pixel / self.base))), len(self.levels) - 1)
+            bin_size, (mins, maxs) = self.base << level, self.levels[level]
+
+        # Pixel i covers samples [bounds[i], bounds[i+1]) and takes every bin
+        # overlapping them: the run of bins from its first sample's, plus the
+        # bin of its last sample, which may straddle into the next pixel.
+        bounds = start + np.floor(np.arange(width + 1) * per_pixel).astype(np.int64)
+        bounds[-1] = stop
+        first = start // bin_size
+        mins = mins[first:-(-stop // bin_size)]
+        maxs = maxs[first:len(mins) + first]
+        heads = bounds[:-1] // bin_size - first
+        tails = (bounds[1:] - 1) // bin_size - first
+        return (np.minimum(np.minimum.reduceat(mins, heads), mins[tails]),
+                np.maximum(np.maximum.reduceat(maxs, heads), maxs[tails]))
+
+
+class PyramidCache:
+    """
+    LRU of PeakPyramids keyed by render key, kept alongside the render cache
+    so a render's pyramid is computed once however often it is viewed.
+
+    Args:
+        max_bytes (int): ceiling on the total size of cached pyramids.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[str, PeakPyramid] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, wave: np.ndarray) -> PeakPyramid:
+        """Return the pyramid of `wave` rendered under `key`, building it on a miss."""
+        with self._lock:
+            pyramid = self._entries.get(key)
+            if pyramid is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pyramid
+            self.misses += 1
+
+        pyramid = PeakPyramid(wave)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if pyramid.nbytes <= self.max_bytes:
+                self._entries[key] = pyramid
+                self._bytes += pyramid.nbytes
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.nbytes
+        return pyramid
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+PYRAMIDS = PyramidCache()
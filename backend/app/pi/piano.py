@@ -1,17 +1,37 @@
-import numpy as np
-import simpleaudio as sa
-from mpmath import mp
+from typing import Callable, Iterator
 
-from pi.sounds import generate_sine_wave, apply_envelope, phase_align_wave
+import numpy as np
+from metrics import stage
+from pi.assembly import CrossfadeAssembler, crossfade_curve, crossfade_layout, normalize_in_place, window_notes
+from pi.digits import pi_digits
+from pi.mixer import harmony_schedule, mix_notes, tone_table
+from pi.notes import DIGIT_TO_KEY, NOTE_NAMES, PIANO_KEYS
+from pi.playback import Playback, play, play_wave
+from pi.score import FREQUENCIES, SCORES, Score, generate_scale, increase_octave
+from pi.sounds import generate_sine_wave
+from pi.synthesis import DEFAULT_ENGINE
+from pi.tone_bank import TONE_BANK
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-DIGIT_TO_KEY = {
-    0: "C4", 1: "D4", 2: "E4", 3: "F4", 4: "G4",
-    5: "A4", 6: "B4", 7: "C5", 8: "D5", 9: "E5"
-}
+__all__ = [
+    "MIX_BLOCK_SAMPLES", "NORMALIZE_MODES",
+    "chord_wave", "create_piano_key_library", "fix_wave_length", "get_harmonized_note", "get_pi_waveform",
+    "iter_pi_notes", "iter_pi_segments", "iter_pi_waveform", "melody_table", "peak_bound", "play_notes",
+    "play_pi_sequence", "play_pi_sequence_continuous", "play_pi_sequence_with_harmony", "score_timeline",
+    # Defined here before they moved to pi.notes and pi.score; kept for
+    # existing imports
+    "DIGIT_TO_KEY", "PIANO_KEYS", "generate_scale", "increase_octave",
+]
+
+_HARMONY_MIX = stage("harmony_mix")
+_CROSSFADE = stage("crossfade")
+_NORMALIZE = stage("normalize")
+
+# Notes mixed per batch are capped at about this many samples
+MIX_BLOCK_SAMPLES = 1 << 20
 
 def get_pi_waveform(
     digits: int = 100,
@@ -28,18 +48,14 @@ def get_pi_waveform(
     """
     # (Copy the body of play_pi_sequence_continuous up to audio conversion,
     # but instead of playing, just return `combined_wave` as a float array.)
-    mp.dps = digits + 2
-    pi_digits = str(mp.pi)[2:]
     sample_rate = 44100
     previous_wave = None
     combined_list = []
 
-    for digit in pi_digits[:digits]:
+    for digit in pi_digits(digits):
         key = DIGIT_TO_KEY[int(digit)]
         freq = PIANO_KEYS[key]                     # :contentReference[oaicite:3]{index=3}
-        wave = generate_sine_wave(freq, duration, sample_rate)  # :contentReference[oaicite:4]{index=4}
-        wave = apply_envelope(wave, attack=0.02, decay=0.02)
-        wave = phase_align_wave(wave)
+        wave = TONE_BANK.tone(freq, duration, sample_rate)
 
         # (optional harmony logic…)
 
@@ -60,11 +76,10 @@ def get_pi_waveform(
 def create_piano_key_library():
     """
     Create a dictionary mapping piano key names to their frequencies.
+    The frozen PIANO_KEYS table (see pi.notes) holds its result.
     Returns:
         dict: A dictionary of piano keys and their corresponding frequencies.
     """
-    note_names = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-
     piano_keys = {}
 
     for i in range(88):
@@ -77,62 +92,18 @@ def create_piano_key_library():
         # Determine the note name and octave
         note_index = midi_number % 12  # Position within the octave
         octave = (midi_number // 12) - 1  # Calculate octave (MIDI 12-23 is octave 0, etc.)
-        note_name = f"{note_names[note_index]}{octave}"
+        note_name = f"{NOTE_NAMES[note_index]}{octave}"
 
         piano_keys[note_name] = round(frequency, 2) 
 
     return piano_keys
 
-PIANO_KEYS = create_piano_key_library()
-
-
-def generate_scale(root, scale_type="major", include_octaves=False):
-    """
-    Generates a scale based on the given root note and type.
-    
-    Args:
-        root (str): Root note (e.g., "C4").
-        scale_type (str): Type of scale ("major", "minor").
-        include_octaves (bool): If True, include all octaves of the scale.
-    
-    Returns:
-        list: List of note names in the scale.
-    """
-    major_steps = [2, 2, 1, 2, 2, 2, 1]
-    minor_steps = [2, 1, 2, 2, 1, 2, 2]
-
-    # Get the note names and find the index of the root
-    note_names = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-    root_name, octave = root[:-1], int(root[-1])
-
-    if root_name not in note_names:
-        raise ValueError(f"Invalid root note: {root}")
-
-    start_idx = note_names.index(root_name)
-    scale_steps = major_steps if scale_type == "major" else minor_steps
-    scale = [root]
-
-    current_idx = start_idx
-    for step in scale_steps:
-        current_idx = (current_idx + step) % 12
-        if current_idx < start_idx:
-            octave += 1  # Move to next octave
-        scale.append(f"{note_names[current_idx]}{octave}")
-
-    if include_octaves:
-        scale += [increase_octave(note) for note in scale]  # Add next octave
-
-    return scale
 
 # Define the function to play a single note or a chord
-def play_notes(notes, duration=1, volume=0.5, sample_rate=44100):
+def chord_wave(notes, duration=1, volume=0.5, sample_rate=44100) -> np.ndarray:
     """
-    Plays a single note or a combination of notes (chord).
-    Args:
-        notes (list or str): A piano key name (e.g., "C4") or a list of key names.
-        duration (float): Duration of the note in seconds.
-        volume (float): Volume of the sound (0.0 to 1.0).
-        sample_rate (int): Sampling rate for audio playback.
+    Renders a single note or a combination of notes (chord), normalized.
+    Args: see play_notes.
     """
     # Convert note names to frequencies
     if not isinstance(notes, list):
@@ -147,118 +118,89 @@ def play_notes(notes, duration=1, volume=0.5, sample_rate=44100):
     wave = sum(generate_sine_wave(freq, duration, sample_rate, amplitude=volume) for freq in frequencies)
 
     # Normalize the wave to fit in the range -1.0 to 1.0
-    wave = wave / np.max(np.abs(wave))
+    return wave / np.max(np.abs(wave))
 
-    # Convert to 16-bit PCM audio format
-    audio = (wave * 32767).astype(np.int16)
-
-    # Play the audio using simpleaudio
-    play_obj = sa.play_buffer(audio, num_channels=1, bytes_per_sample=2, sample_rate=sample_rate)
-    play_obj.wait_done()  # Wait until the audio finishes playing
+def play_notes(notes, duration=1, volume=0.5, sample_rate=44100, sink=None, blocking=True) -> Playback:
+    """
+    Plays a single note or a combination of notes (chord).
+    Args:
+        notes (list or str): A piano key name (e.g., "C4") or a list of key names.
+        duration (float): Duration of the note in seconds.
+        volume (float): Volume of the sound (0.0 to 1.0).
+        sample_rate (int): Sampling rate for audio playback.
+        sink: audio sink, see pi.playback; the default sink if None.
+        blocking (bool): wait until the notes have played.
+    Returns:
+        Playback: handle to wait for, await, cancel or query for underruns.
+    """
+    return play_wave(chord_wave(notes, duration, volume, sample_rate), sample_rate, sink, blocking)
 
 
-def play_pi_sequence(digits=100, duration=0.5):
+def play_pi_sequence(digits=100, duration=0.5, sink=None, blocking=True) -> Playback:
     """
     Plays the first "digits" of π, mapping each digit (0–9) to a piano key.
+    Notes are rendered on the playback producer thread while earlier ones play.
     Args:
         digits (int): Number of π digits to play.
         duration (float): Duration of each note.
+        sink, blocking: see play_notes.
     """
-    # Set π precision
-    mp.dps = digits + 2  # Digits + "3."
-    pi_digits = str(mp.pi)[2:]  # Remove "3."
+    logger.debug("Playing the first %d digits of π as notes...", digits)
 
-    logger.debug(f"Playing the first {digits} digits of π as notes...")
+    def notes(checkpoint):
+        # Play each digit as a note
+        for digit in pi_digits(digits):
+            checkpoint()
+            key = DIGIT_TO_KEY[int(digit)]
+            logger.debug("Digit %d -> Key %s", digit, key)
+            yield chord_wave(key, duration=duration)
 
-    # Play each digit as a note
-    for digit in pi_digits[:digits]:
-        key = DIGIT_TO_KEY[int(digit)]
-        logger.debug(f"Digit {digit} -> Key {key}")
-        play_notes(key, duration=duration)
+    return _start(notes, sink, blocking)
 
-def play_pi_sequence_continuous(digits=100, duration=0.5, crossfade=0.1):
+def play_pi_sequence_continuous(digits=100, duration=0.5, crossfade=0.1, sink=None, blocking=True) -> Playback:
     """
     Plays the first "digits" of π as a continuous sequence of notes with smooth, phase-aligned transitions.
     Args:
         digits (int): Number of π digits to play.
         duration (float): Duration of each note.
         crossfade (float): Overlapping duration between consecutive notes (for smooth transition).
+        sink, blocking: see play_notes.
     """
-    mp.dps = digits + 2  # Digits + "3."
-    pi_digits = str(mp.pi)[2:]  # Remove "3."
-
-    logger.debug(f"Playing the first {digits} digits of π as continuous notes...")
-
-    combined_wave = []  # Use a Python list for waveform collection
-    sample_rate = 44100
-    previous_wave = None  # Store previous wave for crossfading
-
-    for i, digit in enumerate(pi_digits[:digits]):
-        key = DIGIT_TO_KEY.get(int(digit), None)
-        if key is None or key not in PIANO_KEYS:
-            logger.debug(f"Digit {digit} -> Key not found in mapping!")
-            continue
-
-        logger.debug(f"Digit {digit} -> Key {key}")
-
-        # Generate sine wave
-        wave = generate_sine_wave(PIANO_KEYS[key], duration, sample_rate)
-        logger.debug(f"Generated wave for {key} with length {len(wave)}")
-
-        # Apply smooth attack and decay envelope
-        wave = apply_envelope(wave, attack=0.02, decay=0.02)
-        logger.debug(f"Applied envelope to wave for {key}")
-
-        # Phase-align wave to ensure it starts and ends near zero-crossing
-        wave = phase_align_wave(wave, sample_rate)
-        logger.debug(f"Phase-aligned wave for {key}")
-
-        if previous_wave is not None:
-            crossfade_samples = min(len(previous_wave), int(sample_rate * crossfade))
-
-            if crossfade_samples > 0:
-                sine_fade = np.sin(np.linspace(0, np.pi / 2, crossfade_samples)) ** 2
-
-                # Blend previous wave end with new wave start
-                previous_wave[-crossfade_samples:] = (
-                    previous_wave[-crossfade_samples:] * (1 - sine_fade) +
-                    wave[:crossfade_samples] * sine_fade
-                )
-                wave = wave[crossfade_samples:]  # Remove blended section
-                logger.debug(f"Crossfaded last {crossfade_samples} samples of {key}")
-
-            # Append blended previous wave
-            combined_wave.append(previous_wave)
-
-        # Store current wave as previous for the next iteration
-        previous_wave = wave
-
-    # Append the final wave
-    if previous_wave is not None:
-        combined_wave.append(previous_wave)
-
-    # Ensure we have valid waveform data
-    if not combined_wave:
-        logger.debug("No valid waveform generated. Exiting.")
-        return
-
-    # Convert list to a NumPy array
-    combined_wave = np.concatenate(combined_wave)
-    logger.debug(f"Final combined wave length: {len(combined_wave)}")
-
-    # Normalize waveform to avoid clipping
-    max_amplitude = np.max(np.abs(combined_wave))
-    if max_amplitude > 0:
-        combined_wave = combined_wave / max_amplitude
-    logger.debug(f"Waveform normalized. Final length: {len(combined_wave)}")
-
-    # Convert to 16-bit PCM audio format
-    audio = (combined_wave * 32767).astype(np.int16)
-
-    # Play the final waveform
-    logger.debug("Playing audio...")
-    play_obj = sa.play_buffer(audio, num_channels=1, bytes_per_sample=2, sample_rate=sample_rate)
-    play_obj.wait_done()
+    logger.debug("Playing the first %d digits of π as continuous notes...", digits)
+
+    def render(checkpoint):
+        sample_rate = 44100
+        # Shared read-only tones; the assembler copies them into the output
+        waves = [
+            TONE_BANK.tone(PIANO_KEYS[DIGIT_TO_KEY[int(digit)]], duration, sample_rate)
+            for digit in pi_digits(digits)
+        ]
+
+        # Ensure we have valid waveform data
+        if not waves:
+            logger.debug("No valid waveform generated. Exiting.")
+            return
+
+        # Lay out the crossfades up front and write every note into one buffer
+        fades, seg_lens = crossfade_layout(np.array([len(w) for w in waves]), int(sample_rate * crossfade))
+        combined_wave = np.empty(int(seg_lens.sum()), dtype=np.float32)
+        assembler = CrossfadeAssembler(combined_wave)
+        for wave, fade in zip(waves, fades):
+            checkpoint()
+            assembler.add(wave, fade)
+        logger.debug("Final combined wave length: %d", len(combined_wave))
+
+        # Normalize waveform to avoid clipping
+        normalize_in_place(combined_wave)
+        yield combined_wave
+
+    return _start(render, sink, blocking)
+
+def _start(source, sink, blocking: bool) -> Playback:
+    playback = play(source, 44100, sink)
+    if blocking:
+        playback.wait()
+    return playback
 
 def get_harmonized_note(melody_note, scale_notes, harmony_type="third"):
     """
@@ -288,24 +230,6 @@ def get_harmonized_note(melody_note, scale_notes, harmony_type="third"):
 
     return scale_notes[harmony_idx]
 
-def increase_octave(note):
-    """
-    Increases a note by one octave.
-    
-    Args:
-        note (str): The note to shift up.
-    
-    Returns:
-        str: The same note one octave higher.
-    """
-    if len(note) < 2 or not note[-1].isdigit():
-        return note  # Return unchanged if invalid format
-
-    note_name = note[:-1]  # Extract "C", "D#", etc.
-    octave = int(note[-1]) + 1  # Increase octave
-
-    return f"{note_name}{octave}"  # Return shifted note
-
 def fix_wave_length(wave, target_length):
     """
     Adjusts a waveform to match the target length.
@@ -323,7 +247,48 @@ def fix_wave_length(wave, target_length):
         return np.pad(wave, (0, target_length - len(wave)), mode="constant")  # Pad with silence if too short
     return wave  # Already the correct length
 
-def play_pi_sequence_with_harmony(
+def melody_table(
+    duration: float,
+    sample_rate: int = 44100,
+    engine: str = DEFAULT_ENGINE
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the melody tone of every digit as a zero-padded (10, width) table
+    plus the length of each tone.
+    """
+    return tone_table([
+        TONE_BANK.tone(PIANO_KEYS[DIGIT_TO_KEY[d]], duration, sample_rate, engine=engine)
+        for d in range(10)
+    ])
+
+def score_timeline(
+    digits: int = 100,
+    duration: float = 0.5,
+    crossfade: float = 0.05,
+    key_root: str = "C4",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE
+) -> tuple[Score, np.ndarray]:
+    """
+    The compiled score of a π render, placed in its output samples.
+
+    Args: see play_pi_sequence_with_harmony.
+
+    Returns:
+      tuple: (the Score, TIMED_DTYPE rows in the order of its events)
+    """
+    score = SCORES.get(digits=digits, key_root=key_root, harmony_speed=harmony_speed,
+                       octave_doubling=octave_doubling, harmony_movement=harmony_movement, seed=seed)
+    sample_rate = 44100
+    _, melody_lens = melody_table(duration, sample_rate, engine)
+    note_lens = melody_lens[score.digits]
+    fades, seg_lens = crossfade_layout(note_lens, int(sample_rate * crossfade))
+    return score, score.place(note_lens, fades, seg_lens, int(sample_rate * duration / harmony_speed))
+
+def iter_pi_notes(
     digits: int = 100,
     duration: float = 0.5,
     crossfade: float = 0.05,
@@ -332,128 +297,343 @@ def play_pi_sequence_with_harmony(
     harmony_speed: int = 2,
     octave_doubling: bool = False,
     harmony_movement: str = "random",
-    return_wave: bool = False
-) -> np.ndarray | None:
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE,
+    first: int = 0,
+    last: int | None = None
+) -> Iterator[np.ndarray]:
     """
-    Plays—or returns—the first `digits` of π as a harmonized piano melody.
-    
+    Mixes the harmonized π melody, yielding each note before crossfading.
+
+    Harmony for a whole run of notes is scheduled up front and mixed in
+    batches (see pi.mixer); at most one batch of about MIX_BLOCK_SAMPLES
+    samples is held in memory.
+
     Args:
-      digits (int): how many π digits to use
-      duration (float): seconds per melody note
-      crossfade (float): overlap duration between notes
-      key_root (str): root note for harmony (e.g. "C4")
-      harmony_type (str): "third", "fifth", or "sixth"
-      harmony_speed (int): harmony note rate multiplier
-      octave_doubling (bool): also play harmony +1 octave
-      harmony_movement (str): "random", "intervals", or "chordal"
-      return_wave (bool): if True, *do not* play but return waveform array
+      first (int): index of the first melody note to render
+      last (int | None): index one past the last note to render
+      other args: see play_pi_sequence_with_harmony.
 
-    Returns:
-      np.ndarray: if return_wave=True, the full normalized waveform
-      None: if return_wave=False (it plays the audio directly)
+    Yields:
+      np.ndarray: float32 (melody + harmony) / 2 for one note
     """
-    # 1) Prepare π digits
-    mp.dps = digits + 2
-    pi_digits = str(mp.pi)[2:]  # drop "3."
+    # 1) The compiled score: digits and the key of every harmony voice
+    score = SCORES.get(digits=digits, key_root=key_root, harmony_speed=harmony_speed,
+                       octave_doubling=octave_doubling, harmony_movement=harmony_movement, seed=seed)
+    last = len(score.digits) if last is None else last
+    notes = score.digits[first:last]
 
-    logger.debug(f"Generating π melody for {digits} digits in key {key_root}…")
+    logger.debug("Generating π melody for %d digits in key %s…", digits, key_root)
+    # Checked once: per-note records are only built when someone reads them
+    log_notes = logger.isEnabledFor(logging.DEBUG)
 
     sample_rate = 44100
-    combined_segments = []
-    prev_wave = None
-
-    # Precompute scale for harmony
-    scale_notes = generate_scale(key_root, "major", include_octaves=True)
     melody_dur  = duration
     harmony_dur = melody_dur / harmony_speed
-    harmony_idx = 0
-
-    # 2) Build each note + harmony
-    for i, ch in enumerate(pi_digits[:digits]):
-        digit = int(ch)
-        key = DIGIT_TO_KEY.get(digit)
-        if not key or key not in PIANO_KEYS:
-            logger.debug(f"Digit {digit} has no mapped key, skipping")
-            continue
-
-        logger.debug(f"Note {i+1}/{digits}: {key}")
-        # Melody
-        mel_wave = generate_sine_wave(PIANO_KEYS[key], melody_dur, sample_rate)
-        mel_wave = apply_envelope(mel_wave, attack=0.02, decay=0.02)
-        mel_wave = phase_align_wave(mel_wave)
-
-        # Prepare harmony placeholder
-        harmony_seq = np.zeros_like(mel_wave)
-
-        # Generate harmony voices
-        for h in range(harmony_speed):
-            # pick scale index
-            if harmony_movement == "random":
-                idx = np.random.randint(0, len(scale_notes))
-            elif harmony_movement == "intervals":
-                idx = (harmony_idx + h*2) % len(scale_notes)
-            else:  # chordal or default
-                idx = (harmony_idx + h*3) % len(scale_notes)
-            note_h = scale_notes[idx]
-            logger.debug(f"  Harmony {h+1}: {note_h}")
-            h_wave = generate_sine_wave(PIANO_KEYS[note_h], harmony_dur, sample_rate)
-            h_wave = apply_envelope(h_wave, attack=0.02, decay=0.02)
-            h_wave = phase_align_wave(h_wave)
-            # optional octave doubling
-            if octave_doubling:
-                oct_note = increase_octave(note_h)
-                if oct_note in PIANO_KEYS:
-                    logger.debug(f"    Octave double: {oct_note}")
-                    o_wave = generate_sine_wave(PIANO_KEYS[oct_note], harmony_dur, sample_rate)
-                    o_wave = apply_envelope(o_wave, attack=0.02, decay=0.02)
-                    o_wave = phase_align_wave(o_wave)
-                    o_wave *= 0.6
-                    h_wave *= 0.8
-                    harmony_seq[:len(o_wave)] += o_wave
-            # mix harmony voice
-            h_wave *= 0.8
-            # place this harmony into the sequence
-            start = int(h * len(harmony_seq) / harmony_speed)
-            end   = min(len(harmony_seq), start + len(h_wave))
-            harmony_seq[start:end] += h_wave[: end-start]
-
-        # advance harmony position
-        harmony_idx = (harmony_idx + harmony_speed) % len(scale_notes)
-
-        # blend melody + harmony
-        combo = (mel_wave + harmony_seq) / 2.0
-
-        # 3) Crossfade with previous
+
+    # 2) Tone rows for the keys in use, then their octave doubles
+    used, voice_rows = np.unique(score.voice_key[first:last], return_inverse=True)
+    tones = [TONE_BANK.tone(float(FREQUENCIES[k]), harmony_dur, sample_rate, engine=engine) for k in used]
+    octave_tone = np.full(len(used), -1)
+    if octave_doubling:
+        for row, k in enumerate(used):
+            if k + 12 < len(FREQUENCIES):
+                octave_tone[row] = len(tones)
+                tones.append(TONE_BANK.tone(float(FREQUENCIES[k + 12]), harmony_dur, sample_rate, engine=engine))
+    table, tone_lens = tone_table(tones)
+
+    melody, melody_lens = melody_table(melody_dur, sample_rate, engine)
+    note_lens = melody_lens[notes]
+    events = harmony_schedule(voice_rows.reshape(len(notes), harmony_speed), note_lens, tone_lens, octave_tone)
+
+    # 3) Mix batches of notes
+    block = max(1, MIX_BLOCK_SAMPLES // max(1, melody.shape[1]))
+    for b0 in range(0, len(notes), block):
+        b1 = min(len(notes), b0 + block)
+        lo, hi = np.searchsorted(events["note"], [b0, b1])
+        # Notes are crossfaded in float32 everywhere, so all render paths
+        # (streamed, buffered, parallel) produce identical samples
+        with _HARMONY_MIX.time():
+            combos = mix_notes(melody[notes[b0:b1]], note_lens[b0:b1], events[lo:hi], table, first=b0).astype(np.float32)
+
+        for r in range(b1 - b0):
+            if log_notes:
+                logger.debug("Note %d/%d: %s", first+b0+r+1, digits, DIGIT_TO_KEY[int(notes[b0+r])])
+            yield combos[r, :note_lens[b0+r]]
+
+def iter_pi_segments(
+    digits: int = 100,
+    duration: float = 0.5,
+    crossfade: float = 0.05,
+    key_root: str = "C4",
+    harmony_type: str = "third",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE,
+    first: int = 0,
+    last: int | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Renders the harmonized π melody one note at a time.
+
+    Each yielded segment is final (already crossfaded with the next note) but
+    not normalized; concatenating them gives the full piece.
+
+    Args:
+      first (int): index of the first melody note to render. Its head is not
+        crossfaded, as if it started the piece.
+      last (int | None): index one past the last note to render
+      other args: see play_pi_sequence_with_harmony.
+
+    Yields:
+      np.ndarray: float32 output samples for one melody note
+    """
+    sample_rate = 44100
+    xf_max = int(sample_rate * crossfade)
+    prev_wave = None
+    for combo in iter_pi_notes(
+        digits=digits,
+        duration=duration,
+        crossfade=crossfade,
+        key_root=key_root,
+        harmony_type=harmony_type,
+        harmony_speed=harmony_speed,
+        octave_doubling=octave_doubling,
+        harmony_movement=harmony_movement,
+        seed=seed,
+        engine=engine,
+        first=first,
+        last=last,
+    ):
+        # Crossfade with previous (same blend as CrossfadeAssembler.add)
         if prev_wave is not None:
-            xf = min(len(prev_wave), int(sample_rate * crossfade))
+            xf = min(len(prev_wave), xf_max)
             if xf > 0:
-                fade = np.sin(np.linspace(0, np.pi/2, xf))**2
-                prev_wave[-xf:] = prev_wave[-xf:]*(1-fade) + combo[:xf]*fade
+                with _CROSSFADE.time():
+                    fade = crossfade_curve(xf)
+                    prev_wave[-xf:] = prev_wave[-xf:]*(1-fade) + combo[:xf]*fade
                 combo = combo[xf:]
-            combined_segments.append(prev_wave)
+            yield prev_wave
 
         prev_wave = combo
 
     # append last
     if prev_wave is not None:
-        combined_segments.append(prev_wave)
+        yield prev_wave
+
+def peak_bound(
+    note_len: int,
+    voice_len: int,
+    harmony_speed: int,
+    octave_doubling: bool,
+    amplitude: float = 0.5
+) -> float:
+    """
+    Upper bound on |sample| of the un-normalized harmonized melody.
 
-    # 4) Concatenate & normalize
-    if not combined_segments:
+    Tones never exceed `amplitude`, crossfades are convex blends, so the
+    bound is the largest sum of voice gains overlapping any one sample of a
+    note, using the same placement as iter_pi_segments.
+    """
+    voices = []
+    for h in range(harmony_speed):
+        start = int(h * note_len / harmony_speed)
+        voices.append((start, min(note_len, start + voice_len), 0.8))
+        if octave_doubling:
+            voices.append((0, min(note_len, voice_len), 0.6))
+    gains = [
+        sum(g for a, b, g in voices if a <= pos < b)
+        for pos in {a for a, _, _ in voices} | {0}
+    ]
+    return amplitude * (1.0 + max(gains)) / 2.0
+
+# How iter_pi_waveform scales its output into [-1, 1]
+NORMALIZE_MODES = ("bound", "peak")
+
+def iter_pi_waveform(
+    digits: int = 100,
+    duration: float = 0.5,
+    crossfade: float = 0.05,
+    key_root: str = "C4",
+    harmony_type: str = "third",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+    normalize: str = "bound",
+    engine: str = DEFAULT_ENGINE,
+    start: int = 0,
+    stop: int | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Streams the normalized π melody as float32 chunks, one per note.
+
+    Args:
+      normalize (str): "bound" scales by peak_bound() so the first chunk is
+        ready after one note; "peak" renders twice, first to find the exact
+        peak, and matches play_pi_sequence_with_harmony sample for sample.
+      start (int): first output sample to stream
+      stop (int | None): output sample to stop at; the end by default. A
+        window renders only the notes overlapping it (see window_notes),
+        though "peak" still needs a full first pass.
+      other args: see play_pi_sequence_with_harmony.
+
+    Yields:
+      np.ndarray: float32 samples in [-1, 1]
+    """
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"Unknown normalize: {normalize}")
+    if harmony_movement == "random" and seed is None:
+        # The peak pass and the output pass must draw the same harmony
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+    params = dict(
+        digits=digits,
+        duration=duration,
+        crossfade=crossfade,
+        key_root=key_root,
+        harmony_type=harmony_type,
+        harmony_speed=harmony_speed,
+        octave_doubling=octave_doubling,
+        harmony_movement=harmony_movement,
+        seed=seed,
+        engine=engine,
+    )
+    sample_rate = 44100
+    if normalize == "peak":
+        peak = max((max(seg.max(), -seg.min()) for seg in iter_pi_segments(**params) if len(seg)), default=0.0) or 1.0
+    else:
+        note_len = len(TONE_BANK.tone(PIANO_KEYS[DIGIT_TO_KEY[0]], duration, sample_rate, engine=engine))
+        voice_len = int(sample_rate * duration / harmony_speed)
+        peak = peak_bound(note_len, voice_len, harmony_speed, octave_doubling)
+
+    if start > 0 or stop is not None:
+        yield from _iter_window(params, start, stop, peak)
+        return
+
+    for seg in iter_pi_segments(**params):
+        with _NORMALIZE.time():
+            seg /= peak  # segments are fresh float32 output, safe to scale in place
+        yield seg
+
+def _iter_window(params: dict, start: int, stop: int | None, peak: float) -> Iterator[np.ndarray]:
+    """
+    Output samples [start, stop) of the piece, normalized by `peak`.
+
+    The overlapping notes are crossfaded into a window-sized buffer with the
+    same layout as the full render, so the samples match it exactly; each
+    part is yielded as soon as no later note blends into it.
+    """
+    sample_rate = 44100
+    _, melody_lens = melody_table(params["duration"], sample_rate, params["engine"])
+    fades, seg_lens = crossfade_layout(melody_lens[pi_digits(params["digits"])], int(sample_rate * params["crossfade"]))
+    total = int(seg_lens.sum())
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return
+
+    first, last, origin = window_notes(fades, seg_lens, start, stop)
+    buf = np.empty(int(seg_lens[first:last].sum()), dtype=np.float32)
+    assembler = CrossfadeAssembler(buf)
+    emitted, limit = start - origin, stop - origin
+    for k, note in enumerate(iter_pi_notes(**params, first=first, last=last), first):
+        if k == first:
+            # Its head belongs to the previous note's tail, outside the window
+            assembler.add(note[fades[k]:])
+        else:
+            assembler.add(note, int(fades[k]))
+        final = min(assembler.pos - (int(fades[k + 1]) if k + 1 < last else 0), limit)
+        if final > emitted:
+            out = buf[emitted:final]
+            with _NORMALIZE.time():
+                out /= peak
+            yield out
+            emitted = final
+        if emitted >= limit:
+            break
+
+def play_pi_sequence_with_harmony(
+    digits: int = 100,
+    duration: float = 0.5,
+    crossfade: float = 0.05,
+    key_root: str = "C4",
+    harmony_type: str = "third",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    return_wave: bool = False,
+    seed: int | None = None,
+    engine: str = DEFAULT_ENGINE,
+    checkpoint: Callable[[], None] | None = None,
+    sink=None,
+    blocking: bool = True
+) -> np.ndarray | Playback | None:
+    """
+    Plays—or returns—the first `digits` of π as a harmonized piano melody.
+    
+    Args:
+      digits (int): how many π digits to use
+      duration (float): seconds per melody note
+      crossfade (float): overlap duration between notes
+      key_root (str): root note for harmony (e.g. "C4")
+      harmony_type (str): "third", "fifth", or "sixth"
+      harmony_speed (int): harmony note rate multiplier
+      octave_doubling (bool): also play harmony +1 octave
+      harmony_movement (str): "random", "intervals", or "chordal"
+      return_wave (bool): if True, *do not* play but return waveform array
+      seed (int | None): seed for "random" movement, making it reproducible
+      engine (str): synthesis engine, see pi.synthesis
+      checkpoint (callable | None): called before every note; raise from it
+        to abandon the render (see pi.render_pool)
+      sink: audio sink when playing, see pi.playback
+      blocking (bool): when playing, wait until the melody has played
+
+    Returns:
+      np.ndarray: if return_wave=True, the full normalized float32 waveform
+        (None if there is nothing to render)
+      Playback: if return_wave=False, the handle of the playback, rendered
+        note by note on its producer thread while it plays. Playback is
+        normalized by peak_bound (see iter_pi_waveform), so it can be a
+        little quieter than the returned waveform.
+    """
+    sample_rate = 44100
+    params = dict(
+        digits=digits,
+        duration=duration,
+        crossfade=crossfade,
+        key_root=key_root,
+        harmony_type=harmony_type,
+        harmony_speed=harmony_speed,
+        octave_doubling=octave_doubling,
+        harmony_movement=harmony_movement,
+        seed=seed,
+        engine=engine,
+    )
+
+    if not return_wave:
+        # Bound normalization needs no first pass, so the first note plays
+        # while the rest of the piece renders
+        def render(cancelled):
+            for chunk in iter_pi_waveform(**params, normalize="bound"):
+                cancelled()
+                if checkpoint is not None:
+                    checkpoint()
+                yield chunk
+        return _start(render, sink, blocking)
+
+    # 4) Lay out the piece, then write every note into one float32 buffer
+    _, melody_lens = melody_table(duration, sample_rate, engine)
+    fades, seg_lens = crossfade_layout(melody_lens[pi_digits(digits)], int(sample_rate * crossfade))
+    if not len(seg_lens):
         logger.debug("No waveform generated.")
         return None
-    full_wave = np.concatenate(combined_segments)
-    max_a = np.max(np.abs(full_wave)) or 1.0
-    full_wave = full_wave / max_a
-    logger.debug(f"Built waveform length={len(full_wave)} samples")
-
-    # 5) Return or play
-    if return_wave:
-        return full_wave
-
-    # otherwise play it
-    pcm = (full_wave * 32767).astype(np.int16)
-    logger.debug("Playing audio…")
-    obj = sa.play_buffer(pcm, num_channels=1, bytes_per_sample=2, sample_rate=sample_rate)
-    obj.wait_done()
-    return None
\ No newline at end of file
+    full_wave = np.empty(int(seg_lens.sum()), dtype=np.float32)
+    assembler = CrossfadeAssembler(full_wave)
+    for combo, fade in zip(iter_pi_notes(**params), fades):
+        if checkpoint is not None:
+            checkpoint()
+        assembler.add(combo, fade)
+    normalize_in_place(full_wave)
+    logger.debug("Built waveform length=%d samples", len(full_wave))
+    return full_wave
@@ -0,0 +1,430 @@
+import asyncio
+import os
+import threading
+import wave
+from concurrent.futures import Future
+from typing import Callable, Iterable
+
+import numpy as np
+
+from pi.encoding import pcm16
+from pi.render_pool import RenderCancelled
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sink used when a play_* helper isn't given one: "simpleaudio",
+# "sounddevice" for gapless streaming, or "null" on headless machines
+DEFAULT_SINK = os.environ.get("PI_PLAYBACK_SINK", "simpleaudio")
+
+
+def _simpleaudio():
+    # Imported on first playback only: servers never play audio locally, and
+    # headless machines may not have the library or an audio device
+    try:
+        import simpleaudio
+    except ImportError as exc:
+        raise RuntimeError("Local playback needs the simpleaudio package") from exc
+    return simpleaudio
+
+
+def _sounddevice():
+    try:
+        import sounddevice
+    except ImportError as exc:
+        raise RuntimeError("Streaming playback needs the sounddevice package") from exc
+    return sounddevice
+
+
+# Audio sinks. A sink is opened once per playback, then `write` is called
+# with consecutive blocks of normalized float32 samples and may block until
+# the output can take more; `close` waits for everything written to play,
+# `abort` stops as soon as possible.
+
+
+class SimpleAudioSink:
+    """
+    The local audio device, through simpleaudio.
+
+    simpleaudio can only play whole buffers, so blocks are gathered into
+    short buffers of `buffer_seconds` (a block or two) and `write` starts
+    each one as soon as the previous one has played, waiting for it. The
+    sink therefore takes audio in real time: the ring buffer in front of
+    it stays full and underruns are real. Starting a buffer leaves a short
+    gap after the previous one; use SoundDeviceSink for gapless playback.
+
+    Args:
+        buffer_seconds (float): audio per simpleaudio buffer.
+    """
+
+    name = "simpleaudio"
+
+    def __init__(self, buffer_seconds: float = 0.5):
+        self.buffer_seconds = buffer_seconds
+        self._sa = None
+        self._playing = None
+        self._pending: list[np.ndarray] = []
+        self._queued = 0
+        self.sample_rate = 44100
+
+    def open(self, sample_rate: int):
+        self._sa = _simpleaudio()
+        self.sample_rate = sample_rate
+
+    def write(self, samples: np.ndarray):
+        self._pending.append(pcm16(samples))
+        self._queued += len(samples)
+        if self._queued >= self.buffer_seconds * self.sample_rate:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pcm = np.concatenate(self._pending)
+        self._pending, self._queued = [], 0
+        if self._playing is not None:
+            self._playing.wait_done()
+        self._playing = self._sa.play_buffer(pcm, num_channels=1, bytes_per_sample=2, sample_rate=self.sample_rate)
+
+    def close(self):
+        self._flush()
+        if self._playing is not None:
+            self._playing.wait_done()
+
+    def abort(self):
+        self._pending, self._queued = [], 0
+        if self._playing is not None:
+            self._playing.stop()
+
+
+class SoundDeviceSink:
+    """
+    The local audio device as a continuous output stream, through
+    sounddevice: `write` blocks only while the device buffer is full, so
+    blocks play back to back without gaps.
+    """
+
+    name = "sounddevice"
+
+    def __init__(self):
+        self._stream = None
+
+    def open(self, sample_rate: int):
+        self._stream = _sounddevice().OutputStream(samplerate=sample_rate, channels=1, dtype="float32")
+        self._stream.start()
+
+    def write(self, samples: np.ndarray):
+        self._stream.write(np.ascontiguousarray(samples, dtype=np.float32).reshape(-1, 1))
+
+    def close(self):
+        if self._stream is not None:
+            # stop() lets the queued audio play out
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def abort(self):
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream.close()
+            self._stream = None
+
+
+class NullSink:
+    """
+    Discards samples, for headless machines and tests.
+
+    Args:
+        realtime (bool): take as long as a device would to play each block,
+            so underruns behave as they would on real hardware.
+    """
+
+    name = "null"
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+        self.samples = 0
+        self.sample_rate = 44100
+        self._aborted = threading.Event()
+
+    def open(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def write(self, samples: np.ndarray):
+        self.samples += len(samples)
+        if self.realtime:
+            self._aborted.wait(len(samples) / self.sample_rate)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self._aborted.set()
+
+
+class FileSink:
+    """
+    Writes a mono 16-bit WAV file instead of playing.
+
+    Args:
+        path (str): file to create.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def open(self, sample_rate: int):
+        self._file = wave.open(self.path, "wb")
+        self._file.setnchannels(1)
+        self._file.setsampwidth(2)
+        self._file.setframerate(sample_rate)
+
+    def write(self, samples: np.ndarray):
+        self._file.writeframes(pcm16(samples).tobytes())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def abort(self):
+        self.close()
+
+
+SINKS = {sink.name: sink for sink in (SimpleAudioSink, SoundDeviceSink, NullSink, FileSink)}
+
+
+def get_sink(name: str = DEFAULT_SINK, **kwargs):
+    """Create a sink by name, raising ValueError if unknown."""
+    try:
+        return SINKS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown playback sink: {name}") from None
+
+
+class RingBuffer:
+    """
+    Bounded single-producer, single-consumer FIFO of float32 samples.
+
+    `write` blocks while the buffer is full and `read` while it is empty,
+    so a producer rendering ahead is held at most `capacity` samples in
+    front of the consumer.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._buf = np.empty(self.capacity, dtype=np.float32)
+        self._read = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def write(self, samples: np.ndarray, cancelled: threading.Event) -> bool:
+        """Append all of `samples`; False if cancelled or closed first."""
+        pos = 0
+        while pos < len(samples):
+            with self._cond:
+                while self._size == self.capacity and not (self._closed or cancelled.is_set()):
+                    self._cond.wait(0.05)
+                if self._closed or cancelled.is_set():
+                    return False
+                n = min(len(samples) - pos, self.capacity - self._size)
+                start = (self._read + self._size) % self.capacity
+                first = min(n, self.capacity - start)
+                self._buf[start:start + first] = samples[pos:pos + first]
+                self._buf[:n - first] = samples[pos + first:pos + n]
+                self._size += n
+                pos += n
+                self._cond.notify_all()
+        return True
+
+    def read(self, n: int, timeout: float | None = None) -> np.ndarray | None:
+        """
+        Remove and return up to `n` samples, waiting up to `timeout` for
+        any to arrive. Returns an empty array on timeout, None once the
+        buffer is closed and drained.
+        """
+        with self._cond:
+            if not self._size and not self._closed:
+                self._cond.wait(timeout)
+            if not self._size:
+                return None if self._closed else np.zeros(0, dtype=np.float32)
+            n = min(n, self._size)
+            first = min(n, self.capacity - self._read)
+            out = np.concatenate([self._buf[self._read:self._read + first], self._buf[:n - first]])
+            self._read = (self._read + n) % self.capacity
+            self._size -= n
+            self._cond.notify_all()
+            return out
+
+    def close(self):
+        """No more writes; readers drain what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Playback:
+    """
+    Handle of one playback started by `play`.
+
+    Wait for it with `wait()` or `await playback`, stop it with `cancel()`,
+    and check `underruns`: how often the sink was starved because
+    rendering fell behind.
+    """
+
+    def __init__(self, source: Callable[[Callable[[], None]], Iterable[np.ndarray]], sink, sample_rate: int,
+                 buffer_seconds: float, block_seconds: float):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.block = max(1, int(sample_rate * block_seconds))
+        self.underruns = 0
+        self.rendered = 0
+        self.played = 0
+        self._ring = RingBuffer(max(self.block, int(sample_rate * buffer_seconds)))
+        self._cancelled = threading.Event()
+        self._producer_error: BaseException | None = None
+        self._finished: Future = Future()
+        self._producer = threading.Thread(target=self._produce, args=(source,), name="pi-playback-render",
+                                          daemon=True)
+        self._consumer = threading.Thread(target=self._consume, name="pi-playback-sink", daemon=True)
+        self._producer.start()
+        self._consumer.start()
+
+    def _check(self):
+        if self._cancelled.is_set():
+            raise RenderCancelled()
+
+    def _produce(self, source: Callable[[Callable[[], None]], Iterable[np.ndarray]]):
+        try:
+            for chunk in source(self._check):
+                if not self._ring.write(np.asarray(chunk, dtype=np.float32), self._cancelled):
+                    break
+                self.rendered += len(chunk)
+        except RenderCancelled:
+            pass
+        except BaseException as exc:
+            logger.warning("Playback render failed: %s", exc)
+            self._producer_error = exc
+        finally:
+            self._ring.close()
+
+    def _consume(self):
+        try:
+            self.sink.open(self.sample_rate)
+            starved = False
+            while not self._cancelled.is_set():
+                # Nothing queued behind the block the sink just took means
+                # rendering fell behind: one underrun per starvation, however
+                # long it lasts, and none before the first block
+                if self.played and not starved and not len(self._ring) and not self._ring.closed:
+                    self.underruns += 1
+                    starved = True
+                    logger.debug("Playback underrun after %d samples", self.played)
+                block = self._ring.read(self.block, timeout=0.05)
+                if block is None:
+                    break
+                if not len(block):
+                    continue
+                starved = False
+                self.sink.write(block)
+                self.played += len(block)
+            if self._cancelled.is_set():
+                self.sink.abort()
+            else:
+                self.sink.close()
+        except BaseException as exc:
+            self._cancelled.set()
+            self._finished.set_exception(exc)
+            return
+        if self._producer_error is not None:
+            self._finished.set_exception(self._producer_error)
+        else:
+            self._finished.set_result(None)
+
+    @property
+    def done(self) -> bool:
+        return self._finished.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop rendering and playing as soon as possible."""
+        self._cancelled.set()
+        self._ring.close()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until playback has finished; re-raises a render or sink error.
+
+        Returns:
+            bool: False if `timeout` passed first.
+        """
+        try:
+            self._finished.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def __await__(self):
+        return asyncio.wrap_future(self._finished).__await__()
+
+    def stats(self) -> dict:
+        return {
+            "sink": self.sink.name,
+            "rendered": self.rendered,
+            "played": self.played,
+            "buffered": len(self._ring),
+            "underruns": self.underruns,
+            "cancelled": self.cancelled,
+            "done": self.done,
+        }
+
+
+def play(
+    source: Callable[[Callable[[], None]], Iterable[np.ndarray]],
+    sample_rate: int = 44100,
+    sink=None,
+    buffer_seconds: float = 2.0,
+    block_seconds: float = 0.25,
+) -> Playback:
+    """
+    Start playing without blocking the caller.
+
+    A producer thread calls `source(checkpoint)` and renders its chunks up to
+    `buffer_seconds` ahead into a ring buffer, while a consumer thread
+    feeds the sink `block_seconds` at a time, so rendering and playback
+    overlap.
+
+    Args:
+        source: returns the normalized float32 chunks to play; called on
+            the producer thread, so rendering never runs on the caller's.
+            The checkpoint it gets raises RenderCancelled once the playback
+            is cancelled, to stop long renders early.
+        sink: see SINKS; a DEFAULT_SINK by default.
+
+    Returns:
+        Playback: the handle to wait for, await, cancel or inspect.
+    """
+    return Playback(source, get_sink() if sink is None else sink, sample_rate, buffer_seconds, block_seconds)
+
+
+def play_wave(wave: np.ndarray, sample_rate: int = 44100, sink=None, blocking: bool = True) -> Playback:
+    """Play normalized samples; by default waits until they have played."""
+    playback = play(lambda checkpoint: [wave], sample_rate, sink)
+    if blocking:
+        playback.wait()
+    return playback
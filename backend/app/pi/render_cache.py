@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the synthesis code alters rendered samples, so
+# stale disk entries and browser ETags stop matching.
+RENDER_VERSION = 3
+
+# Accepted by the render functions but never change a sample
+UNUSED_PARAMS = frozenset({"harmony_type"})
+
+
+def render_key(**params) -> str:
+    """
+    Return a stable hex digest for a full render parameter set.
+
+    The digest doubles as the strong ETag of the rendered bytes, since a given
+    parameter tuple always renders the same samples. UNUSED_PARAMS are left
+    out, so renders differing only in them share an entry.
+    """
+    items = ",".join(f"{name}={params[name]!r}" for name in sorted(params) if name not in UNUSED_PARAMS)
+    return hashlib.sha256(f"v{RENDER_VERSION}:{items}".encode()).hexdigest()[:32]
+
+
+class RenderCache:
+    """
+    Bounded cache of rendered float32 waveforms keyed by `render_key`.
+
+    The memory tier is an LRU bounded by total sample bytes. The optional disk
+    tier stores raw float32 files that are memory-mapped read-only on a hit,
+    so warm entries survive restarts without being read into the heap.
+
+    Args:
+        max_bytes (int): memory tier ceiling.
+        directory (str | None): disk tier location; disabled when None.
+        max_disk_bytes (int): disk tier ceiling, oldest files removed first.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        directory: str | None = None,
+        max_disk_bytes: int = 2 * 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Return the cached float32 waveform for `key`, or None on a miss."""
+        with self._lock:
+            wave = self._entries.get(key)
+            if wave is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return wave
+
+        wave = self._load(key)
+        with self._lock:
+            if wave is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, wave)
+        return wave
+
+    def put(self, key: str, wave: np.ndarray) -> np.ndarray:
+        """
+        Store a rendered waveform and return the cached read-only float32 copy.
+        """
+        wave = np.ascontiguousarray(wave, dtype=np.float32)
+        wave.flags.writeable = False
+        with self._lock:
+            self._insert(key, wave)
+        if self.directory:
+            self._store(key, wave)
+        return wave
+
+    def _insert(self, key: str, wave: np.ndarray):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if wave.nbytes > self.max_bytes:
+            return
+        self._entries[key] = wave
+        self._bytes += wave.nbytes
+        while self._bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.f32")
+
+    def _load(self, key: str) -> np.ndarray | None:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if os.path.getsize(path) == 0:
+                return np.zeros(0, dtype=np.float32)
+            wave = np.memmap(path, dtype=np.float32, mode="r")
+            os.utime(path)  # keep recently used files away from disk eviction
+        except OSError:
+            return None
+        return wave
+
+    def _store(self, key: str, wave: np.ndarray):
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        try:
+            wave.tofile(tmp)
+            os.replace(tmp, path)
+            self._trim_disk()
+        except OSError as exc:
+            logger.warning("Could not write render cache file %s: %s", path, exc)
+
+    def _trim_disk(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".f32"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+RENDER_CACHE = RenderCache(
+    max_bytes=int(os.environ.get("PI_RENDER_CACHE_BYTES", 256 * 1024 * 1024)),
+    directory=os.environ.get("PI_RENDER_CACHE_DIR"),
+    max_disk_bytes=int(os.environ.get("PI_RENDER_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024)),
+)
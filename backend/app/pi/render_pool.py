@@ -0,0 +1,234 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from metrics import RENDER_JOBS, RENDER_REJECTED
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# At least two, so a heavy render never holds the only worker
+RENDER_WORKERS = int(os.environ.get("PI_RENDER_WORKERS", max(2, min(4, os.cpu_count() or 1))))
+RENDER_QUEUE_DEPTH = int(os.environ.get("PI_RENDER_QUEUE_DEPTH", 16))
+# Costs are in voice-seconds of audio (see render_cost)
+HEAVY_RENDER_COST = float(os.environ.get("PI_RENDER_HEAVY_COST", 1000))
+MAX_RENDER_COST = float(os.environ.get("PI_RENDER_MAX_COST", 30000))
+# Mixing a tone has a fixed overhead however short it is; costed as this
+# many voice-seconds
+MIN_TONE_COST = 0.02
+
+
+class RenderRejected(Exception):
+    """A render was not admitted. `retry_after` is None if retrying can't help."""
+
+    def __init__(self, message: str, retry_after: int | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render whose client went away."""
+
+
+def render_cost(notes: int, duration: float, octave_doubling: bool = False, harmony_speed: int = 1) -> float:
+    """
+    Estimated cost of a π render in voice-seconds: every melody note, plus
+    its `harmony_speed` harmony voices and their octave doubles when
+    enabled. Voices last duration / harmony_speed but cost at least
+    MIN_TONE_COST each, so fast harmony is costed by its tone count.
+
+    Args:
+        notes (int): melody notes the render will actually produce.
+
+    Raises:
+        ValueError: for a negative note count or duration, or a harmony
+            speed below 1, which would otherwise slip under every
+            admission limit.
+    """
+    if notes < 0 or duration < 0 or harmony_speed < 1:
+        raise ValueError(f"Render cost of {notes} notes of {duration} s at harmony speed {harmony_speed} is undefined")
+    tones = harmony_speed * (2 if octave_doubling else 1)
+    return notes * (duration + tones * max(duration / harmony_speed, MIN_TONE_COST))
+
+
+class RenderJob:
+    """
+    An admitted render. Holds its admission slot until the work finishes or
+    is abandoned; `cancel` asks the work to stop at its next checkpoint.
+    """
+
+    def __init__(self, pool: "RenderPool", cost: float):
+        self.pool = pool
+        self.cost = cost
+        self.heavy = cost >= pool.heavy_cost
+        self.cancelled = threading.Event()
+        self._released = False
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        """Checkpoint for cooperative cancellation."""
+        if self.cancelled.is_set():
+            raise RenderCancelled()
+
+    def release(self):
+        self.pool._release(self)
+
+
+class RenderPool:
+    """
+    Bounded thread pool for π renders, so a large render never runs on the
+    event loop and a burst of them can't take over the process.
+
+    At most `workers` renders run at once and `queue_depth` more wait;
+    beyond that `admit` fails fast with a Retry-After estimate. Renders
+    costing at least `heavy_cost` may hold only `heavy_slots` of the
+    running+queued places, so some workers are always left for small
+    requests; renders above `max_cost` are refused outright.
+
+    Renders stop cooperatively, wherever they call RenderJob.check.
+
+    Args:
+        workers (int): concurrent renders.
+        queue_depth (int): admitted renders allowed to wait for a worker.
+        heavy_cost (float): cost from which a render counts as heavy.
+        heavy_slots (int | None): heavy renders admitted at once; defaults
+            to half the workers.
+        max_cost (float): largest admissible render cost.
+    """
+
+    def __init__(
+        self,
+        workers: int = RENDER_WORKERS,
+        queue_depth: int = RENDER_QUEUE_DEPTH,
+        heavy_cost: float = HEAVY_RENDER_COST,
+        heavy_slots: int | None = None,
+        max_cost: float = MAX_RENDER_COST,
+    ):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.heavy_cost = heavy_cost
+        self.heavy_slots = max(1, self.workers // 2) if heavy_slots is None else heavy_slots
+        self.max_cost = max_cost
+        self.admitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._pending = 0
+        self._running = 0
+        self._heavy = 0
+        # Smoothed seconds per render, for Retry-After
+        self._job_seconds = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pi-render")
+
+    def admit(self, cost: float) -> RenderJob:
+        """
+        Reserve a place for a render of the given cost.
+
+        Raises:
+            RenderRejected: when the pool is saturated, or the render is too
+                expensive to ever admit (retry_after None).
+        """
+        self.check_cost(cost)
+        job = RenderJob(self, cost)
+        with self._lock:
+            full = self._pending >= self.workers + self.queue_depth
+            if not full and not (job.heavy and self._heavy >= self.heavy_slots):
+                self._pending += 1
+                self._heavy += job.heavy
+                self.admitted += 1
+                RENDER_JOBS.set(self._pending - self._running, state="queued")
+                return job
+            retry_after = self._retry_after()
+        self._reject("saturated" if full else "heavy")
+        raise RenderRejected("Render queue is full", retry_after)
+
+    def check_cost(self, cost: float):
+        """
+        Refuse a render that could never be admitted, without reserving
+        anything; cheap enough to run before any other work on a request.
+
+        Raises:
+            RenderRejected: with retry_after None, if cost exceeds max_cost.
+        """
+        if cost > self.max_cost:
+            self._reject("too_expensive")
+            raise RenderRejected(f"Render cost {cost:.0f} exceeds the limit of {self.max_cost:.0f}")
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.rejected += 1
+        RENDER_REJECTED.inc(reason=reason)
+
+    def _retry_after(self) -> int:
+        # Time until the queue ahead of a new request has drained once
+        return max(1, math.ceil(self._job_seconds * self._pending / self.workers))
+
+    def _release(self, job: RenderJob):
+        with self._lock:
+            if job._released:
+                return
+            job._released = True
+            self._pending -= 1
+            self._heavy -= job.heavy
+            RENDER_JOBS.set(self._pending - self._running, state="queued")
+
+    def _execute(self, job: RenderJob, fn: Callable, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            RENDER_JOBS.set(self._running, state="running")
+            RENDER_JOBS.set(self._pending - self._running, state="queued")
+        try:
+            job.check()
+            return fn(*args)
+        except RenderCancelled:
+            with self._lock:
+                self.cancelled += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._job_seconds = 0.8 * self._job_seconds + 0.2 * elapsed
+                RENDER_JOBS.set(self._running, state="running")
+            job.release()
+
+    def submit(self, job: RenderJob, fn: Callable[[RenderJob], object]) -> Future:
+        """Run `fn(job)` on the pool; the job's slot is released when it returns."""
+        return self._executor.submit(self._execute, job, fn, job)
+
+    async def run(self, job: RenderJob, fn: Callable[[RenderJob], object]):
+        """
+        Run `fn(job)` on the pool. If the caller is cancelled, so is the job,
+        which then stops at its next checkpoint.
+        """
+        future = asyncio.wrap_future(self.submit(job, fn))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "heavy": self._heavy,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "job_seconds": self._job_seconds,
+            }
+
+
+RENDER_POOL = RenderPool()
@@ -0,0 +1,102 @@
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+# Kaiser-windowed sinc: zero crossings per filter side, window shape and
+# passband edge as a fraction of the output Nyquist frequency.
+FILTER_ZEROS = 16
+KAISER_BETA = 8.6
+ROLLOFF = 0.92
+
+# Output samples computed per vectorized gather, bounding scratch memory.
+BLOCK_SAMPLES = 4096
+
+
+@lru_cache(maxsize=16)
+def polyphase_filter(up: int, down: int) -> tuple[np.ndarray, int]:
+    """
+    Low-pass interpolation kernel for resampling by up/down, one row per phase.
+
+    Output sample n sits at input position n * down / up. Its integer part
+    selects the input window, its fractional part (n * down % up) / up the
+    row. The cutoff sits below the lower of the two Nyquist frequencies, so
+    downsampling does not alias.
+
+    Returns:
+        tuple: (read-only (up, 2 * half) table, half) where row p weights the
+            inputs floor(position) - half + 1 ... floor(position) + half.
+    """
+    cutoff = 0.5 * min(1.0, up / down) * ROLLOFF  # cycles per input sample
+    half = int(np.ceil(FILTER_ZEROS / (2 * cutoff)))
+    offsets = np.arange(-half + 1, half + 1)[None, :] - (np.arange(up) / up)[:, None]
+    x = np.clip(offsets / half, -1.0, 1.0)
+    window = np.i0(KAISER_BETA * np.sqrt(1.0 - x * x)) / np.i0(KAISER_BETA)
+    table = 2 * cutoff * np.sinc(2 * cutoff * offsets) * window
+    table /= table.sum(axis=1, keepdims=True)  # unit gain at DC for every phase
+    table.flags.writeable = False
+    return table, half
+
+
+class Resampler:
+    """
+    Streaming band-limited resampler between two integer sample rates.
+
+    Feed chunks of any size to process(); call flush() once at the end.
+    The concatenated output is independent of how the input was chunked and
+    holds ceil(len(input) * rate_out / rate_in) samples, aligned so output
+    sample n corresponds to input time n / rate_out.
+    """
+
+    def __init__(self, rate_in: int, rate_out: int):
+        ratio = Fraction(rate_out, rate_in)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        self.table, self.half = polyphase_filter(self.up, self.down)
+        self._taps = np.arange(-self.half + 1, self.half + 1)
+        # Input history: global index of _x[0], starting in the zero padding
+        self._x = np.zeros(self.half - 1)
+        self._x0 = -(self.half - 1)
+        self._n = 0
+        self._consumed = 0
+
+    def output_length(self, input_length: int) -> int:
+        return -(-input_length * self.up // self.down)
+
+    def _emit(self, stop: int) -> np.ndarray:
+        """Output samples self._n ... stop - 1, whose inputs are all in _x."""
+        out = np.empty(max(0, stop - self._n))
+        for b0 in range(0, len(out), BLOCK_SAMPLES):
+            n = self._n + b0 + np.arange(min(BLOCK_SAMPLES, len(out) - b0))
+            base, phase = np.divmod(n * self.down, self.up)
+            window = self._x[base[:, None] + self._taps - self._x0]
+            out[b0:b0 + len(n)] = np.einsum("ij,ij->i", window, self.table[phase])
+        self._n = max(self._n, stop)
+        # Drop history no later output will read
+        keep = (self._n * self.down) // self.up - self.half + 1 - self._x0
+        if keep > 0:
+            self._x = self._x[keep:]
+            self._x0 += keep
+        return out
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample the next chunk; returns every output sample now computable."""
+        self._x = np.concatenate([self._x, chunk])
+        self._consumed += len(chunk)
+        available = self._x0 + len(self._x)  # inputs known: [.., available)
+        # Output n reads inputs up to floor(n * down / up) + half
+        stop = -(-(available - self.half) * self.up // self.down)
+        return self._emit(max(self._n, stop))
+
+    def flush(self) -> np.ndarray:
+        """Finish the stream, treating the input as zero past its end."""
+        stop = self.output_length(self._consumed)
+        self._x = np.concatenate([self._x, np.zeros(self.half)])
+        return self._emit(stop)
+
+
+def resample(wave: np.ndarray, rate_in: int, rate_out: int) -> np.ndarray:
+    """Resample a whole waveform; returns float32 like the renders."""
+    if rate_in == rate_out:
+        return wave
+    resampler = Resampler(rate_in, rate_out)
+    return np.concatenate([resampler.process(wave), resampler.flush()]).astype(np.float32)
@@ -0,0 +1,351 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from metrics import stage
+from pi.digits import pi_digits
+from pi.mixer import OCTAVE_GAIN, VOICE_GAIN
+from pi.notes import DIGIT_TO_KEY, NOTE_NAMES, PIANO_KEYS, SCALE_STEPS
+
+_COMPILE = stage("score_compile")
+
+# Event pitches are piano key indices, A0 = 0 .. C8 = 87, a semitone apart
+KEY_NAMES = tuple(PIANO_KEYS)
+KEY_INDEX = {name: i for i, name in enumerate(KEY_NAMES)}
+FREQUENCIES = np.array([PIANO_KEYS[name] for name in KEY_NAMES])
+FREQUENCIES.flags.writeable = False
+DIGIT_KEYS = np.array([KEY_INDEX[DIGIT_TO_KEY[d]] for d in range(10)], dtype=np.int16)
+DIGIT_KEYS.flags.writeable = False
+
+# One tone of a compiled score, timed in melody notes:
+#   note:   melody note index
+#   step:   mixing order within the note (-1 melody, 2h octave double of
+#           voice h, 2h+1 voice h; see pi.mixer)
+#   key:    piano key index (see KEY_NAMES, FREQUENCIES)
+#   start:  onset, in melody notes from the start of the piece
+#   length: duration in melody notes
+#   gain:   scale applied to the tone before (melody + harmony) / 2
+SCORE_DTYPE = np.dtype([
+    ("note", np.int32),
+    ("step", np.int16),
+    ("key", np.int16),
+    ("start", np.float64),
+    ("length", np.float64),
+    ("gain", np.float32),
+])
+
+# The same tones placed in output samples (see Score.place)
+TIMED_DTYPE = np.dtype([
+    ("start", np.int64),
+    ("key", np.int16),
+    ("duration", np.int64),
+    ("gain", np.float32),
+])
+
+
+def generate_scale(root, scale_type="major", include_octaves=False):
+    """
+    Generates a scale based on the given root note and type.
+    
+    Args:
+        root (str): Root note (e.g., "C4").
+        scale_type (str): Type of scale ("major", "minor").
+        include_octaves (bool): If True, include all octaves of the scale.
+    
+    Returns:
+        list: List of note names in the scale.
+    """
+    return list(_scale(root, scale_type, include_octaves))
+
+
+@lru_cache(maxsize=256)
+def _scale(root: str, scale_type: str, include_octaves: bool) -> tuple[str, ...]:
+    # Find the index of the root
+    root_name, octave = root[:-1], root[-1:]
+
+    if root_name not in NOTE_NAMES or not octave.isdigit():
+        raise ValueError(f"Invalid root note: {root}")
+    octave = int(octave)
+
+    start_idx = NOTE_NAMES.index(root_name)
+    scale_steps = SCALE_STEPS["major"] if scale_type == "major" else SCALE_STEPS["minor"]
+    scale = [root]
+
+    current_idx = start_idx
+    for step in scale_steps:
+        current_idx = (current_idx + step) % 12
+        if current_idx < start_idx:
+            octave += 1  # Move to next octave
+        scale.append(f"{NOTE_NAMES[current_idx]}{octave}")
+
+    if include_octaves:
+        scale += [increase_octave(note) for note in scale]  # Add next octave
+
+    return tuple(scale)
+
+
+def increase_octave(note):
+    """
+    Increases a note by one octave.
+    
+    Args:
+        note (str): The note to shift up.
+    
+    Returns:
+        str: The same note one octave higher.
+    """
+    if len(note) < 2 or not note[-1].isdigit():
+        return note  # Return unchanged if invalid format
+
+    note_name = note[:-1]  # Extract "C", "D#", etc.
+    octave = int(note[-1]) + 1  # Increase octave
+
+    return f"{note_name}{octave}"  # Return shifted note
+
+
+def harmony_indices(
+    count: int,
+    harmony_speed: int,
+    scale_len: int,
+    harmony_movement: str = "chordal",
+    seed: int | None = None
+) -> np.ndarray:
+    """
+    Computes the scale index of every harmony voice for a whole piece up front.
+
+    Args:
+      count (int): number of melody notes
+      harmony_speed (int): harmony voices per melody note
+      scale_len (int): number of notes in the harmony scale
+      harmony_movement (str): "random", "intervals", or "chordal"
+      seed (int | None): seed for "random" movement; None draws fresh entropy
+
+    Returns:
+      np.ndarray: int array of shape (count, harmony_speed)
+    """
+    if harmony_movement == "random":
+        rng = np.random.default_rng(seed)
+        return rng.integers(0, scale_len, size=(count, harmony_speed))
+
+    step = 2 if harmony_movement == "intervals" else 3  # chordal or default
+    # The harmony position advances by harmony_speed every melody note
+    base = (np.arange(count) * harmony_speed) % scale_len
+    return (base[:, None] + np.arange(harmony_speed)[None, :] * step) % scale_len
+
+
+class Score:
+    """
+    The symbolic π melody: which key every melody note, harmony voice and
+    octave double plays, and when, in units of melody notes.
+
+    Compiled once per (digits, key, harmony) setting and independent of the
+    note duration, crossfade and synthesis engine, so renders differing only
+    in those reuse it. Everything is held in read-only NumPy arrays.
+
+    Attributes:
+        events (np.ndarray): SCORE_DTYPE rows sorted by note, then step.
+        digits (np.ndarray): the melody digits, one per note.
+        voice_key (np.ndarray): (notes, harmony_speed) key of every voice.
+        octave_key (np.ndarray): like voice_key, for the voices' octave
+            doubles; -1 where there is none.
+    """
+
+    def __init__(self, digits: np.ndarray, voice_key: np.ndarray, octave_key: np.ndarray):
+        self.digits = digits
+        self.voice_key = voice_key
+        self.octave_key = octave_key
+        self.harmony_speed = voice_key.shape[1]
+        self.events = self._events()
+        for array in (self.digits, self.voice_key, self.octave_key, self.events):
+            array.flags.writeable = False
+
+    def _events(self) -> np.ndarray:
+        notes, harmony_speed = self.voice_key.shape
+        note = np.repeat(np.arange(notes), harmony_speed)
+        h = np.tile(np.arange(harmony_speed), notes)
+        octave = self.octave_key.reshape(-1)
+        doubled = octave >= 0
+
+        melody = np.empty(notes, dtype=SCORE_DTYPE)
+        melody["note"] = np.arange(notes)
+        melody["step"] = -1
+        melody["key"] = DIGIT_KEYS[self.digits]
+        melody["start"] = melody["note"]
+        melody["length"] = 1.0
+        melody["gain"] = 1.0
+
+        voices = np.empty(len(note), dtype=SCORE_DTYPE)
+        voices["note"] = note
+        voices["step"] = 2 * h + 1
+        voices["key"] = self.voice_key.reshape(-1)
+        voices["start"] = note + h / harmony_speed
+        voices["length"] = 1.0 / harmony_speed
+        voices["gain"] = np.where(doubled, VOICE_GAIN * VOICE_GAIN, VOICE_GAIN)
+
+        # Octave doubles sound from the start of their note (see harmony_schedule)
+        doubles = np.empty(int(doubled.sum()), dtype=SCORE_DTYPE)
+        doubles["note"] = note[doubled]
+        doubles["step"] = 2 * h[doubled]
+        doubles["key"] = octave[doubled]
+        doubles["start"] = note[doubled]
+        doubles["length"] = 1.0 / harmony_speed
+        doubles["gain"] = OCTAVE_GAIN
+
+        events = np.concatenate([melody, voices, doubles])
+        return events[np.lexsort((events["step"], events["note"]))]
+
+    @property
+    def nbytes(self) -> int:
+        return self.digits.nbytes + self.voice_key.nbytes + self.octave_key.nbytes + self.events.nbytes
+
+    def place(self, note_lens: np.ndarray, fades: np.ndarray, seg_lens: np.ndarray, voice_len: int) -> np.ndarray:
+        """
+        Time every event in output samples, for one duration and crossfade.
+
+        Voices are placed exactly as harmony_schedule places them; tones
+        are taken at their nominal length and cut at the end of their note,
+        as when mixed.
+
+        Args:
+            note_lens (np.ndarray): length of every melody note.
+            fades, seg_lens (np.ndarray): the crossfade_layout of the notes.
+            voice_len (int): nominal length of a harmony tone.
+
+        Returns:
+            np.ndarray: TIMED_DTYPE rows in the order of `events`.
+        """
+        events = self.events
+        note = events["note"]
+        note_start = np.cumsum(seg_lens) - seg_lens - fades
+        # Voice h of a note starts h / harmony_speed into it, rounded down
+        voice = (events["step"] > 0) & (events["step"] % 2 == 1)
+        offset = np.where(voice, (events["step"] // 2) * note_lens[note] // self.harmony_speed, 0)
+        length = np.where(events["step"] < 0, note_lens[note], voice_len)
+
+        timed = np.empty(len(events), dtype=TIMED_DTYPE)
+        timed["start"] = note_start[note] + offset
+        timed["key"] = events["key"]
+        timed["duration"] = np.minimum(note_lens[note] - offset, length)
+        timed["gain"] = events["gain"]
+        return timed
+
+
+def compile_score(
+    digits: int = 100,
+    key_root: str = "C4",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+) -> Score:
+    """
+    Compile the π melody and its harmony into a Score.
+
+    Args: see pi.piano.play_pi_sequence_with_harmony.
+
+    Raises:
+        ValueError: if the key root is invalid or its scale leaves the piano.
+    """
+    with _COMPILE.time():
+        digit_seq = pi_digits(digits)
+        scale_notes = generate_scale(key_root, "major", include_octaves=True)
+        scale_keys = np.array([KEY_INDEX.get(note, -1) for note in scale_notes], dtype=np.int16)
+        voice_idx = harmony_indices(len(digit_seq), harmony_speed, len(scale_notes), harmony_movement, seed)
+        voice_key = scale_keys[voice_idx]
+        if np.any(voice_key < 0):
+            missing = scale_notes[int(voice_idx[voice_key < 0][0])]
+            raise ValueError(f"Scale note {missing} is outside the piano's range")
+
+        # One octave up is 12 keys up, while still on the keyboard
+        octave_key = np.full(voice_key.shape, -1, dtype=np.int16)
+        if octave_doubling:
+            octave_key = np.where(voice_key + 12 < len(KEY_NAMES), voice_key + 12, -1).astype(np.int16)
+        return Score(digit_seq, voice_key, octave_key)
+
+
+def score_args(
+    digits: int = 100,
+    key_root: str = "C4",
+    harmony_speed: int = 2,
+    octave_doubling: bool = False,
+    harmony_movement: str = "random",
+    seed: int | None = None,
+) -> dict:
+    """compile_score's arguments with their types normalized, so 100 and 100.0 or 1 and True compile once."""
+    return dict(
+        digits=int(digits),
+        key_root=str(key_root),
+        harmony_speed=int(harmony_speed),
+        octave_doubling=bool(octave_doubling),
+        harmony_movement=str(harmony_movement),
+        seed=None if seed is None else int(seed),
+    )
+
+
+def score_key(args: dict) -> tuple | None:
+    """Cache key of normalized score_args, None if the score can't be cached."""
+    # Unseeded random movement differs every time
+    if args["harmony_movement"] == "random" and args["seed"] is None:
+        return None
+    return tuple(args.values())
+
+
+class ScoreCache:
+    """
+    LRU of compiled scores, separate from the audio render cache: a score
+    is reused by every render of its melody whatever the duration,
+    crossfade or engine, and by the score endpoint.
+
+    Args:
+        max_bytes (int): ceiling on the total size of cached scores.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[tuple, Score] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, **params) -> Score:
+        """The score compile_score(**params) returns, compiled on a miss."""
+        args = score_args(**params)
+        key = score_key(args)
+        if key is not None:
+            with self._lock:
+                score = self._entries.get(key)
+                if score is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return score
+                self.misses += 1
+
+        score = compile_score(**args)
+        if key is None or score.nbytes > self.max_bytes:
+            return score
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = score
+            self._bytes += score.nbytes
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.nbytes
+        return score
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+SCORES = ScoreCache()
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Iterable
+
+import numpy as np
+
+from pi.render_cache import RENDER_CACHE, RenderCache
+from pi.render_pool import RENDER_POOL, RenderJob, RenderPool
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    One π render in progress, shared by every request for the same key.
+
+    The render is written into a single preallocated float32 buffer, whose
+    length is known from the note layout. Readers get read-only views of
+    the samples produced so far, so every request streams the same memory,
+    and a reader that joins late starts with everything already rendered.
+
+    When the last reader goes away before the render completes, the render
+    is cancelled.
+    """
+
+    def __init__(self, key: str | None, total: int, job: RenderJob, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.total = total
+        self.job = job
+        self.buf = np.empty(total, dtype=np.float32)
+        self.produced = 0
+        self.done = False
+        self.error: BaseException | None = None
+        self.readers = 0
+        self._loop = loop
+        self._waiters: list[asyncio.Future] = []
+        self._on_abandon: Callable[["Flight"], None] | None = None
+
+    # Producer side, called from the render thread
+
+    def write(self, chunk: np.ndarray):
+        end = self.produced + len(chunk)
+        if end > self.total:
+            raise RuntimeError(f"Render produced more than the expected {self.total} samples")
+        self.buf[self.produced:end] = chunk
+        self.produced = end
+        self._notify()
+
+    def finish(self, error: BaseException | None = None):
+        if error is None and self.produced != self.total:
+            error = RuntimeError(f"Render produced {self.produced} of {self.total} samples")
+        self.error = error
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:  # event loop closed
+            self.job.cancel()
+
+    # Reader side, called on the event loop
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def _changed(self):
+        fut = self._loop.create_future()
+        self._waiters.append(fut)
+        await fut
+
+    def _attach(self):
+        self.readers += 1
+
+    def _detach(self):
+        self.readers -= 1
+        if self.readers == 0 and not self.done:
+            logger.debug("Cancelling abandoned render %s", self.key)
+            self.job.cancel()
+            if self._on_abandon is not None:
+                self._on_abandon(self)
+
+    def _view(self, start: int, stop: int) -> np.ndarray:
+        view = self.buf[start:stop]
+        view.flags.writeable = False
+        return view
+
+    def read(self, chunk_size: int | None = None, start: int = 0, stop: int | None = None) -> AsyncIterator[np.ndarray]:
+        """
+        Iterate over samples [start, stop) as they are rendered.
+
+        The reader counts towards keeping the render alive from this call
+        until the iterator is closed or exhausted.
+
+        Args:
+            chunk_size (int | None): largest chunk to yield; by default
+                everything produced since the previous chunk.
+        """
+        self._attach()
+        return self._read(chunk_size, start, self.total if stop is None else min(stop, self.total))
+
+    async def _read(self, chunk_size: int | None, pos: int, stop: int) -> AsyncIterator[np.ndarray]:
+        try:
+            while True:
+                produced = min(self.produced, stop)
+                if pos < produced:
+                    end = produced if chunk_size is None else min(produced, pos + chunk_size)
+                    yield self._view(pos, end)
+                    pos = end
+                elif self.done or pos >= stop:
+                    if self.error is not None and pos < stop:
+                        raise self.error
+                    return
+                else:
+                    await self._changed()
+        finally:
+            self._detach()
+
+    async def wait(self) -> np.ndarray:
+        """Wait for the whole render and return it as a read-only array."""
+        self._attach()
+        try:
+            while not self.done:
+                await self._changed()
+        finally:
+            self._detach()
+        if self.error is not None:
+            raise self.error
+        return self._view(0, self.total)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical π renders.
+
+    The first request for a key starts the render on the render pool; requests
+    arriving while it runs join the same Flight instead of rendering again.
+    Completed keyed renders go to the render cache, so later requests are
+    served from there. Flights without a key (unseeded random renders) are
+    never shared.
+
+    Must be used from the event loop.
+    """
+
+    def __init__(self, pool: RenderPool = RENDER_POOL, cache: RenderCache = RENDER_CACHE):
+        self.pool = pool
+        self.cache = cache
+        self.started = 0
+        self.joined = 0
+        self._flights: dict[str, Flight] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> Flight | None:
+        """Return the in-flight render for `key`, if any."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.joined += 1
+            return flight
+
+    def start(self, key: str | None, job: RenderJob, total: int,
+              render: Callable[[RenderJob], Iterable[np.ndarray]]) -> Flight:
+        """
+        Start rendering on the pool under an admitted job.
+
+        Args:
+            key (str | None): render key to share and cache under.
+            total (int): samples the render will produce.
+            render: called on the pool with the job; returns the float32
+                chunks in order and should call job.check between them.
+        """
+        flight = Flight(key, total, job, asyncio.get_running_loop())
+        if key is not None:
+            flight._on_abandon = self._forget
+            with self._lock:
+                self._flights[key] = flight
+        with self._lock:
+            self.started += 1
+        self.pool.submit(job, lambda job: self._produce(flight, render))
+        return flight
+
+    def _produce(self, flight: Flight, render: Callable[[RenderJob], Iterable[np.ndarray]]):
+        job = flight.job
+        try:
+            chunks = render(job)
+            try:
+                for chunk in chunks:
+                    job.check()
+                    flight.write(chunk)
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+            if flight.key is not None and flight.produced == flight.total:
+                # Cache before forgetting the flight, so a request arriving in
+                # between finds one or the other
+                self.cache.put(flight.key, flight.buf)
+        except BaseException as exc:
+            flight.finish(exc)
+            raise
+        finally:
+            self._forget(flight)
+        flight.finish()
+
+    def _forget(self, flight: Flight):
+        if flight.key is None:
+            return
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "started": self.started, "joined": self.joined}
+
+
+SINGLE_FLIGHT = SingleFlight()
@@ -1,46 +1,145 @@
+from functools import lru_cache
+
 import numpy as np
 
+from pi.synthesis import DEFAULT_ENGINE, get_engine
+
+import logging
+
+logger = logging.getLogger(__name__)
+
 def generate_sine_wave(frequency, duration, sample_rate=44100, amplitude=0.5):
     t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
     wave = amplitude * np.sin(2 * np.pi * frequency * t)
     return wave
 
 
-def apply_envelope(wave, attack=0.02, decay=0.02, sample_rate=44100):
+@lru_cache(maxsize=128)
+def hann_ramps(samples: int) -> tuple[np.ndarray, np.ndarray]:
     """
-    Apply an ADSR-like envelope with an attack and decay phase using a Hann window.
+    Read-only (attack, decay) halves of a Hann window of 2 * samples points.
+    Cached by sample count, since every note of a piece uses the same ones.
     """
-    num_samples = len(wave)
+    window = np.hanning(samples * 2)
+    window.flags.writeable = False
+    return window[:samples], window[samples:]
+
+
+def envelope_samples(num_samples, attack=0.02, decay=0.02, sample_rate=44100):
+    """Return the (attack, decay) lengths apply_envelope uses for a wave."""
     attack_samples = min(int(sample_rate * attack), num_samples // 2)
     decay_samples = min(int(sample_rate * decay), num_samples // 2)
+    return attack_samples, decay_samples
+
+
+def apply_envelope(wave, attack=0.02, decay=0.02, sample_rate=44100):
+    """
+    Apply an ADSR-like envelope with an attack and decay phase using a Hann window.
+    """
+    attack_samples, decay_samples = envelope_samples(len(wave), attack, decay, sample_rate)
 
     # Use Hann windows for attack and decay
     if attack_samples > 0:
-        attack_curve = np.hanning(attack_samples * 2)[:attack_samples]  # First half of Hann window
-        wave[:attack_samples] *= attack_curve
+        wave[:attack_samples] *= hann_ramps(attack_samples)[0]  # First half of Hann window
 
     if decay_samples > 0:
-        decay_curve = np.hanning(decay_samples * 2)[-decay_samples:]  # Second half of Hann window
-        wave[-decay_samples:] *= decay_curve
+        wave[-decay_samples:] *= hann_ramps(decay_samples)[1]  # Second half of Hann window
 
     return wave
 
+def _align_bounds(zero_crossings, num_samples):
+    """Slice bounds phase_align_wave keeps, or None to keep the whole wave."""
+    if len(zero_crossings) == 0:
+        return None
+    start_index = zero_crossings[0]
+    end_index = zero_crossings[-1] if zero_crossings[-1] > start_index else num_samples - 1
+
+    # Ensure we don't trim the entire waveform
+    if end_index - start_index > 0.1 * num_samples:  # Keep at least 10% of the wave
+        return int(start_index), int(end_index)
+    logger.warning("phase_align_wave found too few zero-crossings! Keeping original wave.")
+    return None
+
 def phase_align_wave(wave):
     """
     Adjusts a waveform so it always starts and ends at a zero-crossing point.
     Prevents cutting the entire wave to an empty array.
+
+    Scans every sample, so it works on arbitrary waves; for sine tones
+    aligned_tone finds the same bounds without rendering the whole tone.
     """
     # Find the closest zero-crossing at the start
     zero_crossings = np.where(np.diff(np.sign(wave)))[0]
 
-    if len(zero_crossings) > 0:
-        start_index = zero_crossings[0]
-        end_index = zero_crossings[-1] if zero_crossings[-1] > start_index else len(wave) - 1
+    bounds = _align_bounds(zero_crossings, len(wave))
+    if bounds is not None:
+        wave = wave[bounds[0]:bounds[1]]
 
-        # Ensure we don't trim the entire waveform
-        if end_index - start_index > 0.1 * len(wave):  # Keep at least 10% of the wave
-            wave = wave[start_index:end_index]
-        else:
-            print("Warning: phase_align_wave found too few zero-crossings! Keeping original wave.")
+    return wave
+
+
+def _tone_span(first, last, frequency, duration, sample_rate=44100, attack=0.02, decay=0.02, amplitude=0.5,
+               engine=DEFAULT_ENGINE):
+    """
+    Samples [first, last) of apply_envelope(generate_sine_wave(...)). With
+    the reference engine they are computed with the same operations, so they
+    match the full render bit for bit.
+    """
+    num_samples = int(sample_rate * duration)
+    # Same sample times as generate_sine_wave's linspace
+    wave = amplitude * get_engine(engine).oscillate(frequency, first, last, duration / num_samples)
 
-    return wave
\ No newline at end of file
+    attack_samples, decay_samples = envelope_samples(num_samples, attack, decay, sample_rate)
+    if first < attack_samples:
+        stop = min(last, attack_samples)
+        wave[:stop - first] *= hann_ramps(attack_samples)[0][first:stop]
+    decay_start = num_samples - decay_samples
+    if decay_samples > 0 and last > decay_start:
+        lo = max(first, decay_start)
+        wave[lo - first:] *= hann_ramps(decay_samples)[1][lo - decay_start:last - decay_start]
+    return wave
+
+
+def zero_crossing_bounds(frequency, duration, sample_rate=44100, attack=0.02, decay=0.02, amplitude=0.5,
+                         engine=DEFAULT_ENGINE):
+    """
+    Slice bounds phase_align_wave would keep for this enveloped sine tone.
+
+    The Hann envelope is positive everywhere except its two end points, so
+    the tone changes sign exactly where the sine does, at least once every
+    half period (below Nyquist, each of those shows up as a sign change
+    between neighbouring samples). The first and last crossings therefore
+    lie within one half period of either end, and only those samples are
+    computed.
+
+    Returns:
+        tuple: (start, end) indices into the full tone.
+    """
+    num_samples = int(sample_rate * duration)
+    if 0 < frequency < sample_rate / 2:
+        edge = int(np.ceil(sample_rate / (2 * frequency))) + 2
+    else:
+        edge = num_samples
+    if 2 * edge >= num_samples:
+        crossings = np.where(np.diff(np.sign(
+            _tone_span(0, num_samples, frequency, duration, sample_rate, attack, decay, amplitude, engine))))[0]
+    else:
+        args = (frequency, duration, sample_rate, attack, decay, amplitude, engine)
+        head = np.where(np.diff(np.sign(_tone_span(0, edge, *args))))[0]
+        tail = np.where(np.diff(np.sign(_tone_span(num_samples - edge, num_samples, *args))))[0]
+        crossings = np.concatenate([head[:1], tail[-1:] + (num_samples - edge)])
+    return _align_bounds(crossings, num_samples) or (0, num_samples)
+
+
+def aligned_tone(frequency, duration, sample_rate=44100, attack=0.02, decay=0.02, amplitude=0.5,
+                 engine=DEFAULT_ENGINE):
+    """
+    Enveloped, phase-aligned sine tone, generating only the aligned span.
+
+    With the reference engine this equals
+    phase_align_wave(apply_envelope(generate_sine_wave(...))) sample for
+    sample, without rendering and scanning the full tone. Other engines (see
+    pi.synthesis) only change how the sine itself is evaluated.
+    """
+    start, end = zero_crossing_bounds(frequency, duration, sample_rate, attack, decay, amplitude, engine)
+    return _tone_span(start, end, frequency, duration, sample_rate, attack, decay, amplitude, engine)
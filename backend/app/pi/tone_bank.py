@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import stage
+from pi.sounds import aligned_tone
+from pi.synthesis import DEFAULT_ENGINE
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TONE_GENERATION = stage("tone_generation")
+
+
+class ToneBank:
+    """
+    LRU cache of rendered, enveloped and phase-aligned tones.
+
+    A π melody only ever uses the 88 piano pitches at a couple of durations,
+    so every tone is rendered once and then shared. Cached arrays are marked
+    read-only; callers that need to scale a tone must do so out of place.
+
+    Args:
+        max_bytes (int): memory ceiling for cached samples. The least recently
+            used tones are evicted once it is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._tones: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tone(
+        self,
+        frequency: float,
+        duration: float,
+        sample_rate: int = 44100,
+        attack: float = 0.02,
+        decay: float = 0.02,
+        amplitude: float = 0.5,
+        engine: str = DEFAULT_ENGINE,
+    ) -> np.ndarray:
+        """
+        Return the enveloped, phase-aligned sine tone for these parameters,
+        synthesized by `engine` (see pi.synthesis).
+
+        Returns:
+            np.ndarray: read-only float64 samples shared between callers.
+        """
+        key = (frequency, duration, sample_rate, attack, decay, amplitude, engine)
+        with self._lock:
+            wave = self._tones.get(key)
+            if wave is not None:
+                self._tones.move_to_end(key)
+                self.hits += 1
+                return wave
+            self.misses += 1
+
+        with _TONE_GENERATION.time():
+            wave = aligned_tone(frequency, duration, sample_rate, attack=attack, decay=decay, amplitude=amplitude,
+                                engine=engine)
+        wave.flags.writeable = False
+
+        with self._lock:
+            if key not in self._tones:
+                self._tones[key] = wave
+                self._bytes += wave.nbytes
+                self._evict()
+        return wave
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._tones) > 1:
+            _, old = self._tones.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._tones),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._tones.clear()
+            self._bytes = 0
+
+
+TONE_BANK = ToneBank(int(os.environ.get("PI_TONE_BANK_BYTES", 64 * 1024 * 1024)))
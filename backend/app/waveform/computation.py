@@ -1,4 +1,5 @@
 import math
+from fractions import Fraction
 
 import numpy as np
 
@@ -20,4 +21,171 @@ def compute_wave(
     return data
 
 def flatten_wave_array(wave) -> bytes:
-    return bytes(np.array(wave, dtype=np.float32).tobytes())
\ No newline at end of file
+    return bytes(np.array(wave, dtype=np.float32).tobytes())
+
+
+# Frame sent while generation is paused: a flat line from x=0 to x=1.
+IDLE_FRAME = flatten_wave_array([[0, 0], [1, 0]])
+
+
+class WaveFrame:
+    """
+    Reusable per-connection frame generator for the waveform stream.
+
+    Holds one interleaved float32 `[x0, y0, x1, y1, ...]` output buffer plus a
+    float64 scratch array, and fills both in place with vectorized math, so a
+    steady-state frame allocates nothing. The result is the same wire format
+    as `flatten_wave_array(compute_wave(...))`.
+    """
+
+    def __init__(self, samples: int = 100):
+        self._samples = 0
+        self._resize(samples)
+
+    def _resize(self, samples: int):
+        self._samples = samples
+        self._index = np.arange(samples, dtype=np.float64)
+        self._scratch = np.empty(samples, dtype=np.float64)
+        self._out = np.empty(samples * 2, dtype=np.float32)
+        self._view = memoryview(self._out).cast("B")
+
+    def fill(
+        self,
+        frequency: float = 440.0,
+        amplitude: float = 1.0,
+        phase: float = 0.0,
+        samples: int = 100,
+        frame_size: float = 0.1
+    ) -> memoryview:
+        """
+        Compute one frame into the internal buffer.
+
+        Returns:
+            memoryview: bytes view of the buffer, valid until the next call.
+        """
+        self._out[1::2] = self.fill_y(frequency, amplitude, phase, samples, frame_size)
+
+        # x = i * dt
+        np.multiply(self._index, frame_size / samples, out=self._scratch)
+        self._out[0::2] = self._scratch
+
+        return self._view
+
+    def fill_y(
+        self,
+        frequency: float = 440.0,
+        amplitude: float = 1.0,
+        phase: float = 0.0,
+        samples: int = 100,
+        frame_size: float = 0.1
+    ) -> np.ndarray:
+        """
+        Compute just the y values of one frame.
+
+        Returns:
+            np.ndarray: float64 scratch array, valid until the next call.
+        """
+        if samples != self._samples:
+            self._resize(samples)
+
+        t = self._scratch
+        dt_sample = frame_size / samples
+
+        # y = amplitude * sin(2π f (phase + i * dt))
+        np.multiply(self._index, dt_sample, out=t)
+        np.add(t, phase, out=t)
+        np.multiply(t, 2 * math.pi * frequency, out=t)
+        np.sin(t, out=t)
+        np.multiply(t, amplitude, out=t)
+        return t
+
+
+class PeriodTable:
+    """
+    Frames of one steady sine, produced from samples computed once per
+    settings change instead of evaluating sin for every sample of every
+    frame.
+
+    When f * dt is a ratio p/q with q <= max_period, the sampled signal
+    repeats every q samples, so `q + samples` samples hold every frame that
+    starts on the sample grid: such a frame is a read-only slice of the
+    table. Frames whose phase falls between grid points (by more than
+    `max_error` allows), or signals without a short period, are built by
+    angle addition from per-frame sin/cos tables,
+
+        y_i = A * (sin(a) * cos(i * b) + cos(a) * sin(i * b)),
+
+    which is exact up to rounding at three multiply-adds per sample.
+
+    Args:
+        max_error (float): largest deviation from the exact frame, relative
+            to the amplitude, accepted when snapping a phase to the grid.
+        max_period (int): longest period, in samples, worth tabulating.
+    """
+
+    def __init__(
+        self,
+        frequency: float = 440.0,
+        amplitude: float = 1.0,
+        samples: int = 100,
+        frame_size: float = 0.1,
+        max_error: float = 1e-7,
+        max_period: int = 1 << 16,
+    ):
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.samples = samples
+        self.dt = frame_size / samples
+        self.max_error = max_error
+        self.sliced = 0
+        self.rotated = 0
+
+        # Cycles per sample, reduced to [0, 1)
+        step = math.fmod(frequency * self.dt, 1.0)
+        ratio = Fraction(step).limit_denominator(max_period)
+        self.period = ratio.denominator if abs(step - ratio) < 1e-12 else None
+
+        index = np.arange(samples, dtype=np.float64)
+        angles = 2 * math.pi * np.mod(index * step, 1.0)
+        self._sin = amplitude * np.sin(angles)
+        self._cos = amplitude * np.cos(angles)
+        self._scratch = np.empty(samples, dtype=np.float64)
+
+        self._table = None
+        if self.period is not None:
+            # Exact multiples of the period keep long tables drift-free
+            j = np.arange(self.period + samples)
+            angles = 2 * math.pi * ((j * ratio.numerator) % self.period) / self.period
+            self._table = (amplitude * np.sin(angles)).astype(np.float32)
+            self._table.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        table = self._table.nbytes if self._table is not None else 0
+        return table + self._sin.nbytes + self._cos.nbytes + self._scratch.nbytes
+
+    def frame(self, phase: float) -> np.ndarray:
+        """
+        The y values of the frame starting at signal time `phase`, as a
+        read-only float32 array.
+        """
+        if self._table is not None:
+            k = phase / self.dt
+            nearest = round(k)
+            # Snapping moves the signal by at most |k - nearest| samples
+            if 2 * math.pi * abs(self.frequency * self.dt * (k - nearest)) <= self.max_error:
+                self.sliced += 1
+                start = nearest % self.period
+                return self._table[start:start + self.samples]
+
+        self.rotated += 1
+        a = 2 * math.pi * math.fmod(self.frequency * phase, 1.0)
+        y = self._scratch
+        np.multiply(self._cos, math.sin(a), out=y)
+        y += math.cos(a) * self._sin
+        out = y.astype(np.float32)
+        out.flags.writeable = False
+        return out
+
+    def stats(self) -> dict:
+        return {"period": self.period, "sliced": self.sliced, "rotated": self.rotated, "bytes": self.nbytes}
@@ -0,0 +1,226 @@
+import struct
+import weakref
+
+import numpy as np
+
+# Compact /ws/waveform frame header, little-endian:
+#   uint32  sequence number (the group's frame index)
+#   uint32  sample count
+#   uint8   sample format code (see SAMPLE_FORMATS)
+#   uint8   flags (see DELTA)
+#   2 bytes padding
+#   float32 scale: y = sample * scale
+#   float64 dt: sample spacing, x = i * dt
+#   float64 phase: signal time of the first sample
+# followed by the y values only. 32 bytes keeps every payload 8-byte aligned.
+HEADER = struct.Struct("<IIBBxxfdd")
+
+# The payload holds differences from the previous frame's samples, wrapping
+# in the sample type; it is only sent when count, format and scale match.
+DELTA = 1
+
+SAMPLE_FORMATS = {
+    "float32": (1, np.dtype("<f4")),
+    "int16": (2, np.dtype("<i2")),
+    "int8": (3, np.dtype("i1")),
+}
+
+ENCODINGS = ("xy", "compact")
+
+# Paused groups send a flat line from x=0 to x=1
+IDLE_SAMPLES = np.zeros(2, dtype=np.float32)
+IDLE_SAMPLES.flags.writeable = False
+
+
+def negotiate(data: dict, current: dict | None = None) -> dict:
+    """
+    Validate the frame encoding options of a /ws/waveform settings message.
+
+    Options the message leaves out keep their `current` values, like the
+    stream settings do.
+
+    Args:
+        data (dict): reads "encoding" ("xy" interleaved float32 pairs, the
+            default, or "compact"), "sample_format" ("float32", "int16" or
+            "int8", compact only) and "delta" (compact with a quantized
+            sample format only).
+
+    Returns:
+        dict: the accepted encoding, sample_format and delta.
+    """
+    current = current or {"encoding": "xy", "sample_format": "float32", "delta": False}
+    encoding = data.get("encoding", current["encoding"])
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+
+    sample_format = data.get("sample_format", current["sample_format"])
+    if sample_format not in SAMPLE_FORMATS:
+        raise ValueError(f"Unknown sample format: {sample_format}")
+
+    delta = bool(data.get("delta", current["delta"]))
+    if delta and sample_format == "float32":
+        raise ValueError("delta needs an int16 or int8 sample_format")
+
+    return {"encoding": encoding, "sample_format": sample_format, "delta": delta}
+
+
+class Frame:
+    """
+    One tick of a waveform group, shared by all of its subscribers.
+
+    Holds the float32 y values once; each wire encoding is built from them
+    on first use and reused by every subscriber sending the same one.
+
+    Args:
+        seq (int): the group's frame index.
+        y (np.ndarray | None): read-only samples; None while paused.
+        dt (float): sample spacing.
+        phase (float): signal time of the first sample.
+        peak (float): largest possible |y|, which sets the quantization scale.
+        xy (XYBuffers | None): the group's reusable "xy" buffers; without
+            them the "xy" encoding is built in a fresh array.
+    """
+
+    __slots__ = ("seq", "y", "dt", "phase", "peak", "xy", "_encoded", "__weakref__")
+
+    def __init__(self, seq: int, y: np.ndarray | None, dt: float = 1.0, phase: float = 0.0, peak: float = 1.0,
+                 xy: "XYBuffers | None" = None):
+        self.seq = seq
+        self.y = IDLE_SAMPLES if y is None else y
+        self.dt = dt
+        self.phase = phase
+        self.peak = abs(peak)
+        self.xy = xy
+        self._encoded: dict = {}
+
+    def shared(self, tag, build):
+        """The encoding `tag` of this frame, built once by `build(frame)`."""
+        value = self._encoded.get(tag)
+        if value is None:
+            value = self._encoded[tag] = build(self)
+        return value
+
+
+class XYBuffers:
+    """
+    Reusable "xy" encodings of one waveform group's frames.
+
+    x only depends on the sample count and spacing, so it is computed once
+    and written once per buffer; each frame then only writes its y values
+    and is sent as a memoryview of its buffer. A buffer is reused once its
+    frame is gone, when no subscriber can still be sending it, so a steady
+    stream cycles through a few buffers and allocates nothing.
+    """
+
+    def __init__(self):
+        self._layout: tuple[int, float] | None = None
+        self._x = np.zeros(0, dtype=np.float32)
+        self._buffers: list[tuple[np.ndarray, memoryview, weakref.ref]] = []
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def pack(self, frame: Frame) -> memoryview:
+        count = len(frame.y)
+        if self._layout != (count, frame.dt):
+            self._layout = (count, frame.dt)
+            self._x = (np.arange(count, dtype=np.float64) * frame.dt).astype(np.float32)
+            self._buffers = []
+        for i, (out, view, owner) in enumerate(self._buffers):
+            if owner() is None:
+                break
+        else:
+            out = np.empty(count * 2, dtype=np.float32)
+            out[0::2] = self._x
+            view = memoryview(out).cast("B")
+            i = len(self._buffers)
+            self._buffers.append(None)
+        out[1::2] = frame.y
+        self._buffers[i] = (out, view, weakref.ref(frame))
+        return view
+
+
+def _xy(frame: Frame) -> memoryview:
+    if frame.xy is not None:
+        return frame.xy.pack(frame)
+    count = len(frame.y)
+    out = np.empty(count * 2, dtype=np.float32)
+    out[0::2] = np.arange(count, dtype=np.float64) * frame.dt
+    out[1::2] = frame.y
+    return memoryview(out).cast("B")
+
+
+def quantize(frame: Frame, sample_format: str) -> tuple[np.ndarray, float]:
+    """
+    The frame's samples in `sample_format`, and the scale they decode with.
+    Integer formats span [-peak, peak] and round to nearest.
+    """
+    def build(frame):
+        dtype = SAMPLE_FORMATS[sample_format][1]
+        if dtype.kind == "f":
+            return frame.y.astype(dtype, copy=False), 1.0
+        top = np.iinfo(dtype).max
+        scale = frame.peak / top if frame.peak else 1.0
+        q = np.rint(frame.y / scale)
+        np.clip(q, -top, top, out=q)
+        return q.astype(dtype), scale
+
+    return frame.shared(("q", sample_format), build)
+
+
+class FrameEncoder:
+    """
+    Per-connection /ws/waveform frame encoder.
+
+    "xy" frames are the interleaved float32 `[x0, y0, x1, y1, ...]` pairs
+    (the format the stream has always had); "compact" frames are HEADER
+    plus y values. Frames that don't depend on the connection's history are
+    built once per tick and shared; delta frames are relative to the last
+    frame this connection sent, so dropped frames never desynchronize them.
+    """
+
+    def __init__(self, encoding: str = "xy", sample_format: str = "float32", delta: bool = False):
+        self.encoding = encoding
+        self.sample_format = sample_format
+        self.delta = delta
+        self.code = SAMPLE_FORMATS[sample_format][0]
+        self._previous: tuple[np.ndarray, float] | None = None
+
+    def encode(self, frame: Frame) -> bytes | memoryview:
+        if self.encoding == "xy":
+            return frame.shared("xy", _xy)
+        if not self.delta:
+            return frame.shared(("compact", self.sample_format), self._pack)
+
+        samples, scale = quantize(frame, self.sample_format)
+        previous, self._previous = self._previous, (samples, scale)
+        if previous is None or len(previous[0]) != len(samples) or previous[1] != scale:
+            return self._pack(frame)
+        return self._header(frame, scale, DELTA) + (samples - previous[0]).tobytes()
+
+    def _pack(self, frame: Frame) -> bytes:
+        samples, scale = quantize(frame, self.sample_format)
+        return self._header(frame, scale, 0) + samples.tobytes()
+
+    def _header(self, frame: Frame, scale: float, flags: int) -> bytes:
+        return HEADER.pack(frame.seq & 0xFFFFFFFF, len(frame.y), self.code, flags, scale, frame.dt, frame.phase)
+
+
+def decode_frame(data: bytes, previous: np.ndarray | None = None) -> tuple[int, float, float, np.ndarray, np.ndarray]:
+    """
+    Decode a compact /ws/waveform frame.
+
+    Args:
+        previous (np.ndarray | None): the raw samples of the previous frame,
+            needed to undo a delta frame.
+
+    Returns:
+        tuple: (sequence number, dt, phase, float32 y values, raw samples
+            to pass as `previous` for the next frame)
+    """
+    seq, count, code, flags, scale, dt, phase = HEADER.unpack_from(data)
+    dtype = next(t for c, t in SAMPLE_FORMATS.values() if c == code)
+    raw = np.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size)
+    if flags & DELTA:
+        raw = previous + raw
+    return seq, dt, phase, (raw * np.float32(scale)).astype(np.float32), raw
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import time
+from contextlib import suppress
+
+import numpy as np
+from fastapi import WebSocket
+
+from metrics import WAVEFORM_FRAMES_DROPPED, WAVEFORM_FRAMES_SENT, stage
+from waveform.computation import PeriodTable, WaveFrame
+from waveform.framing import Frame, FrameEncoder, XYBuffers
+from waveform.scheduler import FrameClock, SendMeter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FRAMES_SENT = WAVEFORM_FRAMES_SENT.labels()
+_FRAMES_DROPPED = WAVEFORM_FRAMES_DROPPED.labels()
+_FRAME_COMPUTE = stage("frame_compute")
+_FRAME_ENCODE = stage("frame_encode")
+
+# "table" reads frames from a PeriodTable built per settings group;
+# "direct" evaluates sin for every sample of every frame
+GENERATOR = os.environ.get("WAVEFORM_GENERATOR", "table")
+
+
+def settings_key(
+    generate_wave: bool,
+    frequency: float,
+    amplitude: float,
+    samples: int,
+    frame_size: float,
+    frame_rate: int
+) -> tuple:
+    """
+    Normalize stream settings into the key connections are grouped by.
+    Paused streams only differ by frame rate, so they share one group.
+    """
+    frame_rate = max(1, frame_rate)
+    if not generate_wave:
+        return (False, None, None, None, None, frame_rate)
+    return (True, frequency, amplitude, samples, frame_size, frame_rate)
+
+
+class Subscriber:
+    """
+    One /ws/waveform connection. Holds at most one pending frame: when the
+    client is slower than its group, older frames are dropped, never queued.
+    Under sustained backpressure it also thins the stream to every n-th frame
+    (see SendMeter). Frames are encoded as the connection negotiated (see
+    waveform.framing) when they are sent.
+    """
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.group: "WaveformGroup | None" = None
+        self.frames_dropped = 0
+        self.meter = SendMeter()
+        self.encoder = FrameEncoder()
+        self.bytes_sent = 0
+        self._frame: Frame | None = None
+        self._announce: dict | None = None
+        self._ready = asyncio.Event()
+
+    @property
+    def frames_sent(self) -> int:
+        return self.meter.frames_sent
+
+    def set_encoding(self, encoding: dict):
+        """
+        Switch to the frame encoding `encoding` (see waveform.framing.negotiate)
+        if it differs from the current one. The change is acknowledged with a
+        JSON {"encoding": ...} message right before the first frame using it.
+        """
+        current = {"encoding": self.encoder.encoding, "sample_format": self.encoder.sample_format,
+                   "delta": self.encoder.delta}
+        if encoding != current:
+            self.encoder = FrameEncoder(**encoding)
+            self._announce = encoding
+
+    def offer(self, frame: Frame, index: int = 0):
+        if index % self.meter.divider:
+            return
+        if self._frame is not None:
+            self.frames_dropped += 1
+            _FRAMES_DROPPED.inc()
+        self._frame = frame
+        self._ready.set()
+
+    async def run(self):
+        """Send frames as they are offered until the socket fails."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            frame, self._frame = self._frame, None
+            if self._announce is not None:
+                announce, self._announce = self._announce, None
+                await self.ws.send_json({"encoding": announce})
+            with _FRAME_ENCODE.time():
+                payload = self.encoder.encode(frame)
+            interval = self.group.clock.interval if self.group else 0.0
+            started = time.monotonic()
+            await self.ws.send_bytes(payload)
+            self.bytes_sent += len(payload)
+            self.meter.record(started, time.monotonic(), interval)
+            _FRAMES_SENT.inc()
+
+    def stats(self) -> dict:
+        return {
+            "settings": self.group.key if self.group else None,
+            "fps": round(self.meter.fps, 2),
+            "frames_sent": self.meter.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "encoding": self.encoder.encoding,
+            "sample_format": self.encoder.sample_format,
+            "delta": self.encoder.delta,
+            "bytes_sent": self.bytes_sent,
+            "frame_divider": self.meter.divider,
+            "send_latency_ms": round(self.meter.latency * 1000, 3),
+            "max_send_latency_ms": round(self.meter.max_latency * 1000, 3),
+        }
+
+
+class WaveformGroup:
+    """
+    Computes one frame per tick and fans it out to its subscribers, which
+    share its encodings.
+    """
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.subscribers: set[Subscriber] = set()
+        self.phase = 0.0
+        self.clock = FrameClock(key[-1])
+        self._table: PeriodTable | None = None
+        self._frame: WaveFrame | None = None
+        self._xy = XYBuffers()
+        generate_wave, frequency, amplitude, samples, frame_size, _ = key
+        if generate_wave and GENERATOR == "table":
+            self._table = PeriodTable(frequency, amplitude, samples, frame_size)
+        elif generate_wave:
+            self._frame = WaveFrame(samples)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        generate_wave, frequency, amplitude, samples, frame_size, frame_rate = self.key
+        while True:
+            if generate_wave:
+                # One array per tick, shared by every subscriber
+                with _FRAME_COMPUTE.time():
+                    y = self._compute()
+                payload = Frame(self.clock.frame, y, frame_size / samples, self.phase, amplitude, self._xy)
+            else:
+                payload = Frame(self.clock.frame, None, xy=self._xy)
+            for sub in self.subscribers:
+                sub.offer(payload, self.clock.frame)
+            # Skipped deadlines still advance the phase, keeping it on wall time
+            elapsed = await self.clock.tick()
+            self.phase = self.phase + elapsed * (1.0 / frame_rate)
+
+    def _compute(self) -> np.ndarray:
+        if self._table is not None:
+            return self._table.frame(self.phase)
+        _, frequency, amplitude, samples, frame_size, _ = self.key
+        y = self._frame.fill_y(frequency, amplitude, self.phase, samples, frame_size).astype(np.float32)
+        y.flags.writeable = False
+        return y
+
+    def stats(self) -> dict:
+        return {
+            "settings": self.key,
+            "generator": self._table.stats() if self._table is not None else GENERATOR,
+            "xy_buffers": len(self._xy),
+            "subscribers": len(self.subscribers),
+            "frames": self.clock.frame,
+            "frames_skipped": self.clock.skipped,
+            "lateness_ms": round(self.clock.lateness * 1000, 3),
+            "max_lateness_ms": round(self.clock.max_lateness * 1000, 3),
+        }
+
+    async def close(self):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+
+class WaveformHub:
+    """Groups /ws/waveform connections by settings so identical streams share frames."""
+
+    def __init__(self):
+        self.groups: dict[tuple, WaveformGroup] = {}
+
+    async def subscribe(self, sub: Subscriber, key: tuple):
+        """Move `sub` into the group for `key`, creating it if needed."""
+        if sub.group is not None and sub.group.key == key:
+            return
+        await self.unsubscribe(sub)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = WaveformGroup(key)
+            logger.debug("Started waveform group %s", key)
+        group.subscribers.add(sub)
+        sub.group = group
+
+    async def unsubscribe(self, sub: Subscriber):
+        group, sub.group = sub.group, None
+        if group is None:
+            return
+        group.subscribers.discard(sub)
+        if not group.subscribers:
+            del self.groups[group.key]
+            await group.close()
+            logger.debug("Stopped waveform group %s", group.key)
+
+    def stats(self) -> dict:
+        subscribers = [sub for group in self.groups.values() for sub in group.subscribers]
+        return {
+            "groups": [group.stats() for group in self.groups.values()],
+            "connections": [sub.stats() for sub in subscribers],
+        }
+
+
+WAVEFORM_HUB = WaveformHub()
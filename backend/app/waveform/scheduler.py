@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+
+class FrameClock:
+    """
+    Drift-free frame ticker built on absolute monotonic deadlines.
+
+    Frame n is due at `start + n / frame_rate`, so compute and send time never
+    accumulate into the interval. When the loop falls more than a frame
+    behind, the missed deadlines are skipped rather than replayed in a burst.
+    """
+
+    def __init__(self, frame_rate: float):
+        self.interval = 1.0 / frame_rate
+        self.frame = 0
+        self.skipped = 0
+        self.lateness = 0.0
+        self.max_lateness = 0.0
+        self._start = time.monotonic()
+
+    def deadline(self, frame: int) -> float:
+        return self._start + frame * self.interval
+
+    async def tick(self) -> int:
+        """
+        Wait for the next frame deadline.
+
+        Returns:
+            int: frames elapsed since the previous tick (1 unless some were
+                skipped), so callers can advance time-based state to match.
+        """
+        due = self.deadline(self.frame + 1)
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)  # still yield to the loop when behind
+
+        late = time.monotonic() - due
+        missed = max(0, int(late / self.interval))
+        self.skipped += missed
+        self.lateness = 0.9 * self.lateness + 0.1 * max(late, 0.0)
+        self.max_lateness = max(self.max_lateness, late)
+        self.frame += 1 + missed
+        return 1 + missed
+
+
+class SendMeter:
+    """
+    Per-connection send statistics and frame-rate adaptation.
+
+    ASGI hides the transport, but a WebSocket send only completes once the
+    server's write buffer drains below its high-water mark, so send latency is
+    a direct measure of write-buffer backpressure. While sends take longer
+    than half the effective frame interval the client is sent every second,
+    fourth, ... frame; once sends are fast again the rate is restored.
+    """
+
+    def __init__(self, max_divider: int = 32):
+        self.max_divider = max_divider
+        self.divider = 1
+        self.frames_sent = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.fps = 0.0
+        self._last_sent: float | None = None
+        self._good = 0
+
+    def record(self, started: float, finished: float, frame_interval: float):
+        latency = finished - started
+        self.frames_sent += 1
+        self.latency = latency if self.frames_sent == 1 else 0.8 * self.latency + 0.2 * latency
+        self.max_latency = max(self.max_latency, latency)
+        if self._last_sent is not None and finished > self._last_sent:
+            rate = 1.0 / (finished - self._last_sent)
+            self.fps = rate if self.fps == 0.0 else 0.9 * self.fps + 0.1 * rate
+        self._last_sent = finished
+
+        budget = frame_interval * self.divider
+        if self.latency > 0.5 * budget and self.divider < self.max_divider:
+            self.divider *= 2
+            self._good = 0
+        elif self.latency < 0.1 * budget and self.divider > 1:
+            self._good += 1
+            if self._good >= 10:
+                self.divider //= 2
+                self._good = 0
+        else:
+            self._good = 0
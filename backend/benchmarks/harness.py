@@ -0,0 +1,210 @@
+"""
+Small timing harness for the benchmark suite: repeated timing with summary
+statistics, peak memory, a streaming ASGI GET for time-to-first-byte,
+per-module import times, and JSON result files that can be compared between commits.
+"""
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+
+def measure(fn, rounds: int | None = None, warmup: int = 1, budget: float = 0.5) -> dict:
+    """
+    Time `fn()` repeatedly.
+
+    Args:
+        rounds (int | None): fixed number of timed calls; by default enough
+            to fill `budget` seconds (5 to 1000).
+        warmup (int): untimed calls first, so caches and pools are warm.
+
+    Returns:
+        dict: rounds and min/median/mean/max/stddev in milliseconds.
+    """
+    for _ in range(warmup):
+        fn()
+    if rounds is None:
+        started = time.perf_counter()
+        fn()
+        once = time.perf_counter() - started
+        rounds = int(min(1000, max(5, budget / max(once, 1e-9))))
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return summarize(times, "ms") | {"rounds": rounds}
+
+
+def summarize(values: list[float], unit: str = "ms") -> dict:
+    """min/median/mean/max/stddev of durations in seconds, scaled to `unit`."""
+    scale = {"ms": 1e3, "s": 1.0}[unit]
+    return {
+        f"min_{unit}": min(values) * scale,
+        f"median_{unit}": statistics.median(values) * scale,
+        f"mean_{unit}": statistics.fmean(values) * scale,
+        f"max_{unit}": max(values) * scale,
+        f"stddev_{unit}": (statistics.stdev(values) if len(values) > 1 else 0.0) * scale,
+    }
+
+
+def peak_memory(fn) -> float:
+    """Peak traced allocation of one `fn()` call in MB (numpy included)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+async def asgi_get(app, path: str, query: str = "", headers: dict | None = None) -> dict:
+    """
+    Drive one GET request through the ASGI interface, timing the stream.
+
+    Test clients buffer the whole body, which hides time-to-first-byte, so
+    this calls the app directly and timestamps each body message.
+
+    Returns:
+        dict: status, ttfb (first non-empty body chunk) and total seconds, bytes.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    requested = False
+    done = asyncio.Event()
+    result = {"status": None, "ttfb": None, "total": None, "bytes": 0}
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        now = time.perf_counter() - started
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body and result["ttfb"] is None:
+                result["ttfb"] = now
+            result["bytes"] += len(body)
+            if not message.get("more_body", False):
+                result["total"] = now
+                done.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    if result["ttfb"] is None:
+        result["ttfb"] = result["total"]
+    return result
+
+
+def import_times(module: str, cwd: Path) -> dict[str, float]:
+    """
+    Import `module` in a fresh interpreter under `python -X importtime`.
+
+    Returns:
+        dict: cumulative import time in ms of every module it loaded, plus
+            "<process>" for the whole interpreter run, startup included.
+    """
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                         text=True, cwd=cwd, timeout=120, check=True)
+    times = {"<process>": (time.perf_counter() - started) * 1e3}
+    for line in out.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e3
+    return times
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save(results: list[dict], path: Path, meta: dict | None = None) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta or environment(), "results": results}, indent=2))
+    return path
+
+
+def _case_id(result: dict) -> tuple:
+    return result["group"], result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("per_sec")
+
+
+def compare(old_path: Path, new_path: Path, threshold: float = 0.10) -> list[str]:
+    """
+    Print every shared metric of two result files side by side.
+
+    Returns:
+        list: descriptions of metrics that got worse by more than `threshold`.
+    """
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    baseline = {_case_id(r): r for r in old["results"]}
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    regressions = []
+    for result in new["results"]:
+        before = baseline.get(_case_id(result))
+        if before is None:
+            continue
+        for metric, value in result["metrics"].items():
+            prev = before["metrics"].get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(prev, (int, float)) or not prev:
+                continue
+            if not ("median" in metric or metric.endswith("per_sec") or metric == "peak_mb"):
+                continue
+            change = value / prev - 1
+            worse = -change if _higher_is_better(metric) else change
+            flag = " REGRESSION" if worse > threshold else ""
+            label = f"{result['group']}/{result['name']} {result['params']} {metric}"
+            print(f"{label}: {prev:.4g} -> {value:.4g} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(label)
+    return regressions
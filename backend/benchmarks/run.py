@@ -0,0 +1,277 @@
+"""
+Backend benchmark suite. Writes one JSON file per run so results can be
+compared between commits.
+
+    python backend/benchmarks/run.py                        # everything
+    python backend/benchmarks/run.py --quick --only frames,render
+    python backend/benchmarks/run.py --compare OLD.json NEW.json
+
+Groups:
+    frames     compute_wave + flatten_wave_array vs WaveFrame.fill vs PeriodTable
+               per frame, and
+               the cost and size of each /ws/waveform frame encoding
+    synthesis  oscillator throughput per synthesis engine
+    render     play_pi_sequence_with_harmony time and peak memory
+    http       /api/pi-waveform latency and time-to-first-byte (cold and cached)
+    ws         /ws/pi and /ws/waveform messages per second per connection
+    startup    cold `import main` time, per app module and heavy dependency
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from harness import (asgi_get, compare, environment, import_times, measure, peak_memory, save,  # noqa: E402
+                     summarize)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def result(group: str, name: str, params: dict, metrics: dict) -> dict:
+    print(f"  {name} {params}: " + ", ".join(
+        f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items()
+        if not {"min", "max", "mean", "stddev"} & set(k.split("_"))))
+    return {"group": group, "name": name, "params": params, "metrics": metrics}
+
+
+def bench_frames(quick: bool) -> list[dict]:
+    import numpy as np
+
+    from waveform.computation import PeriodTable, WaveFrame, compute_wave, flatten_wave_array
+    from waveform.framing import Frame, FrameEncoder, XYBuffers
+
+    ENCODINGS = [("xy", "float32", False), ("compact", "float32", False), ("compact", "int16", False),
+                 ("compact", "int8", False), ("compact", "int8", True)]
+
+    results = []
+    for samples in (100, 1000, 10000) if quick else (100, 1000, 10000, 100000):
+        params = {"samples": samples}
+        metrics = measure(lambda: flatten_wave_array(compute_wave(440.0, 1.0, 0.25, samples, 0.1)))
+        results.append(result("frames", "compute_wave+flatten", params, metrics))
+        frame = WaveFrame(samples)
+        metrics = measure(lambda: bytes(frame.fill(440.0, 1.0, 0.25, samples, 0.1)))
+        results.append(result("frames", "WaveFrame.fill", params, metrics))
+        # A phase on the sample grid (a table slice) and one between points
+        table = PeriodTable(440.0, 1.0, samples, 0.1)
+        for phase in (0.25, 0.25 + 0.1 / samples / 3):
+            metrics = measure(lambda: table.frame(phase))
+            results.append(result("frames", "PeriodTable.frame", {**params, "phase": phase}, metrics))
+
+        # Compute plus encode, per negotiable /ws/waveform encoding, with a
+        # group's reusable xy buffers as the hub uses them
+        xy = XYBuffers()
+        for encoding, sample_format, delta in ENCODINGS:
+            encoder = FrameEncoder(encoding, sample_format, delta)
+
+            def tick():
+                y = frame.fill_y(440.0, 1.0, 0.25, samples, 0.1).astype(np.float32)
+                return encoder.encode(Frame(0, y, 0.1 / samples, 0.25, 1.0, xy))
+
+            metrics = {**measure(tick), "frame_bytes": len(tick())}
+            results.append(result("frames", f"encode {encoding}/{sample_format}{'/delta' if delta else ''}",
+                                  params, metrics))
+    return results
+
+
+def bench_synthesis(quick: bool) -> list[dict]:
+    from pi.synthesis import ENGINES, benchmark
+
+    return [
+        result("synthesis", "oscillate", {"engine": name, "samples": 22050},
+               {"samples_per_sec": benchmark(name, repeat=50 if quick else 200)})
+        for name in ENGINES
+    ]
+
+
+def bench_render(quick: bool) -> list[dict]:
+    from pi.piano import play_pi_sequence_with_harmony
+
+    grid = itertools.product(
+        (100, 500) if quick else (100, 500, 2000),
+        (2, 4) if quick else (2, 4, 8),
+        (False, True),
+    )
+    results = []
+    for digits, harmony_speed, octave_doubling in grid:
+        params = {
+            "digits": digits,
+            "duration": 0.25,
+            "crossfade": 0.02,
+            "harmony_speed": harmony_speed,
+            "octave_doubling": octave_doubling,
+            "harmony_movement": "chordal",
+        }
+        render = lambda: play_pi_sequence_with_harmony(**params, return_wave=True)
+        metrics = measure(render, rounds=3 if quick else 5)
+        metrics["peak_mb"] = peak_memory(render)
+        results.append(result("render", "play_pi_sequence_with_harmony", params, metrics))
+    return results
+
+
+def bench_http(quick: bool) -> list[dict]:
+    from main import app
+
+    rounds = 3 if quick else 7
+    seeds = itertools.count(1)
+    cases = [
+        ("cold", {"digits": 50, "duration": 0.5}),
+        ("cold", {"digits": 50, "duration": 0.5, "format": "wav"}),
+        ("cold", {"digits": 50, "duration": 0.5, "format": "int16", "sample_rate": 22050, "compress": "zlib"}),
+        ("cached", {"digits": 50, "duration": 0.5}),
+    ]
+    if not quick:
+        cases.append(("cold", {"digits": 500, "duration": 0.25}))
+
+    async def run() -> list[dict]:
+        results = []
+        for mode, params in cases:
+            runs = []
+            for _ in range(rounds + 1):
+                # A fresh seed per request misses the render cache; a fixed
+                # one hits it after the first (untimed) request
+                seed = next(seeds) if mode == "cold" else 0
+                query = "&".join(f"{k}={v}" for k, v in {**params, "harmony_movement": "random", "seed": seed}.items())
+                runs.append(await asgi_get(app, "/api/pi-waveform", query))
+            runs = runs[1:]
+            metrics = {
+                "status": runs[-1]["status"],
+                "bytes": runs[-1]["bytes"],
+                **{f"ttfb_{k}": v for k, v in summarize([r["ttfb"] for r in runs]).items()},
+                **{f"total_{k}": v for k, v in summarize([r["total"] for r in runs]).items()},
+            }
+            results.append(result("http", f"/api/pi-waveform {mode}", params, metrics))
+        return results
+
+    return asyncio.run(run())
+
+
+def bench_ws(quick: bool) -> list[dict]:
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    results = []
+    seconds = 1.0 if quick else 3.0
+    with TestClient(app) as client:
+        for protocol in ("json", "binary"):
+            params = {"digits": 5 if quick else 10, "duration": 0.2, "protocol": protocol, "chunk_size": 1024}
+            with client.websocket_connect("/ws/pi") as ws:
+                ws.send_json(params)
+                messages = received = 0
+                started = time.perf_counter()
+                while True:
+                    message = ws.receive()
+                    if message["type"] == "websocket.close":
+                        break
+                    messages += 1
+                    received += len(message.get("bytes") or message.get("text") or "")
+                elapsed = time.perf_counter() - started
+            results.append(result("ws", "/ws/pi", params, {
+                "messages": messages,
+                "messages_per_sec": messages / elapsed,
+                "bytes_per_sec": received / elapsed,
+            }))
+
+        for connections, samples in ((1, 1000), (4, 1000), (1, 10000)):
+            params = {"connections": connections, "samples": samples, "frame_rate": 60}
+            settings = {"generate_wave": True, "frequency": 5.0, "amplitude": 1.0,
+                        "samples": samples, "frame_size": 0.1, "frame_rate": 60}
+            sockets = [client.websocket_connect("/ws/waveform") for _ in range(connections)]
+            opened = [s.__enter__() for s in sockets]
+            try:
+                for ws in opened:
+                    ws.send_json(settings)
+                    # Skip idle frames sent before the settings took effect
+                    while len(ws.receive_bytes()) != samples * 8:
+                        pass
+                counts = [0] * connections
+                started = time.perf_counter()
+                while time.perf_counter() - started < seconds:
+                    for i, ws in enumerate(opened):
+                        ws.receive_bytes()
+                        counts[i] += 1
+                elapsed = time.perf_counter() - started
+            finally:
+                for s in sockets:
+                    s.__exit__(None, None, None)
+            results.append(result("ws", "/ws/waveform", params, {
+                "messages_per_sec": sum(counts) / connections / elapsed,
+                "min_messages_per_sec": min(counts) / elapsed,
+                "bytes_per_sec": sum(counts) * samples * 8 / connections / elapsed,
+            }))
+    return results
+
+
+# Third-party packages worth watching at startup; simpleaudio and mpmath
+# should only load on first use
+STARTUP_DEPENDENCIES = ("numpy", "fastapi", "starlette", "mpmath", "simpleaudio")
+
+
+def bench_startup(quick: bool) -> list[dict]:
+    app_dir = Path(__file__).resolve().parents[1] / "app"
+    runs = [import_times("main", app_dir) for _ in range(3 if quick else 7)]
+    names = [name for name in runs[0] if name == "<process>" or name in STARTUP_DEPENDENCIES
+             or name.split(".")[0] in ("main", "metrics", "pi", "waveform")]
+    results = []
+    for name in names:
+        # A module missing from some runs was imported by another one first
+        times = [run.get(name, 0.0) / 1e3 for run in runs]
+        results.append(result("startup", "import main", {"module": name}, summarize(times)))
+    for name in STARTUP_DEPENDENCIES:
+        if name not in names:
+            results.append(result("startup", "import main", {"module": name}, {"loaded": False}))
+    return results
+
+
+GROUPS = {
+    "frames": bench_frames,
+    "synthesis": bench_synthesis,
+    "render": bench_render,
+    "http": bench_http,
+    "ws": bench_ws,
+    "startup": bench_startup,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="comma-separated groups: " + ",".join(GROUPS))
+    parser.add_argument("--quick", action="store_true", help="smaller grids and fewer rounds")
+    parser.add_argument("--output", type=Path, help="result file (default: results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold for --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        return 1 if regressions else 0
+
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    # Per-note DEBUG logs (LOG_LEVEL=DEBUG) would dominate the timings
+    logging.disable(logging.INFO)
+
+    meta = environment() | {"quick": args.quick, "groups": groups}
+    results = []
+    for group in groups:
+        print(f"[{group}]")
+        results.extend(GROUPS[group](args.quick))
+
+    stamp = meta["timestamp"].replace(":", "").replace("-", "")[:15]
+    output = args.output or RESULTS_DIR / f"{stamp}-{meta['commit'] or 'unknown'}.json"
+    print(f"Saved {save(results, output, meta)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
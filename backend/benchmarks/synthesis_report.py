@@ -0,0 +1,33 @@
+"""
+Compares the synthesis engines in pi.synthesis: SNR of each engine against
+the direct-sin reference for every piano pitch, and oscillator throughput.
+
+    python backend/benchmarks/synthesis_report.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from pi.piano import PIANO_KEYS  # noqa: E402
+from pi.synthesis import DEFAULT_ENGINE, ENGINES, accuracy_report, benchmark  # noqa: E402
+
+
+def main():
+    others = [name for name in ENGINES if name != DEFAULT_ENGINE]
+    reports = {name: accuracy_report(PIANO_KEYS, engine=name) for name in others}
+
+    print(f"SNR vs {DEFAULT_ENGINE!r} (dB), 0.5 s tones")
+    print("pitch    freq(Hz)  " + "  ".join(f"{name:>10}" for name in others))
+    for pitch, freq in PIANO_KEYS.items():
+        print(f"{pitch:<6} {freq:>10.2f}  " + "  ".join(f"{reports[n][pitch]:>10.1f}" for n in others))
+    for name in others:
+        print(f"{name}: min SNR {min(reports[name].values()):.1f} dB")
+
+    print("\nThroughput (best of 200, one 0.5 s note per run)")
+    for name in ENGINES:
+        print(f"{name:>10}: {benchmark(name) / 1e6:8.1f} Msamples/s")
+
+
+if __name__ == "__main__":
+    main()
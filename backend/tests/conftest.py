@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The app is served with `--app-dir backend/app`, so its modules import each
+# other as top-level packages (`waveform`, `pi`). Mirror that for the tests.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
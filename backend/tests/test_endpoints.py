@@ -0,0 +1,199 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from pi.framing import decode_frame
+from pi.render_pool import RenderPool
+
+client = TestClient(main.app)
+
+QUERY = "digits=3&duration=0.2&harmony_speed=2&seed=7"
+CONFIG = dict(digits=3, duration=0.2, harmony_speed=2, seed=7)
+
+
+def waveform(query: str = QUERY, **headers):
+    return client.get(f"/api/pi-waveform?{query}", headers=headers)
+
+
+def test_waveform_etags():
+    full = waveform()
+    assert full.status_code == 200
+    assert len(full.content) == 4 * int(full.headers["x-sample-count"])
+    etag = full.headers["etag"]
+
+    assert waveform(**{"If-None-Match": etag}).status_code == 304
+    # harmony_type never changes the audio, so it shares the entry
+    assert waveform(f"{QUERY}&harmony_type=fifth").headers["etag"] == etag
+    assert waveform(f"{QUERY}&duration=0.3").headers["etag"] != etag
+    # Unseeded random renders can't be revalidated
+    assert "etag" not in waveform("digits=3&duration=0.2&harmony_movement=random").headers
+
+
+def test_waveform_byte_ranges_and_time_windows():
+    full = waveform()
+    samples = np.frombuffer(full.content, dtype="<f4")
+
+    part = waveform(Range="bytes=400-799")
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 400-799/{len(full.content)}"
+    assert part.content == full.content[400:800]
+    assert waveform(Range="bytes=-8").content == full.content[-8:]
+
+    missed = waveform(Range=f"bytes={len(full.content)}-")
+    assert missed.status_code == 416
+    assert missed.headers["content-range"] == f"bytes */{len(full.content)}"
+
+    # A time window is the same samples, whether rendered or cut from the cache
+    query = f"{QUERY}&start=0.05&end=0.15"
+    window = waveform(query)
+    np.testing.assert_array_equal(np.frombuffer(window.content, dtype="<f4"), samples[2205:6615])
+    # (the seed is unused by chordal movement, but is another cache entry)
+    uncached = waveform(query.replace("seed=7", "seed=8"))
+    np.testing.assert_allclose(np.frombuffer(uncached.content, dtype="<f4"), samples[2205:6615], atol=1e-6)
+
+
+def test_peak_normalized_windows_are_admitted_as_whole_renders(monkeypatch):
+    # The peak pass renders the whole piece, however small the window
+    query = "digits=5000&duration=4&harmony_movement=random&normalize=peak"
+    assert waveform(query).status_code == 413
+    assert waveform(f"{query}&start=0&end=0.01").status_code == 413
+
+    # Nothing to render in a window past the end
+    def unreachable(*args, **kwargs):
+        raise AssertionError("render started for an empty window")
+
+    monkeypatch.setattr(main, "start_flight", unreachable)
+    for peak in (f"{QUERY}&normalize=peak", "digits=3&duration=0.2&harmony_movement=random&normalize=peak"):
+        response = waveform(f"{peak}&start=60")
+        assert response.status_code == 200
+        assert response.content == b"" and response.headers["x-sample-count"] == "0"
+
+
+@pytest.mark.parametrize("query", [
+    "digits=-5", "digits=0", "duration=0", "harmony_speed=0", "key_root=X4", "key_root=B7", "key_root=C",
+    "normalize=loudest", "engine=organ", "format=mp3", "sample_rate=100", "compress=brotli",
+    "duration=nan", "duration=inf", "crossfade=nan", "crossfade=inf", "crossfade=-inf",
+    "digits=1000000", "harmony_speed=1000", "start=nan", "start=-1", "end=inf", "end=-0.5",
+])
+def test_waveform_rejects_invalid_parameters_before_streaming(query):
+    response = waveform(f"{QUERY}&{query}")
+    assert response.status_code == 400
+    assert "etag" not in response.headers
+
+
+def test_negative_crossfade_streams_the_whole_render():
+    response = waveform(f"{QUERY}&crossfade=-1")
+    assert response.status_code == 200
+    assert len(response.content) == 4 * int(response.headers["x-sample-count"]) > 0
+
+
+def test_render_admission(monkeypatch):
+    def unreachable(*args, **kwargs):
+        raise AssertionError("score work before admission")
+
+    # Too expensive to ever admit, which is known before any digit or score work
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "segment_layout", unreachable)
+        patch.setattr(main.SCORES, "get", unreachable)
+        assert waveform("digits=100000&duration=1.0").status_code == 413
+        assert waveform("digits=30000&duration=0.01&harmony_speed=64").status_code == 413
+        assert client.get("/api/pi-score?digits=100000").status_code == 413
+        with client.websocket_connect("/ws/pi") as ws:
+            ws.send_json({"digits": 100000})
+            assert ws.receive_json()["retry_after"] is None
+
+    # Saturated: the only place is taken
+    pool = RenderPool(workers=1, queue_depth=0)
+    held = pool.admit(1.0)
+    monkeypatch.setattr(main, "RENDER_POOL", pool)
+    response = waveform(f"{QUERY}&duration=0.25")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+    with client.websocket_connect("/ws/pi") as ws:
+        ws.send_json({**CONFIG, "duration": 0.25})
+        assert ws.receive_json()["retry_after"] >= 1
+    held.release()
+
+
+def test_ws_pi_binary_frames_match_the_http_render():
+    expected = np.frombuffer(waveform(f"{QUERY}&normalize=peak").content, dtype="<f4")
+
+    with client.websocket_connect("/ws/pi") as ws:
+        ws.send_json({**CONFIG, "protocol": "binary", "chunk_size": 2048})
+        header = ws.receive_json()
+        assert header["total_samples"] == len(expected)
+        parts = []
+        while sum(map(len, parts)) < header["total_samples"]:
+            seq, start, sample_rate, samples = decode_frame(ws.receive_bytes())
+            assert (seq, start, sample_rate) == (len(parts), 2048 * len(parts), 44100)
+            parts.append(samples)
+    np.testing.assert_array_equal(np.concatenate(parts), expected)
+
+    with client.websocket_connect("/ws/pi") as ws:
+        ws.send_json({**CONFIG, "protocol": "morse"})
+        assert "error" in ws.receive_json()
+
+
+def test_ws_pi_shares_renders_with_equal_query_parameters():
+    length = int(waveform(f"{QUERY}&normalize=peak").headers["x-sample-count"])
+
+    # JSON numbers take the query parameters' types, so 3.0 digits is the same render
+    hits = main.RENDER_CACHE.hits
+    with client.websocket_connect("/ws/pi") as ws:
+        ws.send_json({**CONFIG, "digits": 3.0, "protocol": "binary", "chunk_size": 65535})
+        assert ws.receive_json()["total_samples"] == length
+        assert len(decode_frame(ws.receive_bytes())[3]) == length
+    assert main.RENDER_CACHE.hits == hits + 1
+
+
+@pytest.mark.parametrize("config", [
+    {"digits": -5}, {"digits": "many"}, {"seed": [1]}, {"key_root": "X4"}, {"duration": 0}, {"crossfade": "nan"},
+])
+def test_ws_pi_rejects_invalid_configs(config):
+    with client.websocket_connect("/ws/pi") as ws:
+        ws.send_json({**CONFIG, **config})
+        assert "error" in ws.receive_json()
+
+
+def test_ws_pi_peaks_views():
+    with client.websocket_connect("/ws/pi-peaks") as ws:
+        ws.send_json(CONFIG)
+        assert ws.receive_json()["total_samples"] > 0
+
+        ws.send_json({"start": 0, "width": 100})
+        view = ws.receive_json()
+        assert len(view["min"]) == len(view["max"]) == 100
+        assert all(lo <= hi for lo, hi in zip(view["min"], view["max"]))
+
+        ws.send_json({"width": 0})
+        assert "error" in ws.receive_json()
+        ws.send_json({"start": "soon"})
+        assert "error" in ws.receive_json()
+
+
+@pytest.mark.parametrize("config", [
+    {"normalize": "loudest"}, {"harmony_movement": "random", "seed": None}, {"key_root": "C"},
+])
+def test_ws_pi_peaks_rejects_invalid_configs(config):
+    with client.websocket_connect("/ws/pi-peaks") as ws:
+        ws.send_json({**CONFIG, **config})
+        assert "error" in ws.receive_json()
+
+
+def test_pi_score():
+    response = client.get(f"/api/pi-score?{QUERY}")
+    assert response.status_code == 200
+    score = response.json()
+    tones = len(score["note"])
+    assert tones == 3 * (1 + 2 * 2)
+    assert all(len(score[column]) == tones for column in ("step", "key", "start", "duration", "gain"))
+    assert len(score["keys"]) == len(score["frequencies"]) == 88
+
+    # The last melody tone ends with the render
+    last = max(i for i, step in enumerate(score["step"]) if step == -1)
+    assert score["start"][last] + score["duration"][last] == int(waveform().headers["x-sample-count"])
+
+    for query in ("key_root=X4", "harmony_speed=0", "digits=-1", "engine=organ", "duration=nan", "crossfade=inf"):
+        assert client.get(f"/api/pi-score?{QUERY}&{query}").status_code == 400
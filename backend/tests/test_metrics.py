@@ -0,0 +1,49 @@
+import asyncio
+
+from metrics import Counter, Gauge, Histogram, MetricsMiddleware, Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("path",), registry=registry)
+    active = Gauge("active", "Open connections.", registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0), registry=registry)
+
+    requests.inc(path="/a")
+    requests.labels(path="/a").inc(2)
+    active.inc()
+    active.dec()
+    latency.observe(0.05, stage="mix")
+    latency.observe(0.5, stage="mix")
+    latency.observe(5.0, stage="mix")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{path="/a"} 3.0' in lines
+    assert "active 0.0" in lines
+    assert 'latency_seconds_bucket{stage="mix",le="0.1"} 1.0' in lines
+    assert 'latency_seconds_bucket{stage="mix",le="1.0"} 2.0' in lines
+    assert 'latency_seconds_bucket{stage="mix",le="+Inf"} 3.0' in lines
+    assert 'latency_seconds_count{stage="mix"} 3.0' in lines
+
+
+def test_middleware_records_http_requests():
+    from metrics import HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES
+
+    class Route:
+        path = "/things/{id}"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"hello"})
+
+    async def send(message):
+        pass
+
+    before = HTTP_RESPONSE_BYTES._values.get(("/things/{id}",), 0.0)
+    scope = {"type": "http", "method": "GET", "path": "/things/1"}
+    asyncio.run(MetricsMiddleware(app)(scope, None, send))
+
+    assert HTTP_RESPONSE_BYTES._values[("/things/{id}",)] == before + 5
+    assert ("GET", "/things/{id}", "200") in HTTP_REQUEST_SECONDS._values
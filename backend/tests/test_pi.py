@@ -0,0 +1,344 @@
+import asyncio
+import io
+import threading
+import lzma
+import wave
+import zlib
+
+import numpy as np
+import pytest
+from mpmath import mp
+
+from pi.assembly import CrossfadeAssembler, crossfade_curve, crossfade_layout, normalize_in_place
+from pi.digits import PiDigits
+from pi.encoding import AudioEncoder, negotiate_output, parse_range
+from pi.framing import FrameEncoder, decode_frame, negotiate
+from pi.mixer import harmony_schedule, mix_notes, tone_table
+from pi.peaks import PeakPyramid, PyramidCache
+from pi.render_cache import RenderCache, render_key
+from pi.render_pool import MIN_TONE_COST, RenderCancelled, RenderPool, RenderRejected, render_cost
+from pi.single_flight import SingleFlight
+from pi.resample import Resampler, resample
+from pi.sounds import aligned_tone, apply_envelope, generate_sine_wave, phase_align_wave
+from pi.synthesis import accuracy_report, get_engine, snr_db
+from pi.tone_bank import ToneBank
+
+
+def test_pi_digits_match_mpmath_and_extend_incrementally(tmp_path):
+    mp.dps = 2100
+    expected = str(mp.pi)[2:2002]
+
+    cache = PiDigits(str(tmp_path / "pi.u8"), chunk=256)
+    assert cache.text(10) == expected[:10]
+    small = len(cache)
+    assert cache.text(2000) == expected
+    assert len(cache) > small
+
+    warm = PiDigits(str(tmp_path / "pi.u8"))
+    assert len(warm) == len(cache)
+    assert warm.text(2000) == expected
+    with pytest.raises(ValueError):
+        warm.digits(-5)
+
+
+def test_tone_bank_reuses_and_evicts():
+    bank = ToneBank(max_bytes=2 * 44100 * 8)
+    first = bank.tone(440.0, 1.0)
+    assert not first.flags.writeable
+    assert bank.tone(440.0, 1.0) is first
+    bank.tone(220.0, 1.0)
+    bank.tone(110.0, 1.0)
+    bank.tone(440.0, 1.0)
+
+    stats = bank.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["evictions"] == 2
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_aligned_tone_matches_full_render_and_scan():
+    for frequency in (27.5, 261.63, 4186.01):
+        for duration, attack, decay in ((0.5, 0.02, 0.02), (0.1, 0.0, 0.0), (0.25, 0.02, 0.0)):
+            wave = generate_sine_wave(frequency, duration)
+            expected = phase_align_wave(apply_envelope(wave, attack=attack, decay=decay))
+            tone = aligned_tone(frequency, duration, attack=attack, decay=decay)
+            np.testing.assert_array_equal(tone, expected)
+
+
+def test_wavetable_engine_tracks_reference():
+    pitches = {"A0": 27.5, "C4": 261.63, "C8": 4186.01}
+    assert min(accuracy_report(pitches, engine="wavetable").values()) > 120
+
+    reference = aligned_tone(261.63, 0.5)
+    tone = aligned_tone(261.63, 0.5, engine="wavetable")
+    assert len(tone) == len(reference)
+    assert snr_db(reference, tone) > 120
+
+    with pytest.raises(ValueError):
+        get_engine("fm")
+
+
+def test_render_cache_memory_and_disk_tiers(tmp_path):
+    key = render_key(digits=5, duration=1.0)
+    assert key == render_key(duration=1.0, digits=5)
+    assert key != render_key(digits=6, duration=1.0)
+    assert key == render_key(digits=5, duration=1.0, harmony_type="fifth")
+
+    wave = np.linspace(-1, 1, 1000)
+    cache = RenderCache(max_bytes=1 << 20, directory=str(tmp_path))
+    assert cache.get(key) is None
+    stored = cache.put(key, wave)
+    assert stored.dtype == np.float32
+    assert cache.get(key) is stored
+
+    cold = RenderCache(max_bytes=1 << 20, directory=str(tmp_path))
+    hit = cold.get(key)
+    assert isinstance(hit, np.memmap)
+    np.testing.assert_array_equal(hit, stored)
+    assert cold.stats()["disk_hits"] == 1
+
+
+def test_binary_frames_round_trip():
+    samples = np.linspace(-1, 1, 300)
+    stream = negotiate({"protocol": "binary", "sample_format": "int16", "chunk_size": 10})
+    assert stream["chunk_size"] == 64
+
+    for sample_format, atol in (("float32", 1e-7), ("int16", 1 / 32767)):
+        encoder = FrameEncoder(44100, sample_format, 300)
+        frame = bytes(encoder.encode(7, 1024, samples))
+        seq, start, sample_rate, decoded = decode_frame(frame)
+        assert (seq, start, sample_rate) == (7, 1024, 44100)
+        np.testing.assert_allclose(decoded, samples, atol=atol)
+
+
+def test_resampler_is_band_limited_and_chunking_independent():
+    t = np.arange(44100) / 44100
+    low = np.sin(2 * np.pi * 440 * t)
+    high = np.sin(2 * np.pi * 15000 * t)  # above the 11025 Hz output Nyquist
+
+    out = resample(low + high, 44100, 22050)
+    assert len(out) == 22050
+    expected = np.sin(2 * np.pi * 440 * np.arange(22050) / 22050)
+    np.testing.assert_allclose(out[200:-200], expected[200:-200], atol=1e-3)
+
+    resampler = Resampler(44100, 22050)
+    pieces = [resampler.process(chunk) for chunk in np.array_split(low + high, [1, 500, 20000])]
+    streamed = np.concatenate(pieces + [resampler.flush()]).astype(np.float32)
+    np.testing.assert_array_equal(streamed, out)
+
+
+def test_audio_encoder_formats():
+    assert negotiate_output(accept="audio/x-wav;q=0.9, */*")["format"] == "wav"
+    assert negotiate_output("int16", accept="audio/wav")["format"] == "int16"
+    samples = np.linspace(-1, 1, 1000, dtype=np.float32)
+    chunks = lambda: np.array_split(samples, 3)
+
+    encoder = AudioEncoder("wav", 16000)
+    with wave.open(io.BytesIO(b"".join(encoder.encode(chunks(), len(samples))))) as wav:
+        assert (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) == (16000, 2, 1)
+        assert wav.getnframes() == encoder.output_length(len(samples)) == 363
+
+    raw = b"".join(AudioEncoder("int16").encode(chunks(), len(samples)))
+    assert np.array_equal(np.frombuffer(raw, "<i2"), (samples * 32767).astype("<i2"))
+    body = b"".join(AudioEncoder("int16", compress="zlib").encode(chunks(), len(samples)))
+    assert zlib.decompress(body) == raw
+    body = b"".join(AudioEncoder("int16", compress="lzma").encode(chunks(), len(samples)))
+    assert lzma.decompress(body) == raw
+
+
+def test_byte_ranges_map_to_samples():
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-5", 100) == (95, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    for ignored in ("items=0-1", "bytes=0-1,5-6", "bytes=5-2", "bytes=x-", "bytes=-"):
+        assert parse_range(ignored, 100) is None
+    for unsatisfiable in ("bytes=100-", "bytes=-0"):
+        with pytest.raises(ValueError):
+            parse_range(unsatisfiable, 100)
+
+    samples = np.linspace(-1, 1, 1000, dtype=np.float32)
+    encoder = AudioEncoder("wav")
+    body = b"".join(encoder.encode([samples], len(samples)))
+    assert encoder.content_length(len(samples)) == len(body)
+
+    async def ranged(first, last):
+        async def chunks():
+            lo, hi = encoder.sample_span(first, last)
+            yield samples[lo:hi]
+        return b"".join([bytes(b) async for b in encoder.encode_range(chunks(), len(samples), first, last)])
+
+    for first, last in ((0, 3), (40, 47), (45, 45), (101, 1500), (0, len(body) - 1)):
+        assert asyncio.run(ranged(first, last)) == body[first:last + 1]
+
+
+def test_peak_pyramid_envelopes_bound_every_pixel():
+    rng = np.random.default_rng(3)
+    wave = rng.uniform(-1, 1, 10007).astype(np.float32)
+    pyramid = PeakPyramid(wave, base=16)
+    assert len(pyramid.levels[-1][0]) == 1
+    assert pyramid.levels[-1][1][0] == wave.max()
+
+    for start, stop, width in [(0, 10007, 37), (123, 9000, 500), (5000, 5100, 100), (0, 10007, 1)]:
+        mins, maxs = pyramid.envelope(start, stop, width, wave)
+        bounds = start + np.floor(np.arange(width + 1) * (stop - start) / width).astype(int)
+        bounds[-1] = stop
+        true_mins = np.minimum.reduceat(wave[start:stop], bounds[:-1] - start)
+        true_maxs = np.maximum.reduceat(wave[start:stop], bounds[:-1] - start)
+        assert len(mins) == width
+        assert np.all(mins <= true_mins) and np.all(maxs >= true_maxs)
+        if (stop - start) / width < 16:
+            # Zoomed in past the pyramid: read from the waveform itself
+            np.testing.assert_array_equal(mins, true_mins)
+            np.testing.assert_array_equal(maxs, true_maxs)
+
+    cache = PyramidCache(max_bytes=pyramid.nbytes)
+    assert cache.get("a", wave) is cache.get("a", wave)
+    cache.get("b", wave[::-1])
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1, "bytes": pyramid.nbytes,
+                             "max_bytes": pyramid.nbytes}
+
+
+def test_mixer_places_voices_and_octave_doubles():
+    tones, tone_lens = tone_table([np.ones(4), np.ones(4), np.ones(2)])
+    # Tone 0 has an octave double (row 2), tone 1 does not
+    octave_tone = np.array([2, -1, -1])
+    voice_idx = np.array([[0, 1], [1, 1]])
+    note_lens = np.array([8, 8])
+    events = harmony_schedule(voice_idx, note_lens, tone_lens, octave_tone)
+    assert len(events) == 5
+
+    melody = np.zeros((2, 8))
+    combo = mix_notes(melody, note_lens, events, tones)
+    # Note 0: double at [0, 2) * 0.6, voice 0 at [0, 4) * 0.64, voice 1 at [4, 8) * 0.8
+    np.testing.assert_allclose(combo[0] * 2, [1.24, 1.24, 0.64, 0.64, 0.8, 0.8, 0.8, 0.8])
+    np.testing.assert_allclose(combo[1] * 2, [0.8] * 8)
+
+
+def test_crossfade_assembler_matches_concatenation():
+    rng = np.random.default_rng(0)
+    notes = [rng.standard_normal(n) for n in (50, 12, 30, 40)]
+    xf = 10
+
+    # Reference: crossfade a list of segments, then concatenate
+    segments = [notes[0].copy()]
+    for note in notes[1:]:
+        fade = min(len(segments[-1]), xf)
+        curve = np.sin(np.linspace(0, np.pi/2, fade))**2
+        segments[-1][-fade:] = segments[-1][-fade:]*(1-curve) + note[:fade]*curve
+        segments.append(note[fade:].copy())
+    expected = np.concatenate(segments)
+
+    fades, seg_lens = crossfade_layout(np.array([len(n) for n in notes]), xf)
+    assert list(fades) == [0, 10, 2, 10]
+    assert not crossfade_layout(np.array([50, 12]), -10)[0].any()
+    out = np.empty(seg_lens.sum())
+    assembler = CrossfadeAssembler(out)
+    for note, fade in zip(notes, fades):
+        assembler.add(note, fade)
+    assert assembler.pos == len(out)
+    np.testing.assert_array_equal(out, expected)
+
+    assert crossfade_curve(xf) is crossfade_curve(xf)
+    assert np.max(np.abs(normalize_in_place(out))) == 1.0
+
+
+def test_render_pool_admission_and_cancellation():
+    pool = RenderPool(workers=2, queue_depth=1, heavy_cost=100, max_cost=1000)
+    assert render_cost(10, 1.0, octave_doubling=True) == 30
+    # Fast harmony is costed by its tone count
+    assert render_cost(10, 1.0, harmony_speed=4) == 20
+    assert render_cost(10, 1.0, harmony_speed=1000) == 10 * (1 + 1000 * MIN_TONE_COST)
+    with pytest.raises(ValueError):
+        render_cost(-5, 1.0)
+    with pytest.raises(ValueError):
+        render_cost(10, 1.0, harmony_speed=0)
+
+    with pytest.raises(RenderRejected) as exc:
+        pool.admit(1001)
+    assert exc.value.retry_after is None
+    pool.check_cost(1000)
+    with pytest.raises(RenderRejected):
+        pool.check_cost(1001)
+
+    # One heavy render at a time, small ones fill the rest
+    heavy = pool.admit(200)
+    with pytest.raises(RenderRejected):
+        pool.admit(200)
+    small = [pool.admit(1), pool.admit(1)]
+    with pytest.raises(RenderRejected) as exc:
+        pool.admit(1)
+    assert exc.value.retry_after >= 1
+    heavy.release()
+    heavy.release()  # idempotent
+    small.append(pool.admit(200))
+    for job in small:
+        job.release()
+    assert pool.stats()["queued"] == 0
+
+    async def run():
+        return await pool.run(pool.admit(1), lambda job: 42)
+
+    assert asyncio.run(run()) == 42
+    job = RenderPool().admit(1)
+    job.cancel()
+    with pytest.raises(RenderCancelled):
+        job.check()
+
+
+def test_single_flight_shares_one_render():
+    pool = RenderPool(workers=2, queue_depth=0)
+    cache = RenderCache()
+    flights = SingleFlight(pool, cache)
+    notes = [np.full(n, i, dtype=np.float32) for i, n in enumerate((3, 4, 5))]
+    renders = []
+    gate = threading.Event()
+
+    def render(job):
+        renders.append(job)
+        for i, note in enumerate(notes):
+            if i == 1:
+                gate.wait()  # hold the render until the follower has joined
+            yield note
+
+    async def collect(reader):
+        return np.concatenate([chunk async for chunk in reader])
+
+    async def share():
+        leader = flights.start("k", pool.admit(12), 12, render)
+        first = leader.read()
+        head = await anext(first)
+        follower = flights.join("k")
+        assert follower is leader
+        rest = asyncio.ensure_future(collect(first))
+        late = asyncio.ensure_future(collect(follower.read()))
+        gate.set()
+        return head, await rest, await late, await leader.wait()
+
+    head, rest, late, whole = asyncio.run(share())
+    expected = np.concatenate(notes)
+    np.testing.assert_array_equal(np.concatenate([head, rest]), expected)
+    np.testing.assert_array_equal(late, expected)
+    assert len(renders) == 1
+    assert flights.join("k") is None
+    assert np.shares_memory(cache.get("k"), whole)
+    assert not whole.flags.writeable
+
+    # The last reader leaving cancels the render, which is neither shared nor cached
+    gate.clear()
+
+    async def abandon():
+        flight = flights.start("gone", pool.admit(12), 12, render)
+        reader = flight.read()
+        await anext(reader)
+        await reader.aclose()
+        gate.set()
+        return flight
+
+    flight = asyncio.run(abandon())
+    pool._executor.shutdown(wait=True)
+    assert flight.produced < 12
+    assert flights.join("gone") is None and cache.get("gone") is None
+    assert pool.stats()["cancelled"] == 1
@@ -0,0 +1,172 @@
+import asyncio
+import subprocess
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pi.parallel import render_pi_parallel, segment_layout
+from pi.piano import (DIGIT_TO_KEY, PIANO_KEYS, create_piano_key_library, generate_scale, iter_pi_waveform,
+                      play_pi_sequence_with_harmony, score_timeline)
+from pi.encoding import pcm16
+from pi.playback import FileSink, NullSink, SimpleAudioSink, play
+from pi.score import KEY_NAMES, SCORES
+
+PARAMS = dict(
+    digits=12,
+    duration=0.5,
+    crossfade=0.02,
+    key_root="C4",
+    harmony_type="third",
+    harmony_speed=3,
+    octave_doubling=True,
+    harmony_movement="chordal",
+)
+
+
+def test_streamed_waveform_matches_buffered_render():
+    full = play_pi_sequence_with_harmony(**PARAMS, return_wave=True).astype(np.float32)
+
+    exact = np.concatenate(list(iter_pi_waveform(**PARAMS, normalize="peak")))
+    np.testing.assert_array_equal(exact, full)
+
+    bounded = np.concatenate(list(iter_pi_waveform(**PARAMS, normalize="bound")))
+    assert bounded.shape == full.shape
+    assert np.max(np.abs(bounded)) <= 1.0
+
+
+def test_parallel_render_is_bit_identical_to_serial():
+    params = dict(PARAMS, digits=96, duration=0.1, crossfade=0.01)
+    serial = play_pi_sequence_with_harmony(**params, return_wave=True)
+    parallel = render_pi_parallel(**params, workers=3)
+    np.testing.assert_array_equal(parallel, serial)
+
+
+def test_negative_crossfade_renders_the_planned_length():
+    args = {**PARAMS, "crossfade": -0.01}
+    _, _, seg_lens = segment_layout(args["digits"], args["duration"], args["crossfade"])
+    assert len(np.concatenate(list(iter_pi_waveform(**args)))) == seg_lens.sum()
+
+
+def test_window_renders_match_full_render():
+    for normalize in ("bound", "peak"):
+        full = np.concatenate(list(iter_pi_waveform(**PARAMS, normalize=normalize)))
+        for start, stop in ((0, 1000), (20000, 20001), (30000, 150000), (len(full) - 500, len(full) + 500)):
+            window = np.concatenate(list(iter_pi_waveform(**PARAMS, normalize=normalize, start=start, stop=stop)))
+            np.testing.assert_array_equal(window, full[start:stop])
+
+
+def test_unseeded_peak_render_is_normalized_exactly():
+    args = {**PARAMS, "harmony_movement": "random"}
+    wave = np.concatenate(list(iter_pi_waveform(**args, normalize="peak")))
+    assert np.abs(wave).max() == 1.0
+
+    with pytest.raises(ValueError):
+        next(iter_pi_waveform(**args, normalize="loudest"))
+
+
+def test_score_is_compiled_once_and_timed_like_the_render():
+    args = {k: v for k, v in PARAMS.items() if k != "harmony_type"}
+    score, timed = score_timeline(**args)
+    misses = SCORES.misses
+    again, retimed = score_timeline(**{**args, "duration": 0.25, "crossfade": 0.0})
+    assert again is score and SCORES.misses == misses
+    # Equal settings of other types compile once too
+    assert SCORES.get(digits=12.0, key_root="C4", harmony_speed=3.0, octave_doubling=1,
+                      harmony_movement="chordal") is score
+    assert not score.events.flags.writeable
+
+    # One melody tone per note, one per voice, an octave double per voice
+    events = score.events
+    speed = PARAMS["harmony_speed"]
+    assert len(events) == len(score.digits) * (1 + 2 * speed)
+    assert np.all(np.diff(events["note"] * (2 * speed + 1) + events["step"]) > 0)
+    assert [KEY_NAMES[k] for k in events["key"][events["step"] == -1]] == [DIGIT_TO_KEY[d] for d in score.digits]
+
+    # Melody tones tile the render, overlapping by the crossfade; every
+    # harmony tone stays inside its note
+    total = len(np.concatenate(list(iter_pi_waveform(**PARAMS))))
+    melody = timed[events["step"] == -1]
+    assert melody["start"][0] == 0 and melody["start"][-1] + melody["duration"][-1] == total
+    note_start, note_len = melody["start"][events["note"]], melody["duration"][events["note"]]
+    assert np.all(timed["start"] >= note_start)
+    assert np.all(timed["start"] + timed["duration"] <= note_start + note_len)
+    melody = retimed[events["step"] == -1]
+    assert np.all(melody["start"][1:] == np.cumsum(melody["duration"])[:-1])
+
+
+def test_note_tables_are_frozen_and_playback_imports_lazily():
+    assert dict(PIANO_KEYS) == create_piano_key_library()
+    with pytest.raises(TypeError):
+        PIANO_KEYS["C4"] = 0.0
+    scale = generate_scale("C4", include_octaves=True)
+    scale.append("X")
+    assert generate_scale("C4", include_octaves=True) == scale[:-1]
+    with pytest.raises(ValueError):
+        generate_scale("C")
+
+    app_dir = Path(__file__).resolve().parents[1] / "app"
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print(sorted({'simpleaudio', 'mpmath'} & set(sys.modules)))"],
+        capture_output=True, text=True, cwd=app_dir, check=True,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_playback_renders_ahead_into_sinks(tmp_path, monkeypatch):
+    # Playing into a file writes exactly the rendered melody
+    path = tmp_path / "pi.wav"
+    playback = play_pi_sequence_with_harmony(**PARAMS, sink=FileSink(str(path)))
+    assert playback.done and playback.stats()["played"] == playback.stats()["rendered"]
+    with wave.open(str(path)) as f:
+        played = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    np.testing.assert_array_equal(played, pcm16(np.concatenate(list(iter_pi_waveform(**PARAMS)))))
+
+    # simpleaudio gets short buffers, each started once the previous one has played
+    class FakeSimpleAudio:
+        calls = []
+
+        class Playing:
+            def wait_done(self):
+                FakeSimpleAudio.calls.append("wait")
+
+        def play_buffer(self, pcm, **kwargs):
+            self.calls.append(len(pcm))
+            return self.Playing()
+
+    monkeypatch.setattr("pi.playback._simpleaudio", FakeSimpleAudio)
+    play(lambda checkpoint: [np.zeros(50000, dtype=np.float32)], sink=SimpleAudioSink()).wait()
+    assert FakeSimpleAudio.calls == [22050, "wait", 22050, "wait", 5900, "wait"]
+
+    # A source slower than real time starves the sink
+    def slow(checkpoint):
+        for _ in range(4):
+            time.sleep(0.03)
+            yield np.zeros(441, dtype=np.float32)
+
+    playback = play(slow, sink=NullSink(realtime=True), block_seconds=0.01)
+    assert playback.wait(timeout=5)
+    assert playback.underruns >= 2 and playback.played == 4 * 441
+
+    # Cancelling stops the render at its next checkpoint, and awaiting works
+    rendered = []
+
+    def endless(checkpoint):
+        while True:
+            checkpoint()
+            rendered.append(1)
+            yield np.zeros(4410, dtype=np.float32)
+
+    async def cancel_playback():
+        playback = play(endless, sink=NullSink(realtime=True), buffer_seconds=0.2)
+        await asyncio.sleep(0.1)
+        playback.cancel()
+        await playback
+        return playback
+
+    playback = asyncio.run(cancel_playback())
+    assert playback.cancelled and playback.played < 44100
+    assert len(rendered) < 20
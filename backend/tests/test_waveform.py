@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from waveform.computation import IDLE_FRAME, PeriodTable, WaveFrame, compute_wave, flatten_wave_array
+from waveform.framing import HEADER, Frame, FrameEncoder, XYBuffers, decode_frame, negotiate
+from waveform.hub import Subscriber, WaveformHub, settings_key
+from waveform.scheduler import FrameClock
+
+
+def test_wave_frame_matches_reference_encoding():
+    frame = WaveFrame()
+    for samples in (3, 100, 500):
+        fast = np.frombuffer(frame.fill(65.0, 0.5, 1.37, samples, 0.1), dtype=np.float32)
+        ref = np.frombuffer(flatten_wave_array(compute_wave(65.0, 0.5, 1.37, samples, 0.1)), dtype=np.float32)
+        assert fast.shape == ref.shape
+        np.testing.assert_allclose(fast, ref, atol=1e-6)
+
+
+def test_wave_frame_reuses_buffer():
+    frame = WaveFrame(100)
+    first = frame.fill(samples=100)
+    second = frame.fill(phase=0.5, samples=100)
+    assert first.obj is second.obj
+
+
+def test_period_table_frames_match_direct_evaluation():
+    direct = WaveFrame()
+    for frequency, samples in [(5.0, 100), (65.0, 500), (3.14159265, 1000)]:
+        table = PeriodTable(frequency, 0.5, samples, 0.1)
+        for phase in (0.0, 0.04, 1 / 30, 7 / 30, 2.5):
+            y = table.frame(phase)
+            assert not y.flags.writeable
+            np.testing.assert_allclose(y, direct.fill_y(frequency, 0.5, phase, samples, 0.1), atol=1e-6)
+
+    # Grid-aligned phases are slices of the table; others are computed
+    table = PeriodTable(5.0, 1.0, 100, 0.1)
+    assert table.period == 200
+    assert np.shares_memory(table.frame(0.04), table.frame(0.24))
+    table.frame(1 / 30)
+    assert table.stats()["sliced"] == 2 and table.stats()["rotated"] == 1
+    assert PeriodTable(3.14159265, 1.0, 1000, 0.1).period is None
+
+
+def test_compact_frames_round_trip_and_shrink():
+    wave = WaveFrame(500)
+
+    def frame(seq, phase):
+        y = wave.fill_y(65.0, 0.5, phase, 500, 0.1).astype(np.float32)
+        return Frame(seq, y, 0.1 / 500, phase, 0.5)
+
+    first = frame(0, 0.0)
+    legacy = FrameEncoder().encode(first)
+    assert legacy == bytes(wave.fill(65.0, 0.5, 0.0, 500, 0.1))
+    assert FrameEncoder().encode(Frame(0, None)) == IDLE_FRAME
+
+    for sample_format, saved, tolerance in [("float32", 0.45, 0), ("int16", 0.7, 1e-4), ("int8", 0.8, 3e-3)]:
+        data = FrameEncoder("compact", sample_format).encode(first)
+        assert len(data) < (1 - saved) * len(legacy)
+        seq, dt, phase, y, _ = decode_frame(data)
+        assert (seq, dt, phase) == (0, 0.1 / 500, 0.0)
+        np.testing.assert_allclose(y, first.y, atol=tolerance)
+
+    # Delta frames decode to exactly what the key frame encoding would
+    encoder = FrameEncoder("compact", "int8", delta=True)
+    previous = None
+    for seq in range(4):
+        f = frame(seq, seq / 30)
+        data = encoder.encode(f)
+        _, _, _, y, previous = decode_frame(data, previous)
+        assert HEADER.unpack_from(data)[3] == (seq > 0)
+        np.testing.assert_array_equal(y, decode_frame(FrameEncoder("compact", "int8").encode(f))[3])
+
+    # A group's xy frames reuse buffers once no one holds their frame
+    buffers = XYBuffers()
+    views = []
+    for seq in range(4):
+        f = frame(seq, seq / 30)
+        f.xy = buffers
+        views.append(FrameEncoder().encode(f))
+        assert views[-1] == bytes(wave.fill(65.0, 0.5, seq / 30, 500, 0.1))
+        del f
+    assert len(buffers) == 1 and all(view.obj is views[0].obj for view in views)
+
+    assert negotiate({"encoding": "compact"}) == {"encoding": "compact", "sample_format": "float32", "delta": False}
+    assert negotiate({"delta": True}, negotiate({"encoding": "compact", "sample_format": "int16"}))["delta"]
+    with pytest.raises(ValueError):
+        negotiate({"encoding": "compact", "delta": True})
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+
+    async def send_bytes(self, data):
+        await asyncio.sleep(self.delay)
+        self.frames.append(bytes(data))
+
+    async def send_json(self, data):
+        self.frames.append(data)
+
+
+def test_hub_shares_frames_and_drops_for_slow_subscribers():
+    async def scenario():
+        hub = WaveformHub()
+        key = settings_key(True, 5.0, 1.0, 50, 0.1, 100)
+        fast, slow = Subscriber(FakeSocket()), Subscriber(FakeSocket(delay=0.05))
+        await hub.subscribe(fast, key)
+        await hub.subscribe(slow, key)
+        assert len(hub.groups) == 1
+
+        tasks = [asyncio.create_task(s.run()) for s in (fast, slow)]
+        await asyncio.sleep(0.3)
+        assert fast.frames_sent > slow.frames_sent
+        assert slow.frames_dropped > 0
+        assert all(frame in fast.ws.frames for frame in slow.ws.frames)
+
+        await hub.subscribe(slow, settings_key(False, 5.0, 1.0, 50, 0.1, 100))
+        assert len(hub.groups) == 2
+        for sub in (fast, slow):
+            await hub.unsubscribe(sub)
+        assert not hub.groups
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_frame_clock_keeps_absolute_deadlines_and_skips_when_late():
+    async def scenario():
+        clock = FrameClock(100)
+        start = time.monotonic()
+        elapsed = 0
+        for _ in range(10):
+            elapsed += await clock.tick()
+        time.sleep(0.05)  # stall the loop for ~5 frames
+        elapsed += await clock.tick()
+        assert clock.skipped >= 3
+        assert elapsed == clock.frame
+        assert abs((time.monotonic() - start) - clock.frame * clock.interval) < clock.interval
+
+    asyncio.run(scenario())